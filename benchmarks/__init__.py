@@ -0,0 +1,6 @@
+import os, sys
+
+# the site modules import each other as top level modules from src/
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
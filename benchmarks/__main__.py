@@ -0,0 +1,106 @@
+import argparse, json, platform, sys, tempfile
+
+from benchmarks.corpus import CorpusGenerator
+from benchmarks.stages import run_stages
+
+def run(args):
+
+    generator = CorpusGenerator(
+        pages=args.pages,
+        blocks_per_page=args.blocks,
+        link_density=args.link_density,
+        nesting_depth=args.depth,
+        images=args.images,
+        seed=args.seed,
+    )
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        root = generator.write(f"{temp_dir}/site")
+        timings, counts = run_stages(root, repeat=args.repeat)
+
+    results = {
+        "corpus": generator.parameters(),
+        "counts": counts,
+        "python": platform.python_version(),
+        "stages": timings,
+    }
+
+    for name, seconds in timings.items():
+        print(f"{name:<26} {seconds * 1000:10.2f} ms")
+
+    if counts["search_queries"]:
+        query_latency = timings["search_queries"] / counts["search_queries"]
+        print(f"search index: {counts['search_index_bytes']} bytes, {counts['search_terms']} terms in {counts['search_shards']} shards, {query_latency * 1e6:.1f} us per query")
+
+    if args.output is not None:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+        print(f"results written to {args.output}")
+
+    return 0
+
+def compare(args):
+
+    with open(args.baseline, 'r') as file:
+        baseline = json.load(file)
+    with open(args.current, 'r') as file:
+        current = json.load(file)
+
+    if baseline["corpus"] != current["corpus"]:
+        print("warning: results come from different corpus parameters")
+
+    regressions = []
+    print(f"{'stage':<26} {'baseline ms':>12} {'current ms':>12} {'change':>8}")
+
+    for name, baseline_seconds in baseline["stages"].items():
+        current_seconds = current["stages"].get(name)
+        if current_seconds is None:
+            print(f"{name:<26} {baseline_seconds * 1000:12.2f} {'missing':>12}")
+            continue
+
+        if baseline_seconds == 0:
+            # too fast for the timer in the baseline, there is nothing to compare against
+            print(f"{name:<26} {baseline_seconds * 1000:12.2f} {current_seconds * 1000:12.2f} {'n/a':>8}")
+            continue
+
+        change = current_seconds / baseline_seconds - 1
+        flag = ""
+        if change > args.threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+
+        print(f"{name:<26} {baseline_seconds * 1000:12.2f} {current_seconds * 1000:12.2f} {change:+8.1%}{flag}")
+
+    if regressions:
+        print(f"{len(regressions)} stages slower than the {args.threshold:.0%} threshold")
+        return 1
+
+    return 0
+
+def main(argv):
+
+    parser = argparse.ArgumentParser(prog="python3 -m benchmarks", description="Time each stage of the site build on a synthetic corpus")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="generate a corpus and time every stage")
+    run_parser.add_argument("--pages", type=int, default=100)
+    run_parser.add_argument("--blocks", type=int, default=30, help="blocks per page")
+    run_parser.add_argument("--link-density", type=float, default=0.3, help="share of inline words that become links or images")
+    run_parser.add_argument("--depth", type=int, default=2, help="directory nesting depth of the content tree")
+    run_parser.add_argument("--images", type=int, default=10)
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--repeat", type=int, default=3)
+    run_parser.add_argument("--output", help="write the results as json")
+    run_parser.set_defaults(handler=run)
+
+    compare_parser = subparsers.add_parser("compare", help="flag stages that got slower than a baseline")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.1, help="allowed slowdown, 0.1 is 10%%")
+    compare_parser.set_defaults(handler=compare)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
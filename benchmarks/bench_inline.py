@@ -0,0 +1,27 @@
+import os, sys, timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from textnode import text_to_textnodes_multipass, text_to_textnodes_single_pass
+
+def link_heavy_paragraph(link_count):
+    parts = []
+    for idx in range(link_count):
+        parts.append(f"see [post number {idx}](/blog/post-{idx}) and **bold {idx}** with ![image {idx}](/images/{idx}.png)")
+    return " then ".join(parts)
+
+def main():
+
+    print(f"{'links':>6} {'multipass ms':>13} {'single pass ms':>15} {'speedup':>8}")
+
+    for link_count in (10, 100, 1000, 5000):
+        paragraph = link_heavy_paragraph(link_count)
+        repeat = max(1, 2000 // link_count)
+
+        multipass = min(timeit.repeat(lambda: text_to_textnodes_multipass(paragraph), number=repeat, repeat=3)) / repeat
+        single_pass = min(timeit.repeat(lambda: text_to_textnodes_single_pass(paragraph), number=repeat, repeat=3)) / repeat
+
+        print(f"{link_count:>6} {multipass * 1000:>13.3f} {single_pass * 1000:>15.3f} {multipass / single_pass:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import os, random, sys, time, tracemalloc
+
+# the repository root, so this runs as a script as well as with python3 -m benchmarks.bench_nodes
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.flat_document import FlatDocument
+from htmlnode import Minifier
+from markdown_interpreter import markdown_to_html_node
+
+INLINE_WORDS = ["word", "**bold**", "_italic_", "`code`", "[link](/blog/post)", "![image](/images/a.png)", "text"]
+
+def synthetic_document(paragraph_count, seed=3):
+
+    generator = random.Random(seed)
+    blocks = ["# Synthetic document"]
+
+    for idx in range(paragraph_count):
+        blocks.append(" ".join(generator.choice(INLINE_WORDS) for _ in range(30)))
+        if idx % 10 == 0:
+            blocks.append("- a **list**\n- with [links](/x)\n- and items")
+
+    return "\n\n".join(blocks)
+
+def measure(build):
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return result, size, elapsed
+
+def main():
+
+    paragraph_count = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    markdown = synthetic_document(paragraph_count)
+
+    tree, tree_size, _ = measure(lambda: markdown_to_html_node(markdown))
+    document, document_size, _ = measure(lambda: FlatDocument.from_node(tree))
+
+    start = time.perf_counter()
+    tree_html = tree.to_html()
+    tree_render = time.perf_counter() - start
+
+    start = time.perf_counter()
+    document_html = document.to_html()
+    document_render = time.perf_counter() - start
+
+    # the flat form is only worth measuring while it renders the same page
+    assert tree_html == document_html
+    assert tree.to_html(None, Minifier()) == document.to_html(None, Minifier())
+
+    print(f"{paragraph_count} paragraphs, {len(document)} nodes, {len(tree_html) / 1e6:.1f} MB of html")
+    print(f"node tree      {tree_size / 1e6:8.1f} MB  render {tree_render * 1000:7.1f} ms")
+    print(f"flat document  {document_size / 1e6:8.1f} MB  render {document_render * 1000:7.1f} ms  (arrays only, values shared with the tree)")
+
+if __name__ == "__main__":
+    main()
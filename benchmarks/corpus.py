@@ -0,0 +1,132 @@
+import os, random, shutil, struct, zlib
+
+WORDS = ("tolkien", "middle", "earth", "ring", "hobbit", "elf", "dwarf", "wizard", "shire", "mordor",
+         "river", "mountain", "song", "journey", "shadow", "light", "ancient", "story", "road", "forest")
+
+DEFAULT_BLOCK_MIX = {
+    "paragraph": 6,
+    "heading": 2,
+    "code": 1,
+    "quote": 1,
+    "unordered_list": 1,
+    "ordered_list": 1,
+}
+
+def png_bytes(width, height, seed=0):
+
+    # a valid, uncompressed-looking RGB png so image stages have real headers to read
+    generator = random.Random(seed)
+    rows = b"".join(b"\0" + bytes(generator.randrange(256) for _ in range(width * 3)) for _ in range(height))
+
+    def chunk(chunk_type, data):
+        return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", zlib.crc32(chunk_type + data))
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(rows, 1)) + chunk(b"IEND", b"")
+
+class CorpusGenerator():
+
+    def __init__(self, pages=100, blocks_per_page=30, block_mix=None, link_density=0.3, nesting_depth=2, images=10, seed=0):
+        self.pages = pages
+        self.blocks_per_page = blocks_per_page
+        self.block_mix = DEFAULT_BLOCK_MIX if block_mix is None else block_mix
+        self.link_density = link_density
+        self.nesting_depth = nesting_depth
+        self.images = images
+        self.seed = seed
+        self.random = random.Random(seed)
+
+    def parameters(self):
+        return {
+            "pages": self.pages,
+            "blocks_per_page": self.blocks_per_page,
+            "block_mix": self.block_mix,
+            "link_density": self.link_density,
+            "nesting_depth": self.nesting_depth,
+            "images": self.images,
+            "seed": self.seed,
+        }
+
+    def page_dir(self, idx):
+
+        # spread pages over nesting_depth levels of sections so directory walks have something to recurse into
+        sections = [f"section{(idx // (10 ** level)) % 10}" for level in range(self.nesting_depth, 0, -1)]
+        return "/".join(sections + [f"post{idx}"])
+
+    def words(self, count):
+        return " ".join(self.random.choice(WORDS) for _ in range(count))
+
+    def inline_text(self, word_count):
+
+        pieces = []
+        for _ in range(word_count):
+            roll = self.random.random()
+            if roll < self.link_density * 0.7:
+                target = self.random.randrange(self.pages)
+                pieces.append(f"[{self.words(2)}](/{self.page_dir(target)})")
+            elif roll < self.link_density * 0.8 and self.images:
+                pieces.append(f"![{self.words(2)}](/images/image{self.random.randrange(self.images)}.png)")
+            elif roll < self.link_density + 0.05:
+                pieces.append(f"**{self.words(2)}**")
+            elif roll < self.link_density + 0.1:
+                pieces.append(f"_{self.words(1)}_")
+            elif roll < self.link_density + 0.13:
+                pieces.append(f"`{self.words(1)}`")
+            else:
+                pieces.append(self.random.choice(WORDS))
+
+        return " ".join(pieces)
+
+    def block(self, block_type):
+
+        match block_type:
+            case "paragraph":
+                return "\n".join(self.inline_text(12) for _ in range(self.random.randint(1, 4)))
+            case "heading":
+                return "#" * self.random.randint(2, 4) + " " + self.inline_text(4)
+            case "code":
+                return "```\n" + "\n".join(f"    {self.words(5)}" for _ in range(self.random.randint(2, 8))) + "\n```"
+            case "quote":
+                return "\n".join("> " + self.inline_text(8) for _ in range(self.random.randint(1, 4)))
+            case "unordered_list":
+                return "\n".join("- " + self.inline_text(6) for _ in range(self.random.randint(2, 6)))
+            case "ordered_list":
+                return "\n".join(f"{idx + 1}. " + self.inline_text(6) for idx in range(self.random.randint(2, 6)))
+            case _:
+                raise ValueError(f"unknown block type {block_type}")
+
+    def page(self, idx):
+
+        block_types = list(self.block_mix)
+        weights = [self.block_mix[block_type] for block_type in block_types]
+
+        blocks = [f"# Page {idx} {self.words(3)}"]
+        for block_type in self.random.choices(block_types, weights, k=self.blocks_per_page):
+            blocks.append(self.block(block_type))
+
+        return "\n\n".join(blocks) + "\n"
+
+    def write(self, root, template_path="template.html", stylesheet_path="static/index.css"):
+
+        # root gets the same layout as the repository: content/, static/ and template.html
+        if os.path.exists(root):
+            shutil.rmtree(root)
+
+        for idx in range(self.pages):
+            page_dir = f"{root}/content/{self.page_dir(idx)}"
+            os.makedirs(page_dir)
+            with open(f"{page_dir}/index.md", 'w') as file:
+                file.write(self.page(idx))
+
+        with open(f"{root}/content/index.md", 'w') as file:
+            file.write(self.page(self.pages))
+
+        os.makedirs(f"{root}/static/images")
+        shutil.copy(stylesheet_path, f"{root}/static/index.css")
+        shutil.copy(template_path, f"{root}/template.html")
+
+        for idx in range(self.images):
+            with open(f"{root}/static/images/image{idx}.png", 'wb') as file:
+                file.write(png_bytes(16 + idx, 16 + idx, seed=self.seed + idx))
+
+        return root
@@ -0,0 +1,103 @@
+from htmlnode import PRESERVE_WHITESPACE_TAGS, ParentNode, props_to_html
+
+# a layout measured against the node tree by bench_nodes.py, the build itself renders the tree
+class FlatDocument():
+
+    # one entry per node in document order, spread over parallel lists instead of one object per node.
+    # parents have a value of None, subtree_ends[idx] is one past the last descendant of node idx
+    __slots__ = ("tags", "values", "props", "subtree_ends")
+
+    def __init__(self):
+        self.tags = []
+        self.values = []
+        self.props = []
+        self.subtree_ends = []
+
+    def __len__(self):
+        return len(self.tags)
+
+    def __repr__(self):
+        return f"FlatDocument({len(self)} nodes)"
+
+    @classmethod
+    def from_node(cls, root):
+
+        document = cls()
+        stack = [root]
+
+        while stack:
+            node = stack.pop()
+
+            # an int on the stack marks the point where the subtree of that parent index is complete
+            if isinstance(node, int):
+                document.subtree_ends[node] = len(document.tags)
+                continue
+
+            idx = len(document.tags)
+            document.tags.append(node.tag)
+            document.props.append(node.props)
+
+            if isinstance(node, ParentNode):
+                document.values.append(None)
+                document.subtree_ends.append(None)
+                stack.append(idx)
+                stack.extend(reversed(node.children))
+            else:
+                document.values.append(node.value)
+                document.subtree_ends.append(idx + 1)
+
+        return document
+
+    def children(self, idx):
+
+        child_idx = idx + 1
+        while child_idx < self.subtree_ends[idx]:
+            yield child_idx
+            child_idx = self.subtree_ends[child_idx]
+
+    def iter_html(self, rewrite_url=None, minifier=None):
+
+        tags, values, props, subtree_ends = self.tags, self.values, self.props, self.subtree_ends
+        open_parents = []
+
+        # while inside a preserved element, minifying is off until the index where its subtree ends
+        node_minifier = minifier
+        preserve_end = None
+
+        for idx in range(len(tags)):
+            while open_parents and subtree_ends[open_parents[-1]] == idx:
+                yield f"</{tags[open_parents.pop()]}>"
+
+            if idx == preserve_end:
+                node_minifier = minifier
+                preserve_end = None
+
+            tag = tags[idx]
+            value = values[idx]
+
+            if node_minifier is not None and tag in PRESERVE_WHITESPACE_TAGS:
+                node_minifier = None
+                preserve_end = subtree_ends[idx]
+
+            if value is None:
+                yield f"<{tag}{props_to_html(props[idx], rewrite_url, node_minifier)}>"
+                open_parents.append(idx)
+                continue
+
+            if node_minifier is not None:
+                value = node_minifier.text(value)
+
+            if tag is None:
+                yield value
+            else:
+                yield f"<{tag}{props_to_html(props[idx], rewrite_url, node_minifier)}>{value}</{tag}>"
+
+        while open_parents:
+            yield f"</{tags[open_parents.pop()]}>"
+
+    def to_html(self, rewrite_url=None, minifier=None):
+        return "".join(self.iter_html(rewrite_url, minifier))
+
+    def write_to(self, fp, rewrite_url=None, minifier=None):
+        for chunk in self.iter_html(rewrite_url, minifier):
+            fp.write(chunk)
@@ -0,0 +1,156 @@
+import argparse, http.client, os, subprocess, sys, threading, time
+from urllib.parse import quote
+
+# serving a built site the way a browser loads it: several keep-alive connections, each asking for
+# the site's files one after another, optionally with gzip and with the validators of earlier answers
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def site_paths(directory):
+
+    # every file a browser could ask for, pages by their directory url like the links to them
+    paths = []
+    for dirpath, _, filenames in os.walk(directory):
+        for filename in sorted(filenames):
+            if filename.endswith(".gz"):
+                continue
+            relative_path = os.path.relpath(os.path.join(dirpath, filename), directory).replace(os.sep, "/")
+            if relative_path == "index.html":
+                relative_path = ""
+            elif relative_path.endswith("/index.html"):
+                relative_path = relative_path[:-len("index.html")]
+            paths.append("/" + quote(relative_path))
+
+    return sorted(paths)
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+class Client():
+
+    def __init__(self, host, port, paths, requests, gzip, revalidate):
+        self.host = host
+        self.port = port
+        self.paths = paths
+        self.requests = requests
+        self.gzip = gzip
+        self.revalidate = revalidate
+        self.latencies = []
+        self.statuses = {}
+        self.bytes_received = 0
+        self.connections = 0
+        self.error = None
+
+    def run(self):
+
+        etags = {}
+        connection = None
+        try:
+            for index in range(self.requests):
+                if connection is None:
+                    connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+                    self.connections += 1
+
+                path = self.paths[index % len(self.paths)]
+                headers = {}
+                if self.gzip:
+                    headers["Accept-Encoding"] = "gzip"
+                if self.revalidate and path in etags:
+                    headers["If-None-Match"] = etags[path]
+
+                start = time.perf_counter()
+                connection.request("GET", path, headers=headers)
+                response = connection.getresponse()
+                body = response.read()
+                self.latencies.append(time.perf_counter() - start)
+
+                self.statuses[response.status] = self.statuses.get(response.status, 0) + 1
+                self.bytes_received += len(body)
+                if response.getheader("ETag") is not None:
+                    etags[path] = response.getheader("ETag")
+
+                # a server that doesn't keep the connection open costs a new one per request
+                if response.will_close:
+                    connection.close()
+                    connection = None
+        except (OSError, http.client.HTTPException) as exception:
+            self.error = f"{type(exception).__name__}: {exception}"
+        finally:
+            if connection is not None:
+                connection.close()
+
+def start_server(directory, port):
+
+    command = [sys.executable, os.path.join(ROOT_DIR, "src", "main.py"), "serve", "--directory", directory, "--port", str(port), "--quiet"]
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+
+    # wait for the port to accept connections
+    for _ in range(100):
+        try:
+            connection = http.client.HTTPConnection("localhost", port, timeout=1)
+            connection.request("HEAD", "/")
+            connection.getresponse().read()
+            connection.close()
+            return process
+        except OSError:
+            time.sleep(0.05)
+
+    process.terminate()
+    raise RuntimeError(f"server on port {port} did not start")
+
+def main(argv):
+
+    parser = argparse.ArgumentParser(prog="python3 -m benchmarks.load_test", description="Load test the local static server")
+    parser.add_argument("--directory", default="docs/", help="built site, its files are the requested urls")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8889)
+    parser.add_argument("--external", action="store_true", help="test a server that is already running instead of starting one")
+    parser.add_argument("--connections", type=int, default=8, help="concurrent keep-alive connections")
+    parser.add_argument("--requests", type=int, default=500, help="requests per connection")
+    parser.add_argument("--gzip", action="store_true", help="send Accept-Encoding: gzip")
+    parser.add_argument("--revalidate", action="store_true", help="send If-None-Match with the ETag of an earlier answer, like a warm browser cache")
+    args = parser.parse_args(argv)
+
+    paths = site_paths(args.directory)
+    if not paths:
+        print(f"no files in {args.directory}")
+        return 1
+
+    process = None if args.external else start_server(args.directory, args.port)
+    try:
+        clients = [Client(args.host, args.port, paths, args.requests, args.gzip, args.revalidate) for _ in range(args.connections)]
+        threads = [threading.Thread(target=client.run) for client in clients]
+
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    latencies = sorted(latency for client in clients for latency in client.latencies)
+    statuses = {}
+    for client in clients:
+        for status, count in client.statuses.items():
+            statuses[status] = statuses.get(status, 0) + count
+
+    print(f"{len(paths)} urls, {args.connections} connections, {len(latencies)} requests in {elapsed:.2f} s")
+    print(f"{len(latencies) / elapsed:10.1f} requests/s")
+    print(f"{sum(client.bytes_received for client in clients) / elapsed / 1024 / 1024:10.2f} MB/s received")
+    print(f"latency p50 {percentile(latencies, 0.5) * 1000:.2f} ms, p90 {percentile(latencies, 0.9) * 1000:.2f} ms, p99 {percentile(latencies, 0.99) * 1000:.2f} ms")
+    print(f"statuses {dict(sorted(statuses.items()))}, {sum(client.connections for client in clients)} connections opened")
+
+    errors = [client.error for client in clients if client.error is not None]
+    for error in errors:
+        print(f"error: {error}")
+
+    return 1 if errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,138 @@
+import contextlib, io, os, shutil, sys, time
+
+from markdown import BlockType, markdown_to_blocks, block_to_block_type
+from markdown_interpreter import markdown_to_html_node, extract_text_from_quote_block, extract_items_from_list
+from page_generator import collect_pages, target_path
+from search_index import SearchIndex, term_counts, write_search_index
+from template import load_template
+from textnode import text_to_textnodes
+
+import main as site_main
+
+def best_of(repeat, function):
+
+    # the fastest run is the least disturbed by whatever else the machine is doing
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+
+    return min(timings)
+
+def inline_texts(block, block_type):
+
+    match block_type:
+        case BlockType.PARAGRAPH:
+            return [block]
+        case BlockType.HEADING:
+            return [block.split(" ", 1)[1]]
+        case BlockType.QUOTE:
+            return [extract_text_from_quote_block(block)]
+        case BlockType.UNORDERED_LIST | BlockType.ORDERED_LIST:
+            return extract_items_from_list(block, block_type)
+        case _:
+            return []
+
+@contextlib.contextmanager
+def site_directory(root, argv):
+
+    # main() works on paths relative to the working directory and prints per page
+    previous_dir, previous_argv = os.getcwd(), sys.argv
+    os.chdir(root)
+    sys.argv = argv
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield
+    finally:
+        os.chdir(previous_dir)
+        sys.argv = previous_argv
+
+# queries per timing of the search stage, spread over the corpus vocabulary
+SEARCH_QUERIES = 50
+
+def search_queries(documents):
+
+    # single terms and pairs of terms that occur on the site, picked evenly from the sorted vocabulary
+    vocabulary = sorted({term for _, _, counts in documents for term in counts})
+    if not vocabulary:
+        return []
+
+    step = max(1, len(vocabulary) // SEARCH_QUERIES)
+    terms = vocabulary[::step][:SEARCH_QUERIES]
+    return [term if index % 2 == 0 else f"{term} {terms[index - 1]}" for index, term in enumerate(terms)]
+
+def run_stages(root, repeat=3):
+
+    pages = collect_pages(f"{root}/content/", f"{root}/bench_output/")
+    markdowns = []
+    for src_file, _ in pages:
+        with open(src_file, 'r') as file:
+            markdowns.append(file.read())
+
+    blocks = [block for markdown in markdowns for block in markdown_to_blocks(markdown)]
+    typed_blocks = [(block, block_to_block_type(block)) for block in blocks]
+    texts = [text for block, block_type in typed_blocks for text in inline_texts(block, block_type)]
+    html_nodes = [markdown_to_html_node(markdown) for markdown in markdowns]
+    template = load_template(f"{root}/template.html", "/")
+
+    page_words = []
+    for markdown in markdowns:
+        words = []
+        markdown_to_html_node(markdown, words=words)
+        page_words.append(words)
+
+    search_dir = f"{root}/bench_output/search/"
+    documents = [(f"/page-{index}/", "Benchmark", term_counts(words)) for index, words in enumerate(page_words)]
+    queries = search_queries(documents)
+
+    def write_index():
+        # from scratch every time, write_if_changed would otherwise skip the unchanged shards
+        shutil.rmtree(search_dir, ignore_errors=True)
+        with contextlib.redirect_stdout(io.StringIO()):
+            write_search_index(documents, search_dir)
+
+    def run_queries():
+        # a fresh index per run, so shard loading is timed like a browser's first queries
+        search_index = SearchIndex(search_dir)
+        for query in queries:
+            search_index.search(query)
+
+    def fill_and_write():
+        for (src_file, dest_folder), html_node in zip(pages, html_nodes):
+            os.makedirs(dest_folder, exist_ok=True)
+            with open(target_path(src_file, dest_folder), 'w') as file:
+                template.write_to(file, Title="Benchmark", Content=html_node)
+
+    def end_to_end():
+        with site_directory(root, ["main.py", "/"]):
+            site_main.main()
+
+    stages = {
+        "markdown_to_blocks": lambda: [markdown_to_blocks(markdown) for markdown in markdowns],
+        "block_to_block_type": lambda: [block_to_block_type(block) for block in blocks],
+        "text_to_textnodes": lambda: [text_to_textnodes(text) for text in texts],
+        "to_html_node": lambda: [markdown_to_html_node(markdown) for markdown in markdowns],
+        "to_html": lambda: [html_node.to_html() for html_node in html_nodes],
+        "template_fill_and_write": fill_and_write,
+        "search_term_counts": lambda: [term_counts(words) for words in page_words],
+        "search_index_write": write_index,
+        "search_queries": run_queries,
+        "main": end_to_end,
+    }
+
+    timings = {name: best_of(repeat, stage) for name, stage in stages.items()}
+
+    search_files = os.listdir(search_dir)
+    counts = {
+        "pages": len(pages),
+        "blocks": len(blocks),
+        "inline_texts": len(texts),
+        "markdown_bytes": sum(len(markdown.encode()) for markdown in markdowns),
+        "search_terms": len({term for _, _, counts in documents for term in counts}),
+        "search_shards": len(search_files) - 2,
+        "search_index_bytes": sum(os.path.getsize(search_dir + name) for name in search_files),
+        "search_queries": len(queries),
+    }
+
+    return timings, counts
@@ -0,0 +1,47 @@
+import unittest
+
+from benchmarks.flat_document import FlatDocument
+from htmlnode import LeafNode, Minifier, ParentNode
+from markdown_interpreter import markdown_to_html_node
+
+class TestFlatDocument(unittest.TestCase):
+
+    def test_matches_tree(self):
+        md = """
+# Heading with [a link](/x)
+
+Some **bold** and ![an image](/images/a.png)
+
+- one
+- two _italic_
+"""
+        node = markdown_to_html_node(md)
+        document = FlatDocument.from_node(node)
+        self.assertEqual(document.to_html(), node.to_html())
+
+    def test_children(self):
+        node = ParentNode("div", [ParentNode("p", [LeafNode(None, "a"), LeafNode("b", "b")]), LeafNode("i", "c")])
+        document = FlatDocument.from_node(node)
+
+        self.assertEqual(len(document), 5)
+        self.assertEqual(list(document.children(0)), [1, 4])
+        self.assertEqual(list(document.children(1)), [2, 3])
+
+    def test_nested_closing_tags(self):
+        node = ParentNode("div", [ParentNode("ul", [ParentNode("li", [LeafNode(None, "x")])]), LeafNode(None, "y")])
+        self.assertEqual(FlatDocument.from_node(node).to_html(), "<div><ul><li>x</li></ul>y</div>")
+
+
+    def test_minified_matches_tree(self):
+        node = ParentNode("div", [
+            LeafNode(None, "a   b"),
+            ParentNode("pre", [LeafNode("code", "x  =  1\n  y")]),
+            LeafNode("a", "c  d", {"href": "/e"}),
+        ])
+        document = FlatDocument.from_node(node)
+
+        self.assertEqual(document.to_html(None, Minifier()), node.to_html(None, Minifier()))
+
+
+if __name__ == "__main__":
+    unittest.main()
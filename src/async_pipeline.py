@@ -0,0 +1,99 @@
+import asyncio, os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from file_manager import write_output
+from page_generator import PageResult, render_markdown_job, render_pages, report_render_results, target_path
+
+# reads and writes run in threads, so a slow disk or network filesystem stalls a thread instead of the renderer
+IO_WORKERS = 4
+# pages read but not rendered yet, and rendered but not written yet, wait in queues of this size, which
+# caps the memory the pipeline holds no matter how many pages there are
+QUEUE_SIZE = 16
+
+def read_text(path):
+    with open(path, 'r') as file:
+        return file.read()
+
+def write_text(path, text):
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    write_output(path, lambda file: file.write(text))
+
+async def read_pages(pages, rendering, results, io_pool, render_workers):
+
+    loop = asyncio.get_running_loop()
+    for index, (src_file, dest_folder) in enumerate(pages):
+        target_file = target_path(src_file, dest_folder)
+        try:
+            markdown = await loop.run_in_executor(io_pool, read_text, src_file)
+        except Exception as exception:
+            # an unreadable or undecodable page fails on its own, the rest of the build goes on
+            results[index] = PageResult(src_file, target_file, [], f"{type(exception).__name__}: {exception}")
+            continue
+        await rendering.put((index, src_file, target_file, markdown))
+
+    for _ in range(render_workers):
+        await rendering.put(None)
+
+async def render_worker(rendering, writing, results, render_pool, options):
+
+    loop = asyncio.get_running_loop()
+    while True:
+        item = await rendering.get()
+        if item is None:
+            return
+
+        index, src_file, target_file, markdown = item
+        result, page_html = await loop.run_in_executor(render_pool, render_markdown_job, (src_file, target_file, markdown, options))
+        results[index] = result
+        if page_html is not None:
+            await writing.put((result, page_html))
+
+async def write_worker(writing, io_pool):
+
+    loop = asyncio.get_running_loop()
+    while True:
+        item = await writing.get()
+        if item is None:
+            return
+
+        result, page_html = item
+        try:
+            await loop.run_in_executor(io_pool, write_text, result.target_file, page_html)
+        except Exception as exception:
+            result.error = f"{type(exception).__name__}: {exception}"
+
+async def render_pages_pipelined(pages, options, jobs=1, io_workers=IO_WORKERS, queue_size=QUEUE_SIZE):
+
+    # read -> render -> write, each stage working on a different page at the same time
+    rendering = asyncio.Queue(queue_size)
+    writing = asyncio.Queue(queue_size)
+    results = [None] * len(pages)
+
+    # a single render thread still overlaps with the i/o threads, the GIL is released while they wait on the disk
+    render_workers = max(1, jobs)
+    render_pool = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else ThreadPoolExecutor(max_workers=1)
+
+    with render_pool, ThreadPoolExecutor(max_workers=io_workers) as io_pool:
+        writers = [asyncio.create_task(write_worker(writing, io_pool)) for _ in range(io_workers)]
+
+        await asyncio.gather(
+            read_pages(pages, rendering, results, io_pool, render_workers),
+            *(render_worker(rendering, writing, results, render_pool, options) for _ in range(render_workers)),
+        )
+
+        for _ in range(io_workers):
+            await writing.put(None)
+        await asyncio.gather(*writers)
+
+    return results
+
+def render_pages_async(pages, options, jobs=1):
+
+    # same signature and results as render_pages, so either can drive a build
+    if options.profile:
+        # profiling times the read and write of each page in line with its rendering
+        return render_pages(pages, options, jobs)
+
+    results = asyncio.run(render_pages_pipelined(pages, options, jobs))
+    return report_render_results(results, options)
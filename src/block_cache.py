@@ -0,0 +1,127 @@
+import hashlib, marshal, os, zlib
+from collections import OrderedDict
+
+from build_manifest import CACHE_DIR
+from htmlnode import Minifier
+from markdown import scan_markdown_links
+from markdown_interpreter import block_to_html_node
+
+BLOCK_CACHE_PATH = CACHE_DIR + "blocks.bin"
+
+# bump whenever block rendering changes, old fragments would otherwise be served as current
+BLOCK_CACHE_FORMAT = 6
+
+class BlockCache():
+
+    def __init__(self, context, max_entries=100_000):
+        # context holds every render setting that ends up in the html, e.g. the basepath urls are rewritten for
+        self.context = context
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.new_entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self):
+        return f"BlockCache({len(self.entries)} entries, {self.hits} hits, {self.misses} misses)"
+
+    def __len__(self):
+        return len(self.entries)
+
+    def key(self, block, block_type, extra=""):
+        return hashlib.blake2b(f"{block_type.value}\0{block}\0{extra}".encode(), digest_size=16).digest()
+
+    def store(self, key, entry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def render(self, block, block_type, rewrite_url=None, links=None, minifier=None, images=None, words=None):
+
+        # entries are (html, links, bytes saved by minifying, text) so a hit still reports the block's
+        # link targets, savings and searchable text, whether fragments are minified is part of the context
+        # what the block's urls are rewritten to, e.g. fingerprinted asset names, is part of its html
+        markdown_links = list(scan_markdown_links(block))
+        extra = ""
+        if rewrite_url is not None:
+            extra = "".join(f"{rewrite_url(match.url)}\0" for match in markdown_links)
+        if images is not None:
+            extra += images.signature(match.url for match in markdown_links if match.kind == "image")
+
+        key = self.key(block, block_type, extra)
+        entry = self.entries.get(key)
+
+        if entry is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+        else:
+            self.misses += 1
+            block_links = []
+            block_words = []
+            block_minifier = None if minifier is None else Minifier()
+            html = block_to_html_node(block, block_type, block_links, images, block_words).to_html(rewrite_url, block_minifier)
+            entry = (html, tuple(block_links), 0 if block_minifier is None else block_minifier.saved, tuple(block_words))
+            self.store(key, entry)
+            self.new_entries[key] = entry
+
+        if links is not None:
+            links.extend(entry[1])
+        if minifier is not None:
+            minifier.saved += entry[2]
+        if words is not None:
+            words.extend(entry[3])
+
+        return entry[0]
+
+    def drain_new_entries(self):
+
+        # fragments rendered since the last call, a pool worker hands these back to the parent process
+        new_entries = self.new_entries
+        self.new_entries = {}
+        return new_entries
+
+    def merge(self, entries):
+        for key, entry in entries.items():
+            self.store(key, entry)
+
+    def load(self, cache_path=BLOCK_CACHE_PATH):
+
+        try:
+            with open(cache_path, 'rb') as file:
+                cache_format, context, entries = marshal.loads(zlib.decompress(file.read()))
+        except (FileNotFoundError, ValueError, EOFError, TypeError, zlib.error):
+            return
+
+        # fragments rendered for another basepath or by an older renderer are useless here
+        if cache_format != BLOCK_CACHE_FORMAT or context != self.context:
+            return
+
+        for key, entry in entries:
+            self.store(key, entry)
+
+    def save(self, cache_path=BLOCK_CACHE_PATH):
+
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        data = zlib.compress(marshal.dumps((BLOCK_CACHE_FORMAT, self.context, list(self.entries.items()))))
+
+        temp_path = cache_path + ".tmp"
+        with open(temp_path, 'wb') as file:
+            file.write(data)
+        os.replace(temp_path, cache_path)
+
+_process_block_caches = {}
+
+def get_block_cache(cache_path, context):
+
+    # one cache per process and context, loaded from disk the first time a page needs it
+    key = (cache_path, context)
+    block_cache = _process_block_caches.get(key)
+
+    if block_cache is None:
+        block_cache = BlockCache(context)
+        if cache_path is not None:
+            block_cache.load(cache_path)
+        _process_block_caches[key] = block_cache
+
+    return block_cache
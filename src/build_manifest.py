@@ -0,0 +1,70 @@
+import hashlib, json, os
+
+from markdown import extract_markdown_images, extract_markdown_links
+
+CACHE_DIR = ".cache/"
+MANIFEST_PATH = CACHE_DIR + "build_manifest.json"
+
+def hash_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+def hash_file(path):
+    try:
+        with open(path, 'rb') as file:
+            return hash_bytes(file.read())
+    except FileNotFoundError:
+        return None
+
+def load_manifest(manifest_path=MANIFEST_PATH):
+    try:
+        with open(manifest_path, 'r') as file:
+            manifest = json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        manifest = {}
+
+    manifest.setdefault("template", None)
+    manifest.setdefault("basepath", None)
+    manifest.setdefault("render", None)
+    manifest.setdefault("pages", {})
+    manifest.setdefault("assets", {})
+    manifest.setdefault("compressed", {})
+    manifest.setdefault("images", {})
+    manifest.setdefault("fingerprints", {})
+
+    return manifest
+
+def save_manifest(manifest, manifest_path=MANIFEST_PATH):
+    os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+
+    # write next to the real manifest first so an interrupted build never leaves a truncated file
+    temp_path = manifest_path + ".tmp"
+    with open(temp_path, 'w') as file:
+        json.dump(manifest, file, indent=1, sort_keys=True)
+    os.replace(temp_path, manifest_path)
+
+def referenced_static_files(markdown, static_dir, asset_paths):
+
+    # asset_paths is the set of static file paths from the site inventory, so no file is stat'ed here
+    static_files = set()
+
+    for _, url in extract_markdown_images(markdown) + extract_markdown_links(markdown):
+        if not url.startswith("/"):
+            continue
+
+        static_path = static_dir + url[1:]
+        if static_path in asset_paths:
+            static_files.add(static_path)
+
+    return sorted(static_files)
+
+def page_input_hash(markdown_bytes, template_hash, basepath, static_hashes):
+
+    digest = hashlib.sha256()
+    for part in (hash_bytes(markdown_bytes), template_hash, basepath):
+        digest.update(str(part).encode())
+        digest.update(b"\0")
+
+    for static_path, static_hash in static_hashes:
+        digest.update(f"{static_path}={static_hash}\0".encode())
+
+    return digest.hexdigest()
@@ -0,0 +1,118 @@
+import os, zlib
+from concurrent.futures import ProcessPoolExecutor
+
+from build_manifest import MANIFEST_PATH, load_manifest, save_manifest
+from inventory import scan_files
+
+COMPRESSIBLE_SUFFIXES = (".html", ".css", ".js", ".json", ".xml", ".svg", ".txt")
+
+def gzip_bytes(data):
+
+    # wbits 31 makes zlib write a gzip header, its mtime field is zero so identical input gives identical output
+    compressor = zlib.compressobj(9, zlib.DEFLATED, 31, 9)
+    return compressor.compress(data) + compressor.flush()
+
+def compress_file(path):
+
+    with open(path, 'rb') as file:
+        data = file.read()
+
+    compressed = gzip_bytes(data)
+    gzip_path = path + ".gz"
+
+    # a sibling that isn't smaller only costs the server a lookup and the client a decompression
+    if len(compressed) >= len(data):
+        if os.path.exists(gzip_path):
+            os.remove(gzip_path)
+        return path, len(data), None
+
+    temp_file = gzip_path + ".sync-tmp"
+    with open(temp_file, 'wb') as file:
+        file.write(compressed)
+
+    # same mtime as the plain file, so both answer with the same Last-Modified
+    stat = os.stat(path)
+    os.utime(temp_file, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    os.replace(temp_file, gzip_path)
+
+    return path, len(data), len(compressed)
+
+def compress_files(paths, jobs=1):
+
+    if jobs <= 1 or len(paths) <= 1:
+        return [compress_file(path) for path in paths]
+
+    chunksize = max(1, len(paths) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(compress_file, paths, chunksize=chunksize))
+
+def compress_directory(target_dir, previous_records, jobs=1):
+
+    # previous_records maps output paths relative to target_dir to [size, mtime_ns] when they were last
+    # compressed, pages and assets the build left untouched keep their stat and are not compressed again
+    records = {}
+    outdated = []
+    output_files = scan_files(target_dir, "output")
+    output_paths = {output_file.path for output_file in output_files}
+
+    for output_file in output_files:
+        if output_file.path.endswith(".gz"):
+            # the plain file was removed, e.g. a page whose markdown is gone
+            if output_file.path[:-3] not in output_paths:
+                os.remove(output_file.path)
+            continue
+
+        if not output_file.path.endswith(COMPRESSIBLE_SUFFIXES):
+            continue
+
+        record = [output_file.size, output_file.mtime_ns]
+        previous = previous_records.get(output_file.relative_path)
+        if previous is not None and previous[:2] == record and (previous[2] is None or output_file.path + ".gz" in output_paths):
+            records[output_file.relative_path] = previous
+            continue
+
+        records[output_file.relative_path] = record
+        outdated.append(output_file.path)
+
+    results = compress_files(outdated, jobs)
+
+    for path, size, compressed_size in results:
+        records[path[len(target_dir):]].append(compressed_size)
+
+    return records, results
+
+def compress_public_directory(target_dir, jobs=1, manifest_path=MANIFEST_PATH):
+
+    manifest = load_manifest(manifest_path)
+    records, results = compress_directory(target_dir, manifest["compressed"], jobs)
+
+    manifest["compressed"] = records
+    save_manifest(manifest, manifest_path)
+
+    written = [result for result in results if result[2] is not None]
+    plain_size = sum(size for _, size, _ in written)
+    gzip_size = sum(compressed_size for _, _, compressed_size in written)
+    print(f"Compressed {len(written)} of {len(records)} files, {len(results) - len(written)} not smaller, {plain_size} bytes to {gzip_size} bytes")
+
+    return results
+
+def remove_compressed_files(target_dir, manifest_path=MANIFEST_PATH):
+
+    # a build without --gzip rewrites pages without their siblings, every sibling the records know of
+    # goes so none of them outlives the page it was compressed from
+    manifest = load_manifest(manifest_path)
+    if not manifest["compressed"]:
+        return 0
+
+    removed = 0
+    for relative_path in manifest["compressed"]:
+        gzip_path = target_dir + relative_path + ".gz"
+        if os.path.exists(gzip_path):
+            os.remove(gzip_path)
+            removed += 1
+
+    manifest["compressed"] = {}
+    save_manifest(manifest, manifest_path)
+
+    print(f"Removed {removed} compressed files, --gzip is off")
+    return removed
@@ -1,23 +1,204 @@
 import os, shutil
 
-def initialize_public_directory(dir):
+from build_manifest import MANIFEST_PATH, load_manifest, save_manifest, hash_file
+from inventory import scan_files
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# ioctl request number of FICLONE on Linux, shares the source's extents on btrfs, xfs and similar
+FICLONE = 0x40049409
+
+def initialize_public_directory(dir, clean=True, use_hash=False, hardlink=False, manifest_path=MANIFEST_PATH, inventory=None):
+
+    static_files = scan_files("static/", "asset") if inventory is None else inventory.assets
+
+    # incremental builds keep the previous output so unchanged pages can be reused
+    if not clean:
+        return sync_public_directory(static_files, "static/", dir, use_hash, hardlink, manifest_path)
+
     if os.path.exists(dir):
         shutil.rmtree(dir)
 
-    copy_directory("static/", dir)
+    # the recorded pages and compressed files went with the old output, the next incremental build
+    # must not skip a page this build rendered with other settings
+    manifest = load_manifest(manifest_path)
+    if manifest["pages"] or manifest["compressed"]:
+        manifest["pages"] = {}
+        manifest["compressed"] = {}
+        save_manifest(manifest, manifest_path)
+
+    copy_directory(static_files, dir)
+
+def write_if_changed(path, text):
+
+    # generated files that come out the same keep their mtime, so incremental steps after this skip them
+    try:
+        with open(path, 'r') as file:
+            if file.read() == text:
+                return False
+    except FileNotFoundError:
+        pass
+
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".tmp", 'w') as file:
+        file.write(text)
+    os.replace(path + ".tmp", path)
+    return True
+
+def files_equal(path, other_path, chunk_size=1 << 20):
+
+    try:
+        if os.stat(path).st_size != os.stat(other_path).st_size:
+            return False
+    except FileNotFoundError:
+        return False
+
+    with open(path, 'rb') as file, open(other_path, 'rb') as other_file:
+        while True:
+            chunk = file.read(chunk_size)
+            if chunk != other_file.read(chunk_size):
+                return False
+            if not chunk:
+                return True
+
+def replace_if_changed(temp_file, target_file):
+
+    # outputs are written next to their target and renamed over it, never written through, since the
+    # target may be a hard link into the published site. an identical target keeps its inode and mtime
+    if files_equal(temp_file, target_file):
+        os.remove(temp_file)
+        return False
+
+    os.replace(temp_file, target_file)
+    return True
+
+def write_output(target_file, write):
+
+    # write(file) fills a temporary file next to target_file, which then replaces it unless identical
+    try:
+        with open(target_file + ".tmp", 'w') as file:
+            write(file)
+    except Exception:
+        # don't leave a half written or outdated output behind for the next build to mistake as current
+        for leftover in (target_file + ".tmp", target_file):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+        raise
+
+    return replace_if_changed(target_file + ".tmp", target_file)
+
+def copy_directory(static_files, target_dir):
+
+    # static_files comes from the site inventory, so junk like *:Zone.Identifier is already filtered out
+    os.makedirs(target_dir, exist_ok=True)
+
+    for static_file in static_files:
+        target_file = target_dir + static_file.relative_path
+        os.makedirs(os.path.dirname(target_file), exist_ok=True)
+        shutil.copy(static_file.path, target_file)
+
+def copy_file_data(source_file, target_file):
+
+    with open(source_file, 'rb') as source, open(target_file, 'wb') as target:
+        if fcntl is not None:
+            try:
+                fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+                return "reflink"
+            except OSError:
+                pass
+
+        try:
+            while os.copy_file_range(source.fileno(), target.fileno(), 1 << 30) > 0:
+                pass
+            return "copy_file_range"
+        except (AttributeError, OSError):
+            # not available on this platform or filesystem, start over with a plain copy
+            source.seek(0)
+            target.seek(0)
+            target.truncate()
+
+        shutil.copyfileobj(source, target)
+        return "copy"
+
+def sync_file(source_file, target_file, hardlink=False):
+
+    # the new file is built next to the target and renamed over it, so the target is never half written
+    # and a target that is a hard link of its source is replaced instead of written through
+    temp_file = target_file + ".sync-tmp"
+    if os.path.lexists(temp_file):
+        os.remove(temp_file)
+
+    method = None
+    if hardlink:
+        try:
+            os.link(source_file, temp_file)
+            method = "hardlink"
+        except OSError:
+            pass
+
+    if method is None:
+        method = copy_file_data(source_file, temp_file)
+        shutil.copystat(source_file, temp_file)
+
+    os.replace(temp_file, target_file)
+    return method
+
+def sync_directory(static_files, source_dir, target_dir, previous_records, use_hash=False, hardlink=False):
+
+    # previous_records maps paths relative to source_dir to [size, mtime_ns, hash] from the last sync
+    records = {}
+    changed = []
+
+    for static_file in static_files:
+        relative_path = static_file.relative_path
+        source_file = static_file.path
+        target_file = target_dir + relative_path
+
+        previous = previous_records.get(relative_path)
+        record = [static_file.size, static_file.mtime_ns, None]
+
+        if previous is not None and os.path.exists(target_file):
+            if previous[:2] == record[:2]:
+                records[relative_path] = previous
+                continue
+
+            # touched but not modified, e.g. by a checkout, the hash tells the copy can be skipped
+            if use_hash and previous[2] is not None:
+                record[2] = hash_file(source_file)
+                if record[2] == previous[2]:
+                    records[relative_path] = record
+                    continue
+
+        if use_hash and record[2] is None:
+            record[2] = hash_file(source_file)
+
+        os.makedirs(os.path.dirname(target_file), exist_ok=True)
+        method = sync_file(source_file, target_file, hardlink)
+        print(f"Copied {source_file} to {target_file} ({method})")
+
+        records[relative_path] = record
+        changed.append(target_file)
+
+    # assets that were synced last time but are no longer in the source directory
+    for relative_path in previous_records.keys() - records.keys():
+        target_file = target_dir + relative_path
+        if os.path.exists(target_file):
+            print(f"Removing {target_file}, it is no longer in {source_dir}")
+            os.remove(target_file)
+
+    return records, changed
+
+def sync_public_directory(static_files, source_dir, target_dir, use_hash=False, hardlink=False, manifest_path=MANIFEST_PATH):
 
-def copy_directory(source_dir, target_dir):
-    
-    if not os.path.exists(target_dir):
-        os.mkdir(target_dir)
+    manifest = load_manifest(manifest_path)
+    records, changed = sync_directory(static_files, source_dir, target_dir, manifest["assets"], use_hash, hardlink)
 
-    # list contents of source dir
-    contents = os.listdir(source_dir)
+    manifest["assets"] = records
+    save_manifest(manifest, manifest_path)
 
-    for item_name in contents:
-        if os.path.isfile(source_dir + item_name):
-            shutil.copy(source_dir + item_name, target_dir)
-        else:
-            new_source_dir = f"{source_dir}{item_name}/"
-            new_target_dir = f"{target_dir}{item_name}/"
-            copy_directory(new_source_dir, new_target_dir)
+    print(f"{len(changed)} of {len(records)} static files copied")
+    return changed
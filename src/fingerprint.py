@@ -0,0 +1,118 @@
+import json, os
+
+from build_manifest import MANIFEST_PATH, hash_bytes, hash_file, load_manifest, save_manifest
+from file_manager import write_if_changed
+
+ASSET_MANIFEST_FILE = "asset-manifest.json"
+FINGERPRINT_LENGTH = 10
+
+class AssetManifest():
+
+    # maps the url of every static asset to the url of its fingerprinted copy, kept to plain values
+    # so it pickles into the render pool
+    def __init__(self, urls):
+        self.urls = urls
+        self.version = hash_bytes(json.dumps(urls, sort_keys=True).encode())[:16]
+
+    def __repr__(self):
+        return f"AssetManifest({len(self.urls)} assets, {self.version})"
+
+    def rewrite(self, url):
+
+        # a query or fragment stays attached to the fingerprinted url
+        split_at = min((index for index in (url.find("?"), url.find("#")) if index != -1), default=len(url))
+        path = url[:split_at]
+        return self.urls.get(path, path) + url[split_at:]
+
+def fingerprinted_path(relative_path, content_hash):
+
+    directory, _, filename = relative_path.rpartition("/")
+    stem, dot, extension = filename.rpartition(".")
+    if not dot or not stem:
+        stem, extension = filename, ""
+
+    fingerprinted = f"{stem}.{content_hash[:FINGERPRINT_LENGTH]}" + (f".{extension}" if extension else "")
+    return f"{directory}/{fingerprinted}" if directory else fingerprinted
+
+def link_or_copy(source_file, target_file):
+
+    if os.path.lexists(target_file):
+        os.remove(target_file)
+
+    # the fingerprinted name shares the copied asset's data instead of duplicating it
+    try:
+        os.link(source_file, target_file)
+    except OSError:
+        with open(source_file, 'rb') as source, open(target_file, 'wb') as target:
+            target.write(source.read())
+
+def fingerprint_assets(static_files, target_dir, previous_records):
+
+    # previous_records maps asset paths relative to the static dir to [size, mtime_ns, fingerprinted path]
+    # of the copy in target_dir, a copy with the same stat keeps its fingerprint without being hashed
+    records = {}
+    changed = []
+
+    for static_file in static_files:
+        target_file = target_dir + static_file.relative_path
+        try:
+            target_stat = os.stat(target_file)
+        except FileNotFoundError:
+            continue
+
+        previous = previous_records.get(static_file.relative_path)
+        if previous is not None and previous[:2] == [target_stat.st_size, target_stat.st_mtime_ns] and os.path.exists(target_dir + previous[2]):
+            records[static_file.relative_path] = previous
+            continue
+
+        # the hash is of the file that is served, e.g. after PNG recompression
+        fingerprinted = fingerprinted_path(static_file.relative_path, hash_file(target_file))
+        link_or_copy(target_file, target_dir + fingerprinted)
+
+        records[static_file.relative_path] = [target_stat.st_size, target_stat.st_mtime_ns, fingerprinted]
+        changed.append(fingerprinted)
+
+    # copies whose content changed or whose asset is gone
+    current = {record[2] for record in records.values()}
+    for previous in previous_records.values():
+        stale_file = target_dir + previous[2]
+        if previous[2] not in current and os.path.exists(stale_file):
+            os.remove(stale_file)
+
+    return records, changed
+
+def fingerprint_public_assets(static_files, target_dir, manifest_path=MANIFEST_PATH):
+
+    manifest = load_manifest(manifest_path)
+    records, changed = fingerprint_assets(static_files, target_dir, manifest["fingerprints"])
+
+    manifest["fingerprints"] = records
+    save_manifest(manifest, manifest_path)
+
+    urls = {"/" + relative_path: "/" + record[2] for relative_path, record in sorted(records.items())}
+    write_if_changed(target_dir + ASSET_MANIFEST_FILE, json.dumps(urls, indent=1, sort_keys=True))
+
+    print(f"Fingerprinted {len(changed)} of {len(records)} static files")
+    return AssetManifest(urls)
+
+def remove_fingerprinted_assets(target_dir, manifest_path=MANIFEST_PATH):
+
+    # a build without --fingerprint links the plain names, copies left from an earlier build would
+    # still be served as immutable
+    manifest = load_manifest(manifest_path)
+    stale_files = [target_dir + record[2] for record in manifest["fingerprints"].values()]
+    stale_files.append(target_dir + ASSET_MANIFEST_FILE)
+
+    removed = 0
+    for stale_file in stale_files:
+        if os.path.exists(stale_file):
+            os.remove(stale_file)
+            removed += 1
+
+    if manifest["fingerprints"]:
+        manifest["fingerprints"] = {}
+        save_manifest(manifest, manifest_path)
+
+    if removed:
+        print(f"Removed {removed} fingerprinted files, --fingerprint is off")
+    return removed
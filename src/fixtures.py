@@ -0,0 +1,32 @@
+import os, tempfile, unittest
+
+# the smallest template a page renders into
+TEMPLATE = "<title>{{ Title }}</title>{{ Content }}"
+
+class TempDirTestCase(unittest.TestCase):
+
+    # every test works below self.root, a fresh directory that is removed again afterwards
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = self.temp_dir.name + "/"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write(self, path, text, mtime_offset=0):
+
+        # path is relative to self.root, an absolute path is used as it is. mtime_offset moves the mtime
+        # forward so checks by stat see a change even on coarse clocks
+        path = os.path.join(self.root, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb' if isinstance(text, bytes) else 'w') as file:
+            file.write(text)
+
+        if mtime_offset:
+            stat = os.stat(path)
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + mtime_offset))
+        return path
+
+    def read(self, path):
+        with open(os.path.join(self.root, path), 'r') as file:
+            return file.read()
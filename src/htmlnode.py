@@ -1,7 +1,63 @@
+import re, sys
+
+URL_PROPS = ("href", "src")
+
+# elements whose text is rendered as written, minifying never touches what is inside them
+PRESERVE_WHITESPACE_TAGS = frozenset(("pre", "code", "textarea", "script", "style"))
+
+# only ascii whitespace, a non-breaking space is content
+WHITESPACE_PATTERN = re.compile(r"[ \t\n\r\f]+")
+UNQUOTED_VALUE_PATTERN = re.compile(r"[^ \t\n\r\f\"'=<>`]+")
+
+class Minifier():
+
+    # passed down the serializer instead of a flag so it can count what it left out, everything it
+    # removes is ascii whitespace or quotes, so the count is exact in bytes
+    __slots__ = ("saved",)
+
+    def __init__(self):
+        self.saved = 0
+
+    def __repr__(self):
+        return f"Minifier({self.saved} saved)"
+
+    def text(self, value):
+        collapsed = WHITESPACE_PATTERN.sub(" ", value)
+        self.saved += len(value) - len(collapsed)
+        return collapsed
+
+    def attribute(self, name, value):
+        if UNQUOTED_VALUE_PATTERN.fullmatch(value):
+            self.saved += 2
+            return f" {name}={value}"
+        return f" {name}=\"{value}\""
+
+def props_to_html(props, rewrite_url=None, minifier=None):
+
+    if props is None:
+        return ""
+
+    item_strings = []
+    for item in props:
+        value = props[item]
+        # url props are rewritten while serializing so the finished page never needs another pass
+        if rewrite_url is not None and item in URL_PROPS:
+            value = rewrite_url(value)
+        if minifier is None:
+            item_strings.append(f" {item}=\"{value}\"")
+        else:
+            item_strings.append(minifier.attribute(item, value))
+
+    return "".join(item_strings)
+
 class HTMLNode():
 
+    # a long post allocates tens of thousands of nodes, slots keep each one to four pointers
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag=None, value=None, children=None, props=None):
-        self.tag = tag
+        # every node of a kind shares one tag string
+        self.tag = sys.intern(tag) if type(tag) is str else tag
         self.value = value
         self.children = children
         self.props = props
@@ -9,42 +65,61 @@ class HTMLNode():
     def __repr__(self):
         return f"HTMLNode({self.tag}, {self.value}, {self.children}, {self.props})"
 
-    def to_html(self):
+    def to_html(self, rewrite_url=None, minifier=None):
         raise NotImplementedError
-    
-    def props_to_html(self):
-        
-        if self.props is None:
-            return ""
 
-        item_strings = []
-        for item in self.props:
-            item_strings.append(f" {item}=\"{self.props[item]}\"")
+    def iter_html(self, rewrite_url=None, minifier=None):
+        yield self.to_html(rewrite_url, minifier)
 
-        return "".join(item_strings)
+    def write_to(self, fp, rewrite_url=None, minifier=None):
+        for chunk in self.iter_html(rewrite_url, minifier):
+            fp.write(chunk)
+    
+    def props_to_html(self, rewrite_url=None, minifier=None):
+        return props_to_html(self.props, rewrite_url, minifier)
     
 class ParentNode(HTMLNode):
 
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
         super().__init__(tag=tag, children=children, props=props)
 
-    def to_html(self):
-        if self.tag is None:
-            raise ValueError("tag is required")
-        if self.children is None:
-            raise ValueError("children is undefined")
-        
-        html_string_entries = []
-        for child in self.children:
-            html_string_entries.append(child.to_html())
+    def to_html(self, rewrite_url=None, minifier=None):
+        return "".join(self.iter_html(rewrite_url, minifier))
+
+    def iter_html(self, rewrite_url=None, minifier=None):
+
+        # pending nodes and closing tags live on an explicit stack, so deeply nested
+        # documents never hit the recursion limit and no subtree is built as a string
+        stack = [self]
+
+        while stack:
+            node = stack.pop()
 
-        children_html_string = "".join(html_string_entries)
+            if isinstance(node, str):
+                yield node
+            elif isinstance(node, ParentNode):
+                if node.tag is None:
+                    raise ValueError("tag is required")
+                if node.children is None:
+                    raise ValueError("children is undefined")
 
-        return f"<{self.tag}>{children_html_string}</{self.tag}>"
+                if minifier is not None and node.tag in PRESERVE_WHITESPACE_TAGS:
+                    yield from node.iter_html(rewrite_url)
+                    continue
+
+                yield f"<{node.tag}{node.props_to_html(rewrite_url, minifier)}>"
+                stack.append(f"</{node.tag}>")
+                stack.extend(reversed(node.children))
+            else:
+                yield node.to_html(rewrite_url, minifier)
     
 
 class LeafNode(HTMLNode):
 
+    __slots__ = ()
+
     def __init__(self, tag=None, value=None, props=None):
         if value is None:
             raise ValueError("all Leaf nodes must have a value")
@@ -53,11 +128,15 @@ class LeafNode(HTMLNode):
     def __repr__(self):
         return f"LeafNode({self.tag}, {self.value}, {self.props})"
 
-    def to_html(self):
+    def to_html(self, rewrite_url=None, minifier=None):
         if self.value is None:
             raise ValueError("all Leaf nodes must have a value")
+
+        if minifier is not None and self.tag in PRESERVE_WHITESPACE_TAGS:
+            minifier = None
+        value = self.value if minifier is None else minifier.text(self.value)
         
         if self.tag is None:
-            return self.value
+            return value
         else:
-            return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
\ No newline at end of file
+            return f"<{self.tag}{self.props_to_html(rewrite_url, minifier)}>{value}</{self.tag}>"
\ No newline at end of file
@@ -0,0 +1,283 @@
+import os, struct, zlib
+from concurrent.futures import ProcessPoolExecutor
+
+from build_manifest import CACHE_DIR, MANIFEST_PATH, hash_bytes, load_manifest, save_manifest
+from inliner import data_uri, inlinable_hash, local_path
+
+IMAGE_CACHE_DIR = CACHE_DIR + "images/"
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# start of frame markers carry the size, c4, c8 and cc share the range but are tables
+JPEG_SOF_MARKERS = frozenset(range(0xc0, 0xd0)) - {0xc4, 0xc8, 0xcc}
+# markers without a length field
+JPEG_STANDALONE_MARKERS = frozenset([0x01, *range(0xd0, 0xd9)])
+
+def png_dimensions(file):
+    header = file.read(24)
+    if len(header) < 24 or header[:8] != PNG_SIGNATURE or header[12:16] != b"IHDR":
+        return None
+    return struct.unpack(">II", header[16:24])
+
+def gif_dimensions(file):
+    header = file.read(10)
+    if len(header) < 10 or header[:6] not in (b"GIF87a", b"GIF89a"):
+        return None
+    return struct.unpack("<HH", header[6:10])
+
+def jpeg_dimensions(file):
+
+    if file.read(2) != b"\xff\xd8":
+        return None
+
+    # walk the segment headers, skipping each segment's payload, until a frame header turns up
+    while True:
+        byte = file.read(1)
+        if byte == b"":
+            return None
+        if byte != b"\xff":
+            continue
+
+        marker = file.read(1)
+        while marker == b"\xff":
+            marker = file.read(1)
+        if marker == b"" or marker[0] == 0xd9:
+            return None
+        if marker[0] in JPEG_STANDALONE_MARKERS:
+            continue
+
+        length_bytes = file.read(2)
+        if len(length_bytes) < 2:
+            return None
+        length = struct.unpack(">H", length_bytes)[0]
+
+        if marker[0] in JPEG_SOF_MARKERS:
+            frame_header = file.read(5)
+            if len(frame_header) < 5:
+                return None
+            height, width = struct.unpack(">HH", frame_header[1:5])
+            return width, height
+
+        file.seek(length - 2, os.SEEK_CUR)
+
+def image_dimensions(path):
+
+    # only the first few bytes are read, the pixel data is never decoded
+    reader = {".png": png_dimensions, ".gif": gif_dimensions, ".jpg": jpeg_dimensions, ".jpeg": jpeg_dimensions}.get(os.path.splitext(path)[1].lower())
+    if reader is None:
+        return None
+
+    try:
+        with open(path, 'rb') as file:
+            return reader(file)
+    except (FileNotFoundError, struct.error):
+        return None
+
+class ImageCatalog():
+
+    # sizes of the images under static_dir, looked up by the url pages use for them. images up to
+    # inline_limit bytes are embedded as data: uris, read from output_dir when given so they carry
+    # what the image stage did to them
+    def __init__(self, static_dir="static/", dimensions=True, inline_limit=0, output_dir=None):
+        self.static_dir = static_dir
+        self.output_dir = output_dir
+        self.inline_limit = inline_limit
+        self.dimensions = {} if dimensions else None
+
+    def __repr__(self):
+        return f"ImageCatalog({self.static_dir}, {self.inline_limit})"
+
+    def size(self, url):
+
+        path = local_path(self.static_dir, url)
+        if path is None or self.dimensions is None:
+            return None
+
+        if path not in self.dimensions:
+            self.dimensions[path] = image_dimensions(path)
+        return self.dimensions[path]
+
+    def inline_path(self, url):
+
+        if not self.inline_limit:
+            return None
+
+        path = local_path(self.static_dir, url)
+        if path is not None and self.output_dir is not None and os.path.exists(local_path(self.output_dir, url)):
+            return local_path(self.output_dir, url)
+        return path
+
+    def data_uri(self, url):
+        path = self.inline_path(url)
+        return None if path is None else data_uri(path, self.inline_limit)
+
+    def attributes(self, url):
+
+        # width and height let the browser reserve the space before the image arrives
+        attributes = {}
+        size = self.size(url)
+        if size is not None:
+            attributes["width"] = str(size[0])
+            attributes["height"] = str(size[1])
+
+        # an inlined image arrives with the page, there is nothing left to load lazily
+        inlined = self.data_uri(url)
+        if inlined is not None:
+            attributes["src"] = inlined
+        elif self.dimensions is not None:
+            attributes["loading"] = "lazy"
+
+        return attributes
+
+    def signature(self, urls):
+        # part of a cached block's key, so a block is rendered again when one of its images changes size or content
+        parts = []
+        for url in urls:
+            path = self.inline_path(url)
+            parts.append(f"{url}={self.size(url)}={None if path is None else inlinable_hash(path, self.inline_limit)}\0")
+        return "".join(parts)
+
+_process_catalogs = {}
+
+def get_image_catalog(static_dir, dimensions=True, inline_limit=0, output_dir=None):
+
+    # one catalog per process, each image header is read at most once per build
+    key = (static_dir, dimensions, inline_limit, output_dir)
+    catalog = _process_catalogs.get(key)
+    if catalog is None:
+        catalog = _process_catalogs[key] = ImageCatalog(static_dir, dimensions, inline_limit, output_dir)
+    return catalog
+
+def png_chunks(data):
+
+    offset = len(PNG_SIGNATURE)
+    while offset < len(data):
+        length, chunk_type = struct.unpack(">I4s", data[offset:offset + 8])
+        yield chunk_type, data[offset + 8:offset + 8 + length]
+        offset += 12 + length
+
+def png_chunk(chunk_type, payload):
+    return struct.pack(">I", len(payload)) + chunk_type + payload + struct.pack(">I", zlib.crc32(chunk_type + payload))
+
+def recompress_png(data):
+
+    # the filtered scanlines stay exactly as they are, only their deflate stream is redone, trying
+    # the strategies that suit filtered image data and keeping the smallest
+    if data[:8] != PNG_SIGNATURE:
+        return None
+
+    chunks = list(png_chunks(data))
+    raw = zlib.decompress(b"".join(payload for chunk_type, payload in chunks if chunk_type == b"IDAT"))
+
+    best = None
+    for strategy in (zlib.Z_DEFAULT_STRATEGY, zlib.Z_FILTERED):
+        compressor = zlib.compressobj(9, zlib.DEFLATED, 15, 9, strategy)
+        compressed = compressor.compress(raw) + compressor.flush()
+        if best is None or len(compressed) < len(best):
+            best = compressed
+
+    output = [PNG_SIGNATURE]
+    wrote_image_data = False
+    for chunk_type, payload in chunks:
+        if chunk_type != b"IDAT":
+            output.append(png_chunk(chunk_type, payload))
+        elif not wrote_image_data:
+            output.append(png_chunk(b"IDAT", best))
+            wrote_image_data = True
+
+    recompressed = b"".join(output)
+    if len(recompressed) >= len(data):
+        return None
+    return recompressed
+
+def cached_png_path(source_hash, cache_dir):
+    return f"{cache_dir}{source_hash}.png"
+
+def optimize_png_job(job):
+
+    # an empty cache file records that the source can't be made smaller
+    source_file, source_hash, cache_dir = job
+    with open(source_file, 'rb') as file:
+        data = file.read()
+
+    try:
+        recompressed = recompress_png(data)
+    except (zlib.error, struct.error) as exception:
+        print(f"Not recompressing {source_file}: {exception}")
+        recompressed = None
+
+    cache_file = cached_png_path(source_hash, cache_dir)
+    with open(cache_file + ".tmp", 'wb') as file:
+        file.write(b"" if recompressed is None else recompressed)
+    os.replace(cache_file + ".tmp", cache_file)
+
+    return source_file, len(data), len(data) if recompressed is None else len(recompressed)
+
+def optimize_images(static_files, target_dir, previous_records, jobs=1, cache_dir=IMAGE_CACHE_DIR):
+
+    # previous_records maps paths relative to the static dir to the [size, mtime_ns] of source and output
+    # after the last run, outputs nobody touched since are skipped without reading them
+    os.makedirs(cache_dir, exist_ok=True)
+    records = {}
+    pending = []
+
+    for static_file in static_files:
+        if not static_file.relative_path.lower().endswith(".png"):
+            continue
+
+        target_file = target_dir + static_file.relative_path
+        try:
+            target_stat = os.stat(target_file)
+        except FileNotFoundError:
+            continue
+
+        record = [static_file.size, static_file.mtime_ns, target_stat.st_size, target_stat.st_mtime_ns]
+        if previous_records.get(static_file.relative_path) == record:
+            records[static_file.relative_path] = record
+            continue
+
+        with open(static_file.path, 'rb') as file:
+            source_hash = hash_bytes(file.read())
+        pending.append((static_file, target_file, source_hash))
+
+    # the same image committed twice, or an earlier build of it, is only compressed once
+    jobs_to_run = {}
+    for static_file, target_file, source_hash in pending:
+        if not os.path.exists(cached_png_path(source_hash, cache_dir)):
+            jobs_to_run[source_hash] = (static_file.path, source_hash, cache_dir)
+
+    job_list = list(jobs_to_run.values())
+    if jobs <= 1 or len(job_list) <= 1:
+        results = [optimize_png_job(job) for job in job_list]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(optimize_png_job, job_list))
+
+    saved = 0
+    for static_file, target_file, source_hash in pending:
+        with open(cached_png_path(source_hash, cache_dir), 'rb') as file:
+            recompressed = file.read()
+
+        # replaced rather than written in place, the output may be a hard link to the source
+        if recompressed:
+            temp_file = target_file + ".sync-tmp"
+            with open(temp_file, 'wb') as file:
+                file.write(recompressed)
+            os.replace(temp_file, target_file)
+            saved += static_file.size - len(recompressed)
+
+        target_stat = os.stat(target_file)
+        records[static_file.relative_path] = [static_file.size, static_file.mtime_ns, target_stat.st_size, target_stat.st_mtime_ns]
+
+    print(f"Images: {len(pending)} of {len(records)} PNGs updated, {len(results)} recompressed, {saved} bytes saved")
+    return records, pending
+
+def optimize_public_images(static_files, target_dir, jobs=1, manifest_path=MANIFEST_PATH):
+
+    manifest = load_manifest(manifest_path)
+    records, pending = optimize_images(static_files, target_dir, manifest["images"], jobs)
+
+    manifest["images"] = records
+    save_manifest(manifest, manifest_path)
+
+    return pending
@@ -0,0 +1,78 @@
+import base64, mimetypes, os, re
+
+from build_manifest import hash_bytes
+
+# a stylesheet that refers to files by relative url would resolve them against the page once inlined
+RELATIVE_CSS_REFERENCE_PATTERN = re.compile(r"url\(\s*['\"]?(?!data:|/|[a-z]+://)|@import", re.IGNORECASE)
+
+# encodings by content hash, an image or stylesheet used on every page is encoded once per process
+_encoded = {}
+_file_hashes = {}
+
+def local_path(root_dir, url):
+
+    if not url.startswith("/") or url.startswith("//"):
+        return None
+    return root_dir + url[1:].split("?", 1)[0].split("#", 1)[0]
+
+def read_if_small(path, limit):
+
+    # the size comes from a stat, files over the limit are never read
+    try:
+        if os.stat(path).st_size > limit:
+            return None
+        with open(path, 'rb') as file:
+            return file.read()
+    except FileNotFoundError:
+        return None
+
+def cached_encoding(data, kind, encode):
+    key = (kind, hash_bytes(data))
+    if key not in _encoded:
+        _encoded[key] = encode(data)
+    return _encoded[key]
+
+def inlinable_hash(path, limit):
+
+    # the content hash of a file small enough to inline, remembered by its stat so an unchanged
+    # image isn't even read again
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    if stat.st_size > limit:
+        return None
+
+    stamp = (path, stat.st_size, stat.st_mtime_ns)
+    if stamp not in _file_hashes:
+        with open(path, 'rb') as file:
+            data = file.read()
+        _file_hashes[stamp] = hash_bytes(data)
+        mime_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        cached_encoding(data, "data", lambda data: f"data:{mime_type};base64,{base64.b64encode(data).decode()}")
+    return _file_hashes[stamp]
+
+def data_uri(path, limit):
+    content_hash = inlinable_hash(path, limit)
+    if content_hash is None:
+        return None
+    return _encoded[("data", content_hash)]
+
+def stylesheet_inliner(static_dir, limit):
+
+    # for Template, the url of a linked stylesheet to (path, css) when it is small and safe to inline
+    def inline_stylesheet(url):
+        path = local_path(static_dir, url)
+        if path is None:
+            return None
+
+        data = read_if_small(path, limit)
+        if data is None:
+            return None
+
+        css = cached_encoding(data, "css", lambda data: data.decode())
+        if RELATIVE_CSS_REFERENCE_PATTERN.search(css) or "</style" in css.lower():
+            return None
+        return path, css
+
+    return inline_stylesheet
@@ -0,0 +1,54 @@
+import os
+from collections import namedtuple
+
+# files that operating systems and editors drop next to real content
+JUNK_NAMES = {".DS_Store", "Thumbs.db", "desktop.ini"}
+JUNK_SUFFIXES = (":Zone.Identifier", ".sync-tmp", ".swp", "~")
+
+SiteFile = namedtuple("SiteFile", ["path", "relative_path", "kind", "size", "mtime_ns", "inode"])
+
+def is_junk(name):
+    return name in JUNK_NAMES or name.endswith(JUNK_SUFFIXES)
+
+def scan_files(root_dir, kind):
+
+    # one scandir per directory and an explicit stack instead of recursion, the stat
+    # results come from the directory entries so there is no extra isfile/exists per file
+    files = []
+    pending_dirs = [""]
+
+    while pending_dirs:
+        relative_dir = pending_dirs.pop()
+
+        try:
+            entries = list(os.scandir(root_dir + relative_dir))
+        except FileNotFoundError:
+            continue
+
+        for entry in entries:
+            if is_junk(entry.name):
+                continue
+
+            if entry.is_dir():
+                pending_dirs.append(f"{relative_dir}{entry.name}/")
+                continue
+
+            stat = entry.stat()
+            relative_path = relative_dir + entry.name
+            files.append(SiteFile(root_dir + relative_path, relative_path, kind, stat.st_size, stat.st_mtime_ns, entry.inode()))
+
+    files.sort()
+    return files
+
+class SiteInventory():
+
+    def __init__(self, pages, assets):
+        self.pages = pages
+        self.assets = assets
+
+    def __repr__(self):
+        return f"SiteInventory({len(self.pages)} pages, {len(self.assets)} assets)"
+
+    @classmethod
+    def scan(cls, content_dir="content/", static_dir="static/"):
+        return cls(scan_files(content_dir, "page"), scan_files(static_dir, "asset"))
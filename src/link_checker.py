@@ -0,0 +1,110 @@
+import json, posixpath
+from urllib.parse import unquote, urlsplit
+
+from build_manifest import CACHE_DIR
+from file_manager import write_if_changed
+
+# kept with the build records rather than in the output, it is for tooling and not part of the site
+LINK_GRAPH_PATH = CACHE_DIR + "link_graph.json"
+
+def output_url(target_file, target_dir):
+    return "/" + target_file[len(target_dir):]
+
+def resolve_link(page_url, url):
+
+    # None for links that leave the site or only point inside the current page
+    parts = urlsplit(url)
+    if parts.scheme or parts.netloc or not parts.path:
+        return None
+
+    path = unquote(parts.path)
+    if not path.startswith("/"):
+        path = posixpath.join(posixpath.dirname(page_url), path)
+
+    resolved = posixpath.normpath(path)
+    if path.endswith("/") and resolved != "/":
+        resolved += "/"
+    return resolved
+
+class LinkGraph():
+
+    def __init__(self):
+        self.pages = {}
+        self.targets = set()
+
+    def __repr__(self):
+        return f"LinkGraph({len(self.pages)} pages, {len(self.targets)} targets)"
+
+    def add_target(self, url):
+
+        # a page is reachable as /dir/index.html, /dir/ and /dir, so every form goes into the index
+        self.targets.add(url)
+        if url.endswith("/index.html"):
+            directory_url = url[:-len("index.html")]
+            self.targets.add(directory_url)
+            if directory_url != "/":
+                self.targets.add(directory_url[:-1])
+
+    def add_page(self, url, links):
+        self.pages[url] = [(kind, link_url) for kind, link_url in links]
+        self.add_target(url)
+
+    def broken_links(self):
+
+        broken = []
+        for page_url, links in sorted(self.pages.items()):
+            for kind, url in links:
+                resolved = resolve_link(page_url, url)
+                if resolved is not None and resolved not in self.targets:
+                    broken.append((page_url, kind, url))
+
+        return broken
+
+    def to_dict(self):
+
+        outgoing = {}
+        backlinks = {page_url: set() for page_url in self.pages}
+
+        for page_url, links in sorted(self.pages.items()):
+            outgoing[page_url] = [{"kind": kind, "url": url, "target": resolve_link(page_url, url)} for kind, url in links]
+
+            for _, url in links:
+                resolved = resolve_link(page_url, url)
+                if resolved is None:
+                    continue
+
+                # links to /dir/ and /dir count as backlinks of /dir/index.html
+                for candidate in (resolved, resolved.rstrip("/") + "/index.html", resolved + "/index.html"):
+                    if candidate in backlinks:
+                        backlinks[candidate].add(page_url)
+                        break
+
+        return {
+            "pages": {page_url: {"links": outgoing[page_url], "backlinks": sorted(backlinks[page_url])} for page_url in outgoing},
+        }
+
+    def write(self, path):
+        return write_if_changed(path, json.dumps(self.to_dict(), indent=1, sort_keys=True))
+
+def build_link_graph(results, inventory, target_dir):
+
+    # page links come from the render results, assets from the inventory, nothing is read back from disk
+    link_graph = LinkGraph()
+
+    for asset in inventory.assets:
+        link_graph.add_target("/" + asset.relative_path)
+
+    for result in results:
+        if result.target_file is not None and result.links is not None:
+            link_graph.add_page(output_url(result.target_file, target_dir), result.links)
+
+    return link_graph
+
+def report_broken_links(link_graph):
+
+    broken = link_graph.broken_links()
+    for page_url, kind, url in broken:
+        print(f"Broken {kind} in {page_url}: {url}")
+
+    print(f"Checked {sum(len(links) for links in link_graph.pages.values())} links on {len(link_graph.pages)} pages, {len(broken)} broken")
+    return broken
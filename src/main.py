@@ -1,21 +1,170 @@
-import sys
+import argparse, os, sys
 
+from async_pipeline import render_pages_async
+from block_cache import BLOCK_CACHE_PATH
+from build_manifest import MANIFEST_PATH, load_manifest, save_manifest
+from compressor import compress_public_directory, remove_compressed_files
 from file_manager import initialize_public_directory
-from page_generator import generate_pages_recursive
+from fingerprint import fingerprint_public_assets, remove_fingerprinted_assets
+from images import optimize_public_images
+from inventory import SiteInventory
+from link_checker import LINK_GRAPH_PATH, build_link_graph, report_broken_links
+from metadata_index import METADATA_INDEX_PATH, MetadataIndex
+from page_generator import generate_pages_recursive, generate_pages_incremental, render_pages
+from profiler import write_trace, print_summary
+from publish import CHANGED_FILES_PATH, prepare_staging_directory, publish_staging_directory
+from search_index import index_pages, remove_search_index
+from syndication import generate_site_indexes, index_site_pages, remove_site_indexes
 
-def main():
+def parse_arguments(argv):
 
-    print(sys.argv)
+    parser = argparse.ArgumentParser(description="Build the static site from content/ into docs/")
+    parser.add_argument("basepath", nargs="?", default="/", help="URL prefix the site is served under")
+    parser.add_argument("--incremental", action="store_true", help="only regenerate pages whose inputs changed since the last build")
+    parser.add_argument("--hash-static", action="store_true", help="with --incremental, compare static files by content hash when their mtime changed")
+    parser.add_argument("--link-static", action="store_true", help="with --incremental, hard link static files into the output instead of copying them")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="number of worker processes used to render pages")
+    parser.add_argument("--block-cache", action="store_true", help="reuse rendered html of unchanged blocks, kept in .cache/ between builds")
+    parser.add_argument("--profile", action="store_true", help="time every phase of every page and write a Chrome trace to --trace")
+    parser.add_argument("--trace", default="trace.json", metavar="PATH", help="with --profile, where the Chrome trace is written")
+    parser.add_argument("--images", action="store_true", help="add width, height and loading=lazy to images and losslessly recompress PNGs in the output")
+    parser.add_argument("--fingerprint", action="store_true", help="give every static file a name.<hash>.ext copy and point pages and the template at it")
+    parser.add_argument("--inline-css", type=int, default=0, metavar="BYTES", help="put linked stylesheets of up to BYTES bytes into the template as <style> elements")
+    parser.add_argument("--inline-images", type=int, default=0, metavar="BYTES", help="embed images of up to BYTES bytes in pages as data: urls")
+    parser.add_argument("--minify", action="store_true", help="collapse whitespace, drop optional quotes and strip comments while serializing pages")
+    parser.add_argument("--gzip", action="store_true", help="write a .gz sibling next to every html, css and other text file that compresses smaller")
+    parser.add_argument("--feeds", action="store_true", help="write feed.xml, sitemap.xml and paginated blog index pages from page front matter")
+    parser.add_argument("--search", action="store_true", help="write a full-text search index of every page to search/, sharded by term prefix")
+    parser.add_argument("--site-url", default="", help="scheme and host the site is published at, e.g. https://example.com, required by --feeds for absolute urls")
+    parser.add_argument("--posts-per-page", type=int, default=10, help="posts listed on each blog index page")
+    parser.add_argument("--atomic", action="store_true", help="build into a staging copy next to docs/ and swap it in once complete, unchanged files keep their mtime")
+    parser.add_argument("--changed-files", default=CHANGED_FILES_PATH, metavar="PATH", help="with --atomic, where the list of added, modified and removed files is written")
+    parser.add_argument("--strict", action="store_true", help="fail the build when a page links to a page or asset that doesn't exist")
+    parser.add_argument("--asyncio", action="store_true", help="read, render and write pages in an overlapping asyncio pipeline, the same as running main_async")
+    parser.add_argument("--profile-top", type=int, default=10, metavar="N", help="number of slowest pages listed in the profile summary")
 
-    if len(sys.argv) < 2:
-        basepath = "/"
+    args = parser.parse_args(argv)
+
+    # sitemaps and Atom feeds need absolute urls, relative ones are rejected by crawlers and feed readers
+    if args.feeds and "://" not in args.site_url:
+        parser.error("--feeds needs --site-url with a scheme and host, e.g. --site-url https://example.com")
+
+    return args
+
+def main_async():
+
+    # the same build, with reading and writing pages overlapping their rendering
+    main(use_asyncio=True)
+
+def main(use_asyncio=False):
+
+    if sys.argv[1:2] == ["serve"]:
+        import server
+        server.main(sys.argv[2:])
+        return
+
+    args = parse_arguments(sys.argv[1:])
+    basepath = args.basepath
+
+    published_dir = "docs/"
+    target_dir = published_dir
+
+    if args.atomic:
+        # docs/ stays complete and untouched while the build runs, an incremental build starts
+        # from hard links of it. the records describing docs/ are kept to put back if it isn't replaced
+        published_manifest = load_manifest(MANIFEST_PATH)
+        target_dir = prepare_staging_directory(published_dir, clone=args.incremental)
+
+    # one walk over content/ and static/ that every later stage reuses
+    inventory = SiteInventory.scan("content/", "static/")
+
+    initialize_public_directory(target_dir, clean=not args.incremental, use_hash=args.hash_static, hardlink=args.link_static, inventory=inventory)
+
+    if args.images:
+        # recompressed PNGs are cached in .cache/ by the hash of their source
+        optimize_public_images(inventory.assets, target_dir, args.jobs)
+
+    # after the image stage, so the fingerprint is of the bytes that are served. outputs of stages that
+    # are off are removed, an incremental build would otherwise keep serving them
+    assets = None
+    if args.fingerprint:
+        assets = fingerprint_public_assets(inventory.assets, target_dir)
     else:
-        basepath = sys.argv[1]
+        remove_fingerprinted_assets(target_dir)
+
+    render_settings = {
+        "profile": args.profile,
+        "block_cache": args.block_cache,
+        "block_cache_path": BLOCK_CACHE_PATH,
+        "minify": args.minify,
+        "images": args.images,
+        "assets": assets,
+        "inline_css": args.inline_css,
+        "inline_images": args.inline_images,
+        "output_dir": target_dir,
+        "search": args.search,
+    }
+
+    render = render_pages_async if use_asyncio or args.asyncio else render_pages
+    if args.incremental:
+        results = generate_pages_incremental("content/", "template.html", target_dir, basepath, jobs=args.jobs, inventory=inventory, render=render, **render_settings)
+    else:
+        results = generate_pages_recursive("content/", "template.html", target_dir, basepath, jobs=args.jobs, inventory=inventory, render=render, **render_settings)
+
+    if args.profile:
+        profiles = [result.profile for result in results if result.profile is not None]
+        write_trace(profiles, args.trace)
+        print_summary(profiles, args.profile_top)
+        print(f"Trace written to {args.trace}, open it in chrome://tracing or ui.perfetto.dev")
+
+    if args.search:
+        # built from the text nodes every page produced while it rendered, nothing is parsed again
+        index_pages(results, target_dir, basepath)
+    else:
+        remove_search_index(target_dir)
+
+    if args.feeds:
+        # titles, dates and tags live in .cache/, only pages that changed since the last build are read again
+        metadata_index = MetadataIndex()
+        try:
+            index_site_pages(metadata_index, inventory)
+            results += generate_site_indexes(metadata_index, target_dir, "template.html", basepath, args.site_url, args.posts_per_page, args.minify, assets, args.inline_css)
+        finally:
+            metadata_index.close()
+    elif os.path.exists(METADATA_INDEX_PATH):
+        metadata_index = MetadataIndex()
+        try:
+            remove_site_indexes(metadata_index, target_dir, {result.target_file[len(target_dir):] for result in results})
+        finally:
+            metadata_index.close()
+
+    failures = [result for result in results if result.error is not None]
+
+    # every link was recorded while its page was parsed, checking is one set lookup per link
+    link_graph = build_link_graph([result for result in results if result.error is None], inventory, target_dir)
+    link_graph.write(LINK_GRAPH_PATH)
+    broken_links = report_broken_links(link_graph)
+
+    if args.gzip:
+        compress_public_directory(target_dir, args.jobs)
+    else:
+        remove_compressed_files(target_dir)
+
+    failed = bool(failures) or (args.strict and bool(broken_links))
+    if args.atomic and failed:
+        # the records in .cache/ describe the staged build, the ones of what is published go back
+        print(f"Not publishing, {published_dir} is left as it was")
+        save_manifest(published_manifest, MANIFEST_PATH)
+    elif args.atomic:
+        publish_staging_directory(target_dir, published_dir, args.changed_files)
 
-    target_dir = "docs/"
+    if args.strict and broken_links:
+        print(f"{len(broken_links)} broken links, failing the build because of --strict")
+        sys.exit(1)
 
-    initialize_public_directory(target_dir)
-    generate_pages_recursive("content/", "template.html", target_dir, basepath)
+    if failures:
+        print(f"{len(failures)} pages failed to generate")
+        sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,4 +1,5 @@
-import re
+import io, itertools, re
+from collections import namedtuple
 from enum import Enum
 
 class BlockType(Enum):
@@ -10,24 +11,101 @@ class BlockType(Enum):
     ORDERED_LIST = "ordered list"
 
 
+# link text may not contain brackets and urls may not contain parentheses, so a failed match attempt
+# stops at the next bracket and a whole paragraph is scanned in linear time without backtracking
+MARKDOWN_LINK_PATTERN = re.compile(r"(!?)\[([^\[\]]*)\]\(([^()]*)\)")
+
+MarkdownLink = namedtuple("MarkdownLink", ["start", "end", "kind", "text", "url"])
+
+# optional "key: value" lines between two "---" lines at the very top of a page
+FRONT_MATTER_DELIMITER = "---"
+FRONT_MATTER_LINE_PATTERN = re.compile(r"([A-Za-z_][\w-]*)\s*:\s*(.*)")
+
+def scan_markdown_links(text, start=0, end=None):
+
+    # images and links in one pass, kind is "image" or "link"
+    end = len(text) if end is None else end
+
+    for match in MARKDOWN_LINK_PATTERN.finditer(text, start, end):
+        kind = "image" if match[1] == "!" else "link"
+        yield MarkdownLink(match.start(), match.end(), kind, match[2], match[3])
+
 def extract_markdown_images(text):    
-    return re.findall(r"!\[(.*?)\]\((.*?)\)", text)
+    return [(match.text, match.url) for match in scan_markdown_links(text) if match.kind == "image"]
 
 def extract_markdown_links(text):
-    return re.findall(r"\[(.*?)\]\((.*?)\)", text)
+    return [(match.text, match.url) for match in scan_markdown_links(text) if match.kind == "link"]
 
-def markdown_to_blocks(markdown):
-    
-    blocks = []
-    split_strings = markdown.split("\n\n")
+def split_front_matter(lines):
+
+    # (metadata, remaining lines), metadata is None when the page has no front matter. lines are
+    # only buffered until the closing delimiter, anything that isn't "key: value" means the page
+    # simply starts with a "---" line and everything read so far is handed back as content
+    lines = iter(lines)
+    first_line = next(lines, None)
+    if first_line is None:
+        return None, iter(())
+    if first_line.strip() != FRONT_MATTER_DELIMITER:
+        return None, itertools.chain([first_line], lines)
+
+    buffered_lines = [first_line]
+    metadata = {}
 
-    for block_string in split_strings:
-        if block_string == "":
+    for line in lines:
+        buffered_lines.append(line)
+        stripped_line = line.strip()
+
+        if stripped_line == FRONT_MATTER_DELIMITER:
+            return metadata, lines
+        if stripped_line == "":
             continue
 
-        blocks.append(block_string.strip())
+        match = FRONT_MATTER_LINE_PATTERN.fullmatch(stripped_line)
+        if match is None:
+            break
+        metadata[match[1].lower()] = match[2].strip()
+
+    return None, itertools.chain(buffered_lines, lines)
 
-    return blocks
+def read_front_matter(markdown):
+    lines = io.StringIO(markdown) if isinstance(markdown, str) else markdown
+    metadata, _ = split_front_matter(lines)
+    return {} if metadata is None else metadata
+
+def markdown_lines(markdown):
+
+    # strings are read lazily through StringIO, anything else is expected to already yield lines (e.g. an open file).
+    # front matter is metadata about the page, never part of its content
+    lines = io.StringIO(markdown) if isinstance(markdown, str) else markdown
+    _, content_lines = split_front_matter(lines)
+    return content_lines
+
+def iter_markdown_blocks(markdown):
+
+    # a block ends at the first empty line, so only the lines of the current block are ever held
+    block_lines = []
+
+    for line in markdown_lines(markdown):
+        if line.endswith("\n"):
+            line = line[:-1]
+
+        if line != "":
+            block_lines.append(line)
+            continue
+
+        if block_lines:
+            block = "\n".join(block_lines).strip()
+            block_lines = []
+            if block != "":
+                yield block
+
+    if block_lines:
+        block = "\n".join(block_lines).strip()
+        if block != "":
+            yield block
+
+def markdown_to_blocks(markdown):
+    return list(iter_markdown_blocks(markdown))
 
 def block_to_block_type(block):
     
@@ -56,9 +134,8 @@ def block_to_block_type(block):
 
 def extract_title(markdown):
 
-    text_lines = markdown.split("\n")
-
-    for line in text_lines:
+    for line in markdown_lines(markdown):
+        line = line.rstrip("\n")
         if line == "":
             continue
 
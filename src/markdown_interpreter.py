@@ -1,93 +1,131 @@
 from htmlnode import ParentNode, LeafNode
 from textnode import TextNode, TextType, text_to_textnodes
-from markdown import BlockType, markdown_to_blocks, block_to_block_type
+from markdown import BlockType, iter_markdown_blocks, block_to_block_type
 
 
 
-def markdown_to_html_node(markdown):
+def markdown_to_html_node(markdown, links=None, images=None, words=None):
+    return ParentNode("div", list(iter_block_html_nodes(markdown, links, images, words)), props=None)
 
-    blocks = markdown_to_blocks(markdown)
-    document_HTML_nodes = []
+def iter_block_html_nodes(markdown, links=None, images=None, words=None):
 
-    for block in blocks:
-        block_type = block_to_block_type(block)
+    # markdown may be a string or any iterable of lines, blocks are converted as soon as they are complete
+    for block in iter_markdown_blocks(markdown):
+        yield block_to_html_node(block, block_to_block_type(block), links, images, words)
 
-        match block_type:
-            case BlockType.PARAGRAPH:
-                text_nodes = text_to_textnodes(block)
-                html_nodes = [text_node.to_html_node() for text_node in text_nodes]
+def text_to_html_nodes(text, links=None, images=None, words=None):
 
-                paragraph_HTML_node = ParentNode("p", html_nodes, props=None)
-                document_HTML_nodes.append(paragraph_HTML_node)
+    text_nodes = text_to_textnodes(text)
 
-            case BlockType.HEADING:
-                # find heading size
-                header_size, header_text = block.split(" ", 1)
-                header_size_tag = f"h{len(header_size)}"
+    # link and image targets are collected while parsing, so checking them never needs a second parse
+    if links is not None:
+        for text_node in text_nodes:
+            if text_node.url is not None:
+                links.append((text_node.text_type.value, text_node.url))
 
-                header_text_node = text_to_textnodes(header_text)
-                html_nodes = [text_node.to_html_node() for text_node in header_text_node]
+    # and so is the plain text the search index is built from, image alt text included
+    if words is not None:
+        words.extend(text_node.text for text_node in text_nodes)
 
-                header_html_node = ParentNode(header_size_tag, html_nodes, props=None)
+    return [text_node.to_html_node(images) for text_node in text_nodes]
 
-                document_HTML_nodes.append(header_html_node)
+def block_to_html_node(block, block_type, links=None, images=None, words=None):
 
-            case BlockType.CODE:
+    match block_type:
+        case BlockType.PARAGRAPH:
+            html_nodes = text_to_html_nodes(block, links, images, words)
 
-                # remove leading and ending backticks from the code
-                code = "\n".join(block.split("\n")[1:-1]) + "\n"
+            paragraph_HTML_node = ParentNode("p", html_nodes, props=None)
+            return paragraph_HTML_node
 
-                # create TextNode containing the code, without markdown backticks
-                code_text_node = TextNode(code, TextType.CODE)
+        case BlockType.HEADING:
+            # find heading size
+            header_size, header_text = block.split(" ", 1)
+            header_size_tag = f"h{len(header_size)}"
 
-                # code TextNode is converted to an HTML code node and nested into a parent <pre> HTML node
-                preformatted_code_node = ParentNode("pre", [code_text_node.to_html_node()], props=None)
+            html_nodes = text_to_html_nodes(header_text, links, images, words)
 
-                document_HTML_nodes.append(preformatted_code_node)
+            header_html_node = ParentNode(header_size_tag, html_nodes, props=None)
 
-            case BlockType.QUOTE:
-                quote_text = extract_text_from_quote_block(block)
-                quote_text_nodes = text_to_textnodes(quote_text)
-                html_nodes = [text_node.to_html_node() for text_node in quote_text_nodes]
+            return header_html_node
 
-                quote_html_node = ParentNode("blockquote", html_nodes, props=None)
+        case BlockType.CODE:
 
-                document_HTML_nodes.append(quote_html_node)
+            # remove leading and ending backticks from the code
+            code = "\n".join(block.split("\n")[1:-1]) + "\n"
 
-            case BlockType.UNORDERED_LIST:
-                list_items = extract_items_from_list(block, block_type)
-                list_HTML_nodes = []
+            # create TextNode containing the code, without markdown backticks
+            code_text_node = TextNode(code, TextType.CODE)
+            if words is not None:
+                words.append(code)
 
-                for item in list_items:
-                    item_text_nodes = text_to_textnodes(item)
-                    item_html_subnodes = [text_node.to_html_node() for text_node in item_text_nodes]
-                    item_html_node = ParentNode("li", item_html_subnodes, props=None)
+            # code TextNode is converted to an HTML code node and nested into a parent <pre> HTML node
+            preformatted_code_node = ParentNode("pre", [code_text_node.to_html_node()], props=None)
 
-                    list_HTML_nodes.append(item_html_node)
+            return preformatted_code_node
 
-                list_master_node = ParentNode("ul", list_HTML_nodes, props=None)
+        case BlockType.QUOTE:
+            quote_text = extract_text_from_quote_block(block)
+            html_nodes = text_to_html_nodes(quote_text, links, images, words)
 
-                document_HTML_nodes.append(list_master_node)
+            quote_html_node = ParentNode("blockquote", html_nodes, props=None)
 
-            case BlockType.ORDERED_LIST:
-                list_items = extract_items_from_list(block, block_type)
-                list_HTML_nodes = []
+            return quote_html_node
 
-                for item in list_items:
-                    item_text_nodes = text_to_textnodes(item)
-                    item_html_subnodes = [text_node.to_html_node() for text_node in item_text_nodes]
-                    item_html_node = ParentNode("li", item_html_subnodes, props=None)
+        case BlockType.UNORDERED_LIST:
+            list_items = extract_items_from_list(block, block_type)
+            list_HTML_nodes = []
 
-                    list_HTML_nodes.append(item_html_node)
+            for item in list_items:
+                item_html_subnodes = text_to_html_nodes(item, links, images, words)
+                item_html_node = ParentNode("li", item_html_subnodes, props=None)
 
-                list_master_node = ParentNode("ol", list_HTML_nodes, props=None)
+                list_HTML_nodes.append(item_html_node)
 
-                document_HTML_nodes.append(list_master_node)
+            list_master_node = ParentNode("ul", list_HTML_nodes, props=None)
 
-            case _:
-                raise TypeError("Invalid block type")
-            
-    return ParentNode("div", document_HTML_nodes, props=None)
+            return list_master_node
+
+        case BlockType.ORDERED_LIST:
+            list_items = extract_items_from_list(block, block_type)
+            list_HTML_nodes = []
+
+            for item in list_items:
+                item_html_subnodes = text_to_html_nodes(item, links, images, words)
+                item_html_node = ParentNode("li", item_html_subnodes, props=None)
+
+                list_HTML_nodes.append(item_html_node)
+
+            list_master_node = ParentNode("ol", list_HTML_nodes, props=None)
+
+            return list_master_node
+
+        case _:
+            raise TypeError("Invalid block type")
+
+class MarkdownDocument():
+
+    def __init__(self, markdown, block_cache=None, links=None, images=None, words=None):
+        self.markdown = markdown
+        self.block_cache = block_cache
+        self.links = links
+        self.images = images
+        self.words = words
+
+    def write_to(self, fp, rewrite_url=None, minifier=None):
+
+        # same output as markdown_to_html_node(...).write_to, but each block's nodes are dropped once written
+        fp.write("<div>")
+
+        if self.block_cache is None:
+            for block_node in iter_block_html_nodes(self.markdown, self.links, self.images, self.words):
+                block_node.write_to(fp, rewrite_url, minifier)
+        else:
+            # unchanged blocks cost a hash and a lookup instead of classification, tokenizing and serialization
+            for block in iter_markdown_blocks(self.markdown):
+                fp.write(self.block_cache.render(block, block_to_block_type(block), rewrite_url, self.links, minifier, self.images, self.words))
+
+        fp.write("</div>")
 
 def extract_text_from_quote_block(block):
 
@@ -0,0 +1,172 @@
+import datetime, os, sqlite3
+
+from build_manifest import CACHE_DIR
+from markdown import extract_title, read_front_matter
+
+METADATA_INDEX_PATH = CACHE_DIR + "metadata.sqlite"
+
+# bump whenever the schema or what is read from a page changes, older indexes are rebuilt from scratch
+METADATA_FORMAT = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    src_file TEXT PRIMARY KEY,
+    target_file TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    date TEXT,
+    summary TEXT NOT NULL,
+    is_post INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tags (
+    src_file TEXT NOT NULL,
+    tag TEXT NOT NULL,
+    PRIMARY KEY (src_file, tag)
+);
+CREATE TABLE IF NOT EXISTS outputs (
+    path TEXT PRIMARY KEY
+);
+"""
+
+class PageMetadata():
+
+    __slots__ = ("src_file", "target_file", "mtime_ns", "title", "date", "summary", "tags", "is_post")
+
+    def __init__(self, src_file, target_file, mtime_ns, title, date=None, summary="", tags=(), is_post=False):
+        self.src_file = src_file
+        self.target_file = target_file
+        self.mtime_ns = mtime_ns
+        self.title = title
+        self.date = date
+        self.summary = summary
+        self.tags = list(tags)
+        self.is_post = is_post
+
+    def __repr__(self):
+        return f"PageMetadata({self.src_file}, {self.title}, {self.date})"
+
+    def updated(self):
+
+        # pages without a date in their front matter fall back to when the file last changed
+        if self.date is not None:
+            return self.date
+        return datetime.datetime.fromtimestamp(self.mtime_ns / 1e9, datetime.timezone.utc).date().isoformat()
+
+def parse_date(value):
+    try:
+        return datetime.date.fromisoformat(value.strip("\"'")).isoformat()
+    except ValueError:
+        return None
+
+def parse_tags(value):
+
+    # "tags: a, b" and "tags: [a, b]" are both accepted
+    value = value.strip().removeprefix("[").removesuffix("]")
+    tags = [tag.strip().strip("\"'") for tag in value.split(",")]
+    return [tag for tag in tags if tag != ""]
+
+def read_page_metadata(src_file, target_file, mtime_ns, is_post):
+
+    with open(src_file, 'r') as file:
+        markdown = file.read()
+
+    front_matter = read_front_matter(markdown)
+
+    title = front_matter.get("title", "").strip("\"'")
+    if title == "":
+        try:
+            title = extract_title(markdown)
+        except Exception:
+            title = target_file
+
+    date = None
+    if "date" in front_matter:
+        date = parse_date(front_matter["date"])
+        if date is None:
+            print(f"Ignoring date of {src_file}, {front_matter['date']} is not YYYY-MM-DD")
+
+    summary = front_matter.get("summary", "").strip("\"'")
+    tags = parse_tags(front_matter.get("tags", ""))
+
+    return PageMetadata(src_file, target_file, mtime_ns, title, date, summary, tags, is_post)
+
+class MetadataIndex():
+
+    def __init__(self, path=METADATA_INDEX_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path)
+
+        if self.connection.execute("PRAGMA user_version").fetchone()[0] != METADATA_FORMAT:
+            self.connection.executescript("DROP TABLE IF EXISTS pages; DROP TABLE IF EXISTS tags; DROP TABLE IF EXISTS outputs;")
+            self.connection.execute(f"PRAGMA user_version = {METADATA_FORMAT}")
+        self.connection.executescript(SCHEMA)
+
+    def __repr__(self):
+        return f"MetadataIndex({self.path})"
+
+    def close(self):
+        self.connection.close()
+
+    def update(self, pages):
+
+        # pages is a list of (SiteFile, target file relative to the output directory, is_post), only
+        # files whose size or mtime changed since they were indexed are opened
+        known = {row[0]: (row[1], row[2]) for row in self.connection.execute("SELECT src_file, mtime_ns, size FROM pages")}
+        current = set()
+        changed = 0
+
+        with self.connection:
+            for page_file, target_file, is_post in pages:
+                current.add(page_file.path)
+                if known.get(page_file.path) == (page_file.mtime_ns, page_file.size):
+                    continue
+
+                metadata = read_page_metadata(page_file.path, target_file, page_file.mtime_ns, is_post)
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (page_file.path, target_file, page_file.mtime_ns, page_file.size, metadata.title, metadata.date, metadata.summary, int(is_post)),
+                )
+                self.connection.execute("DELETE FROM tags WHERE src_file = ?", (page_file.path,))
+                self.connection.executemany("INSERT OR IGNORE INTO tags VALUES (?, ?)", [(page_file.path, tag) for tag in metadata.tags])
+                changed += 1
+
+            for src_file in known.keys() - current:
+                self.connection.execute("DELETE FROM pages WHERE src_file = ?", (src_file,))
+                self.connection.execute("DELETE FROM tags WHERE src_file = ?", (src_file,))
+
+        return changed
+
+    def pages(self, posts_only=False):
+
+        tags = {}
+        for src_file, tag in self.connection.execute("SELECT src_file, tag FROM tags ORDER BY tag"):
+            tags.setdefault(src_file, []).append(tag)
+
+        query = "SELECT src_file, target_file, mtime_ns, title, date, summary, is_post FROM pages"
+        if posts_only:
+            query += " WHERE is_post = 1"
+        query += " ORDER BY src_file"
+
+        pages = []
+        for src_file, target_file, mtime_ns, title, date, summary, is_post in self.connection.execute(query):
+            pages.append(PageMetadata(src_file, target_file, mtime_ns, title, date, summary, tags.get(src_file, ()), bool(is_post)))
+
+        return pages
+
+    def posts(self):
+        # newest first, posts from the same day in a stable order
+        return sorted(self.pages(posts_only=True), key=lambda page: (page.updated(), page.src_file), reverse=True)
+
+    def replace_outputs(self, paths):
+
+        # the files generated from the index last time, relative to the output directory, so ones that
+        # are no longer produced can be removed
+        previous = [row[0] for row in self.connection.execute("SELECT path FROM outputs")]
+        with self.connection:
+            self.connection.execute("DELETE FROM outputs")
+            self.connection.executemany("INSERT INTO outputs VALUES (?)", [(path,) for path in paths])
+
+        return sorted(set(previous) - set(paths))
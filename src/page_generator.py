@@ -1,55 +1,407 @@
-import os
+import io, os
+from concurrent.futures import ProcessPoolExecutor
 
-from markdown import extract_title
-from markdown_interpreter import markdown_to_html_node
+from block_cache import get_block_cache
+from build_manifest import MANIFEST_PATH, load_manifest, save_manifest, hash_bytes, hash_file, referenced_static_files, page_input_hash
+from file_manager import write_output
+from inventory import SiteInventory, scan_files
+from htmlnode import Minifier, ParentNode
+from images import get_image_catalog
+from markdown import extract_title, iter_markdown_blocks, block_to_block_type
+from markdown_interpreter import MarkdownDocument, block_to_html_node
+from profiler import PageProfile
+from search_index import term_counts
+from template import load_template
 
-def generate_page(src_file, template_path, dest_folder, basepath):
+def target_path(src_file, dest_folder):
 
     filename = src_file.rsplit("/", 1)[1].rsplit(".", 1)[0]
     ext = ".html"
-    target_file = dest_folder + filename + ext
+    return dest_folder + filename + ext
+
+def generate_page(src_file, template_path, dest_folder, basepath, block_cache=None, links=None, minifier=None, images=None, assets=None, inline_css=0, words=None):
+
+    target_file = target_path(src_file, dest_folder)
     print(f"Generating page from {src_file} to {target_file} using {template_path}...")
 
+    # the title is usually on the first line, reading up to it is cheaper than holding the whole file
     try:
         with open(src_file, 'r') as file:
-            markdown = file.read()
+            page_title = extract_title(file)
     except FileNotFoundError:
         print("Markdown file not found")
         return 1
     
     try:
-        with open(template_path, 'r') as file:
-            template = file.read()
+        template = load_template(template_path, basepath, minifier is not None, assets, inline_css)
     except FileNotFoundError:
         print("HTML Template file not found")
         return 2
-    
-    print(basepath)
+
+    write_output(target_file, lambda output_file: write_page(src_file, page_title, template, output_file, block_cache, links, minifier, images, words))
+
+def generate_page_profiled(src_file, template_path, dest_folder, basepath, block_cache=None, links=None, minifier=None, images=None, assets=None, inline_css=0, words=None):
+
+    # same output as generate_page, but every phase runs to completion on its own so it can be timed
+    target_file = target_path(src_file, dest_folder)
+    print(f"Generating page from {src_file} to {target_file} using {template_path}...")
+
+    profile = PageProfile(src_file)
+    start = profile.start()
+
+    with open(src_file, 'r') as file:
+        markdown = file.read()
+    start = profile.record("read", start)
 
     page_title = extract_title(markdown)
-    page_content_html_node = markdown_to_html_node(markdown)
-    page_content_html = page_content_html_node.to_html()
-    file_html = template.replace("{{ Title }}", page_title).replace("{{ Content }}", page_content_html)
-    file_html = file_html.replace("href=\"/", f"href=\"{basepath}").replace("src=\"/", f"src=\"{basepath}")
+    typed_blocks = [(block, block_to_block_type(block)) for block in iter_markdown_blocks(markdown)]
+    start = profile.record("blocks", start)
+
+    if block_cache is None:
+        page_content_html_node = ParentNode("div", [block_to_html_node(block, block_type, links, images, words) for block, block_type in typed_blocks])
+        start = profile.record("inline", start)
+
+        template = load_template(template_path, basepath, minifier is not None, assets, inline_css)
+        page_content_html = page_content_html_node.to_html(template.rewrite_url, minifier)
+        start = profile.record("serialize", start)
+    else:
+        # a cached fragment is already serialized and a miss is rendered and serialized in one go, both count as inline
+        template = load_template(template_path, basepath, minifier is not None, assets, inline_css)
+        fragments = [block_cache.render(block, block_type, template.rewrite_url, links, minifier, images, words) for block, block_type in typed_blocks]
+        start = profile.record("inline", start)
+
+        page_content_html = "<div>" + "".join(fragments) + "</div>"
+        start = profile.record("serialize", start)
+
+    if minifier is not None:
+        minifier.saved += template.bytes_saved
+        page_title = minifier.text(page_title)
+    file_html = template.render(Title=page_title, Content=page_content_html)
+    start = profile.record("template", start)
+
+    write_output(target_file, lambda output_file: output_file.write(file_html))
+    profile.record("write", start)
+
+    return profile
+
+def write_page(src_file, page_title, template, fp, block_cache=None, links=None, minifier=None, images=None, words=None):
+
+    # the markdown is read line by line and written out block by block, peak memory is one block
+    with open(src_file, 'r') as markdown_file:
+        template.write_to(fp, minifier, Title=page_title, Content=MarkdownDocument(markdown_file, block_cache, links, images, words))
+
+def render_page(src_file, template_path, basepath, block_cache=None):
+
+    # the whole page as a string, for callers that keep pages in memory instead of in docs/
+    with open(src_file, 'r') as file:
+        page_title = extract_title(file)
+
+    output = io.StringIO()
+    write_page(src_file, page_title, load_template(template_path, basepath), output, block_cache)
+
+    return output.getvalue()
+
+def collect_pages(dir_path_content, dest_dir_path, inventory=None):
 
+    # (source markdown file, destination folder) for every page below dir_path_content
+    page_files = scan_files(dir_path_content, "page") if inventory is None else inventory.pages
 
-    with open(target_file, 'w') as target_file:
-        target_file.write(file_html)
+    pages = []
+    for page_file in page_files:
+        relative_dir = page_file.relative_path[:page_file.relative_path.rfind("/") + 1]
+        pages.append((page_file.path, dest_dir_path + relative_dir))
 
-def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath):
+    return pages
 
-    content_files = os.listdir(dir_path_content)
+class RenderOptions():
 
-    for item_name in content_files:
-        if os.path.isfile(dir_path_content + item_name):
+    # everything a worker needs to render a page, kept to plain values so it pickles into the process pool
+    def __init__(self, template_path, basepath, profile=False, block_cache=False, block_cache_path=None, minify=False, images=False, static_dir="static/", assets=None, inline_css=0, inline_images=0, output_dir=None, search=False):
+        self.template_path = template_path
+        self.basepath = basepath
+        self.assets = assets
+        self.profile = profile
+        self.minify = minify
+        self.images = images
+        self.inline_css = inline_css
+        self.inline_images = inline_images
+        self.search = search
+        self.static_dir = static_dir
+        self.output_dir = output_dir
+        self.block_cache = block_cache
+        self.block_cache_path = block_cache_path
 
-            generate_page(dir_path_content + item_name, template_path, dest_dir_path, basepath)
+    def __repr__(self):
+        return f"RenderOptions({self.template_path}, {self.basepath})"
+
+    def cache_context(self):
+        # every setting that changes the html of a block, cached fragments are only reused when all of them match
+        return f"{self.basepath}\0minify={self.minify}\0images={self.images}\0inline_css={self.inline_css}\0inline_images={self.inline_images}"
+
+    def get_image_catalog(self):
+        if not self.images and not self.inline_images:
+            return None
+        return get_image_catalog(self.static_dir, self.images, self.inline_images, self.output_dir)
+
+    def get_block_cache(self):
+        if not self.block_cache:
+            return None
+        return get_block_cache(self.block_cache_path, self.cache_context())
+
+class PageResult():
+
+    __slots__ = ("src_file", "target_file", "links", "error", "profile", "cache_hits", "cache_misses", "new_blocks", "bytes_saved", "search")
+
+    def __init__(self, src_file, target_file=None, links=None, error=None, profile=None):
+        self.src_file = src_file
+        self.target_file = target_file
+        self.links = links
+        self.error = error
+        self.profile = profile
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.new_blocks = None
+        self.bytes_saved = None
+        # (title, term counts) of the page for the search index
+        self.search = None
+
+    def __repr__(self):
+        return f"PageResult({self.src_file}, {self.error})"
+
+def record_cache_use(result, block_cache, hits, misses):
+
+    # fragments rendered in a pool worker travel back with the result to be merged into the parent's cache
+    if block_cache is not None:
+        result.cache_hits = block_cache.hits - hits
+        result.cache_misses = block_cache.misses - misses
+        result.new_blocks = block_cache.drain_new_entries()
+
+def record_search(result, page_title, words):
+    if words is not None:
+        result.search = (page_title, term_counts(words))
+
+def record_minified(result, minifier):
+    if minifier is not None:
+        result.bytes_saved = minifier.saved
+        print(f"Minified {result.target_file}, {minifier.saved} bytes saved")
+
+def render_page_job(job):
+
+    src_file, dest_folder, options = job
+    block_cache = options.get_block_cache()
+    result = PageResult(src_file, target_path(src_file, dest_folder), [])
+    minifier = Minifier() if options.minify else None
+    images = options.get_image_catalog()
+    words = [] if options.search else None
+
+    # errors are returned instead of raised so one bad page doesn't take down the whole pool
+    try:
+        os.makedirs(dest_folder, exist_ok=True)
+        hits, misses = (0, 0) if block_cache is None else (block_cache.hits, block_cache.misses)
+        if options.profile:
+            result.profile = generate_page_profiled(src_file, options.template_path, dest_folder, options.basepath, block_cache, result.links, minifier, images, options.assets, options.inline_css, words)
         else:
-            new_source_dir = f"{dir_path_content}{item_name}/"
-            new_target_dir = f"{dest_dir_path}{item_name}/"
+            status = generate_page(src_file, options.template_path, dest_folder, options.basepath, block_cache, result.links, minifier, images, options.assets, options.inline_css, words)
+
+            if status is not None:
+                result.error = f"generate_page exited with status {status}"
+
+        record_cache_use(result, block_cache, hits, misses)
+
+        if words is not None:
+            # the title only, generate_page read it the same way
+            with open(src_file, 'r') as file:
+                record_search(result, extract_title(file), words)
+
+        record_minified(result, minifier)
+    except Exception as exception:
+        result.error = f"{type(exception).__name__}: {exception}"
+
+    return result
+
+def render_markdown_job(job):
+
+    # the page already read into memory, the html is handed back for someone else to write
+    src_file, target_file, markdown, options = job
+    block_cache = options.get_block_cache()
+    result = PageResult(src_file, target_file, [])
+    minifier = Minifier() if options.minify else None
+    hits, misses = (0, 0) if block_cache is None else (block_cache.hits, block_cache.misses)
+    words = [] if options.search else None
+
+    print(f"Generating page from {src_file} to {target_file} using {options.template_path}...")
+    try:
+        page_title = extract_title(markdown)
+        template = load_template(options.template_path, options.basepath, options.minify, options.assets, options.inline_css)
+
+        output = io.StringIO()
+        template.write_to(output, minifier, Title=page_title, Content=MarkdownDocument(markdown, block_cache, result.links, options.get_image_catalog(), words))
+
+        record_cache_use(result, block_cache, hits, misses)
+        record_search(result, page_title, words)
+        record_minified(result, minifier)
+    except Exception as exception:
+        result.error = f"{type(exception).__name__}: {exception}"
+        return result, None
+
+    return result, output.getvalue()
+
+def render_pages(pages, options, jobs=1):
+
+    render_jobs = [(src_file, dest_folder, options) for src_file, dest_folder in pages]
+
+    if jobs <= 1 or len(render_jobs) <= 1:
+        results = [render_page_job(job) for job in render_jobs]
+    else:
+        # a few chunks per worker keeps the pipes busy without starving workers at the end of the list
+        chunksize = max(1, len(render_jobs) // (jobs * 4))
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(render_page_job, render_jobs, chunksize=chunksize))
+
+    return report_render_results(results, options)
+
+def report_render_results(results, options):
+
+    for result in results:
+        if result.error is not None:
+            print(f"Failed to generate page from {result.src_file}: {result.error}")
+
+    if options.minify:
+        minified = [result for result in results if result.error is None and result.bytes_saved is not None]
+        print(f"Minified {len(minified)} pages, {sum(result.bytes_saved for result in minified)} bytes saved")
+
+    block_cache = options.get_block_cache()
+    if block_cache is not None:
+        # fragments rendered in pool workers only exist in their processes until they are merged back here
+        for result in results:
+            if result.new_blocks:
+                block_cache.merge(result.new_blocks)
+
+        if options.block_cache_path is not None:
+            block_cache.save(options.block_cache_path)
+
+        hits = sum(result.cache_hits for result in results)
+        misses = sum(result.cache_misses for result in results)
+        print(f"Block cache: {hits} hits, {misses} misses, {len(block_cache)} entries")
+
+    return results
+
+def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath, jobs=1, inventory=None, render=render_pages, **render_settings):
+
+    pages = collect_pages(dir_path_content, dest_dir_path, inventory)
+    return render(pages, RenderOptions(template_path, basepath, **render_settings), jobs)
+
+def hash_template(template_path, basepath, assets=None, inline_css=0):
+
+    # partials, parent layouts and inlined stylesheets are inputs of every page just like the template
+    # itself, and so are the urls its markup ends up with, e.g. a stylesheet that got a new fingerprint
+    try:
+        template = load_template(template_path, basepath, False, assets, inline_css)
+    except FileNotFoundError:
+        return None
+
+    inputs = [f"{path}={hash_file(path)}\0" for path in template.dependencies]
+    inputs.extend(f"{url}={template.rewrite_url(url)}\0" for url in template.urls)
+    return hash_bytes("".join(inputs).encode())
+
+def generate_pages_incremental(dir_path_content, template_path, dest_dir_path, basepath, static_dir="static/", manifest_path=MANIFEST_PATH, jobs=1, inventory=None, render=render_pages, **render_settings):
+
+    manifest = load_manifest(manifest_path)
+    options = RenderOptions(template_path, basepath, **render_settings)
+    template_hash = hash_template(template_path, basepath, options.assets, options.inline_css)
+
+    # a new template, basepath or output setting touches every page, so drop the recorded hashes instead of comparing them
+    if manifest["template"] != template_hash or manifest["basepath"] != basepath or manifest["render"] != options.cache_context():
+        print("Template, basepath or render settings changed, regenerating every page")
+        manifest["pages"] = {}
+
+    old_pages = manifest["pages"]
+    new_pages = {}
+    # every page with a source this build, rendered or not
+    source_keys = set()
+    outdated_pages = []
+    skipped_results = []
+
+    if inventory is None:
+        inventory = SiteInventory.scan(dir_path_content, static_dir)
+    asset_paths = {asset.path for asset in inventory.assets}
+
+    # images shared by many pages are hashed once per build
+    static_hashes_by_path = {}
+
+    for src_file, dest_folder in collect_pages(dir_path_content, dest_dir_path, inventory):
+        target_file = target_path(src_file, dest_folder)
+
+        # pages are recorded relative to the output directory, the same records serve a build into
+        # docs/ and one into a staging copy of it
+        page_key = target_file[len(dest_dir_path):]
+        source_keys.add(page_key)
+
+        try:
+            with open(src_file, 'rb') as file:
+                markdown_bytes = file.read()
+            markdown = markdown_bytes.decode()
+        except Exception:
+            # an unreadable or undecodable page fails on its own when it is rendered
+            outdated_pages.append((src_file, dest_folder))
+            continue
+
+        static_hashes = []
+        for static_path in referenced_static_files(markdown, static_dir, asset_paths):
+            if static_path not in static_hashes_by_path:
+                static_hashes_by_path[static_path] = hash_file(static_path)
+            static_hashes.append((static_path, static_hashes_by_path[static_path]))
+
+        input_hash = page_input_hash(markdown_bytes, template_hash, basepath, static_hashes)
+        new_pages[page_key] = {"source": src_file, "hash": input_hash}
+
+        previous = old_pages.get(page_key)
+        # a page last rendered without --search has no recorded text to index
+        indexed = not options.search or "search" in (previous or {})
+        if previous is not None and previous["hash"] == input_hash and os.path.exists(target_file) and indexed:
+            # links and search terms recorded when the page was last rendered stand in for the page
+            new_pages[page_key]["links"] = previous.get("links", [])
+            skipped_result = PageResult(src_file, target_file, [tuple(link) for link in new_pages[page_key]["links"]])
+            if "search" in previous:
+                new_pages[page_key]["search"] = previous["search"]
+                skipped_result.search = tuple(previous["search"])
+            skipped_results.append(skipped_result)
+            continue
+
+        outdated_pages.append((src_file, dest_folder))
+
+    results = render(outdated_pages, options, jobs)
+    failed_sources = {result.src_file for result in results if result.error is not None}
+
+    for result in results:
+        if result.error is None and result.target_file[len(dest_dir_path):] in new_pages:
+            page = new_pages[result.target_file[len(dest_dir_path):]]
+            page["links"] = result.links
+            if result.search is not None:
+                page["search"] = result.search
+
+    # forget failed pages so the next build retries them, their outputs are not stale and stay
+    for page_key, page in list(new_pages.items()):
+        if page["source"] in failed_sources:
+            del new_pages[page_key]
+
+    # outputs whose markdown source disappeared since the last build, never anything outside dest_dir_path
+    for stale_key in old_pages.keys() - source_keys:
+        stale_target = dest_dir_path + stale_key
+        if os.path.exists(stale_target):
+            print(f"Removing {stale_target}, its source is gone")
+            os.remove(stale_target)
+
+            stale_dir = os.path.dirname(stale_target)
+            if not os.listdir(stale_dir):
+                os.rmdir(stale_dir)
 
-            if not os.path.exists(new_target_dir):
-                os.mkdir(new_target_dir)
+    manifest["template"] = template_hash
+    manifest["basepath"] = basepath
+    manifest["render"] = options.cache_context()
+    manifest["pages"] = new_pages
+    save_manifest(manifest, manifest_path)
 
-            generate_pages_recursive(new_source_dir, template_path, new_target_dir, basepath)
+    print(f"{len(outdated_pages)} of {len(source_keys)} pages regenerated")
 
+    return results + skipped_results
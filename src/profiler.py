@@ -0,0 +1,86 @@
+import json, os, time
+
+PHASES = ("read", "blocks", "inline", "serialize", "template", "write")
+
+class PageProfile():
+
+    __slots__ = ("page", "pid", "spans")
+
+    def __init__(self, page):
+        self.page = page
+        self.pid = os.getpid()
+        self.spans = []
+
+    def __repr__(self):
+        return f"PageProfile({self.page}, {self.total_ns()} ns)"
+
+    def start(self):
+        return time.perf_counter_ns()
+
+    def record(self, phase, start_ns):
+
+        # returns the end of this phase so it can be passed straight on as the start of the next one
+        end_ns = time.perf_counter_ns()
+        self.spans.append((phase, start_ns, end_ns - start_ns))
+        return end_ns
+
+    def total_ns(self):
+        return sum(duration_ns for _, _, duration_ns in self.spans)
+
+    def trace_events(self):
+
+        if not self.spans:
+            return []
+
+        # chrome trace timestamps are microseconds, perf_counter_ns uses the same monotonic clock in every worker
+        first_start_ns = self.spans[0][1]
+        events = [{
+            "name": self.page,
+            "cat": "page",
+            "ph": "X",
+            "ts": first_start_ns / 1000,
+            "dur": self.total_ns() / 1000,
+            "pid": self.pid,
+            "tid": self.pid,
+        }]
+
+        for phase, start_ns, duration_ns in self.spans:
+            events.append({
+                "name": phase,
+                "cat": "phase",
+                "ph": "X",
+                "ts": start_ns / 1000,
+                "dur": duration_ns / 1000,
+                "pid": self.pid,
+                "tid": self.pid,
+                "args": {"page": self.page},
+            })
+
+        return events
+
+def write_trace(profiles, trace_path):
+
+    trace_events = [event for profile in profiles for event in profile.trace_events()]
+    with open(trace_path, 'w') as file:
+        json.dump({"traceEvents": trace_events, "displayTimeUnit": "ms"}, file)
+
+def print_summary(profiles, top=10):
+
+    if not profiles:
+        print("No pages were profiled")
+        return
+
+    phase_totals = {phase: 0 for phase in PHASES}
+    for profile in profiles:
+        for phase, _, duration_ns in profile.spans:
+            phase_totals[phase] = phase_totals.get(phase, 0) + duration_ns
+
+    total_ns = sum(phase_totals.values()) or 1
+    print(f"Profiled {len(profiles)} pages, {total_ns / 1e6:.1f} ms rendering")
+
+    for phase, phase_ns in phase_totals.items():
+        print(f"  {phase:<10} {phase_ns / 1e6:10.2f} ms {phase_ns / total_ns:7.1%}")
+
+    print(f"Slowest {min(top, len(profiles))} pages:")
+    for profile in sorted(profiles, key=lambda profile: profile.total_ns(), reverse=True)[:top]:
+        print(f"  {profile.total_ns() / 1e6:10.2f} ms  {profile.page}")
@@ -0,0 +1,136 @@
+import ctypes, ctypes.util, os, shutil
+
+from build_manifest import CACHE_DIR
+from file_manager import files_equal
+
+CHANGED_FILES_PATH = CACHE_DIR + "changed-files.txt"
+
+# renameat2(2) on Linux, swaps two paths in one step
+AT_FDCWD = -100
+RENAME_EXCHANGE = 2
+
+def staging_path(target_dir):
+    return target_dir.rstrip("/") + ".staging/"
+
+def list_files(root_dir):
+
+    # paths relative to root_dir, the same form the change list is written in
+    files = []
+    for dir_path, _, file_names in os.walk(root_dir):
+        for file_name in file_names:
+            files.append(os.path.relpath(os.path.join(dir_path, file_name), root_dir).replace(os.sep, "/"))
+    return sorted(files)
+
+def clone_directory(source_dir, target_dir):
+
+    # every file a hard link of the published one, the copy costs no data and outputs that aren't
+    # rebuilt keep their inode. builds replace files instead of writing through them, so the
+    # published site is never touched
+    for relative_path in list_files(source_dir):
+        target_file = target_dir + relative_path
+        os.makedirs(os.path.dirname(target_file), exist_ok=True)
+        try:
+            os.link(source_dir + relative_path, target_file)
+        except OSError:
+            shutil.copy2(source_dir + relative_path, target_file)
+
+def prepare_staging_directory(target_dir, clone=True):
+
+    # what a crashed build left behind is thrown away, a clean build starts empty and an incremental
+    # build starts from what is published
+    staging_dir = staging_path(target_dir)
+    if os.path.exists(staging_dir):
+        shutil.rmtree(staging_dir)
+
+    os.makedirs(staging_dir)
+    if clone and os.path.isdir(target_dir):
+        clone_directory(target_dir, staging_dir)
+
+    return staging_dir
+
+def reuse_unchanged_files(staging_dir, target_dir):
+
+    # files that came out identical to the published ones are swapped back for links to them, so they
+    # keep their mtime and rsync or a CDN sync skips them. returns the (status, path) of every difference
+    changes = []
+    staged_files = list_files(staging_dir)
+
+    for relative_path in staged_files:
+        staged_file = staging_dir + relative_path
+        published_file = target_dir + relative_path
+        try:
+            published_stat = os.stat(published_file)
+        except FileNotFoundError:
+            changes.append(("A", relative_path))
+            continue
+
+        if os.path.samestat(os.stat(staged_file), published_stat):
+            continue
+
+        if not files_equal(staged_file, published_file):
+            changes.append(("M", relative_path))
+            continue
+
+        try:
+            os.link(published_file, staged_file + ".tmp")
+            os.replace(staged_file + ".tmp", staged_file)
+        except OSError:
+            shutil.copystat(published_file, staged_file)
+
+    if os.path.isdir(target_dir):
+        removed = set(list_files(target_dir)) - set(staged_files)
+        changes.extend(("D", relative_path) for relative_path in sorted(removed))
+
+    return sorted(changes, key=lambda change: change[1])
+
+def exchange_paths(path, other_path):
+
+    # both paths stay valid throughout, there is no moment without a published site
+    libc_name = ctypes.util.find_library("c")
+    if libc_name is None:
+        return False
+
+    renameat2 = getattr(ctypes.CDLL(libc_name, use_errno=True), "renameat2", None)
+    if renameat2 is None:
+        return False
+
+    return renameat2(AT_FDCWD, os.fsencode(path), AT_FDCWD, os.fsencode(other_path), RENAME_EXCHANGE) == 0
+
+def swap_directories(staging_dir, target_dir):
+
+    staging_dir = staging_dir.rstrip("/")
+    target_dir = target_dir.rstrip("/")
+
+    if not os.path.exists(target_dir):
+        os.rename(staging_dir, target_dir)
+        return "rename"
+
+    if exchange_paths(staging_dir, target_dir):
+        shutil.rmtree(staging_dir)
+        return "exchange"
+
+    # two renames, the site is missing only for the moment between them
+    previous_dir = target_dir + ".previous"
+    if os.path.exists(previous_dir):
+        shutil.rmtree(previous_dir)
+    os.rename(target_dir, previous_dir)
+    os.rename(staging_dir, target_dir)
+    shutil.rmtree(previous_dir)
+    return "rename"
+
+def write_change_list(changes, path):
+
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as file:
+        file.writelines(f"{status}\t{relative_path}\n" for status, relative_path in changes)
+
+def publish_staging_directory(staging_dir, target_dir, changes_path=CHANGED_FILES_PATH):
+
+    changes = reuse_unchanged_files(staging_dir, target_dir)
+    method = swap_directories(staging_dir, target_dir)
+    write_change_list(changes, changes_path)
+
+    counts = {status: sum(1 for change in changes if change[0] == status) for status in "AMD"}
+    print(f"Published {target_dir} ({method}): {counts['A']} added, {counts['M']} modified, {counts['D']} removed, listed in {changes_path}")
+    return changes
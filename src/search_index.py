@@ -0,0 +1,200 @@
+import json, os, re, shutil, unicodedata
+from collections import Counter
+
+from file_manager import write_if_changed
+
+SEARCH_DIR = "search/"
+SEARCH_MANIFEST_FILE = "index.json"
+DOCUMENTS_FILE = "documents.json"
+
+# bump whenever tokenizing or the file layout changes, the client checks it before reading shards
+SEARCH_FORMAT = 1
+
+# terms are sharded by their first characters, a query fetches the manifest and one shard per term
+PREFIX_LENGTH = 2
+
+TOKEN_PATTERN = re.compile(r"\w+")
+SHARD_NAME_PATTERN = re.compile(r"[a-z0-9]+")
+
+# too common to narrow a search down, leaving them out keeps the largest postings lists out of the index
+STOP_WORDS = frozenset("""
+a an and are as at be but by for from has have he her his i if in into is it its me my no not of on or our
+she so than that the their them then there these they this to was we were what when which who will with you your
+""".split())
+
+# words seen in this process to their term, None for words that aren't indexed
+_terms = {}
+
+def normalize(word):
+
+    # case and accents are folded, "Éowyn" and "eowyn" are the same term
+    if word.isascii():
+        return word.lower()
+    decomposed = unicodedata.normalize("NFKD", word.casefold())
+    return "".join(character for character in decomposed if not unicodedata.combining(character))
+
+def word_term(word):
+
+    term = _terms.get(word, "")
+    if term == "":
+        term = normalize(word)
+        if len(term) < 2 or term in STOP_WORDS:
+            term = None
+        _terms[word] = term
+    return term
+
+def tokenize(text):
+    for word in TOKEN_PATTERN.findall(text):
+        term = word_term(word)
+        if term is not None:
+            yield term
+
+def term_counts(words):
+
+    # words are the text node strings collected while the page rendered. the words are counted
+    # first, so each distinct word is normalized once per page
+    counts = {}
+    for word, count in Counter(TOKEN_PATTERN.findall("\n".join(words))).items():
+        term = word_term(word)
+        if term is not None:
+            counts[term] = counts.get(term, 0) + count
+    return counts
+
+def shard_name(term):
+
+    # prefixes outside a-z and 0-9 are hex encoded so every shard has a plain file name
+    prefix = term[:PREFIX_LENGTH]
+    if SHARD_NAME_PATTERN.fullmatch(prefix):
+        return prefix
+    return "_" + prefix.encode().hex()
+
+def encode_postings(postings):
+
+    # (document id, term count) pairs in ascending id order, flattened to [gap, count, gap, count, ...]
+    encoded = []
+    previous = 0
+    for document_id, count in postings:
+        encoded.extend((document_id - previous, count))
+        previous = document_id
+    return encoded
+
+def decode_postings(encoded):
+
+    postings = []
+    document_id = 0
+    for index in range(0, len(encoded), 2):
+        document_id += encoded[index]
+        postings.append((document_id, encoded[index + 1]))
+    return postings
+
+def compact_json(value):
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+
+def write_search_index(documents, output_dir):
+
+    # documents are (url, title, term counts). document ids follow url order so an unchanged site
+    # produces the same files, and write_if_changed leaves them alone
+    documents = sorted(documents)
+    os.makedirs(output_dir, exist_ok=True)
+
+    shards = {}
+    for document_id, (_, _, counts) in enumerate(documents):
+        for term, count in counts.items():
+            shards.setdefault(shard_name(term), {}).setdefault(term, []).append((document_id, count))
+
+    files = {DOCUMENTS_FILE: compact_json([[url, title] for url, title, _ in documents])}
+    for name, terms in shards.items():
+        files[f"{name}.json"] = compact_json({term: encode_postings(postings) for term, postings in terms.items()})
+
+    manifest = {
+        "format": SEARCH_FORMAT,
+        "prefix_length": PREFIX_LENGTH,
+        "documents": DOCUMENTS_FILE,
+        "shards": sorted(shards),
+    }
+    files[SEARCH_MANIFEST_FILE] = compact_json(manifest)
+
+    written = sum(write_if_changed(output_dir + name, text) for name, text in files.items())
+
+    # shards for prefixes no page uses anymore, their .gz siblings are the compressor's to remove
+    for name in os.listdir(output_dir):
+        if name.endswith(".json") and name not in files:
+            os.remove(output_dir + name)
+
+    size = sum(len(text.encode()) for text in files.values())
+    term_count = sum(len(terms) for terms in shards.values())
+    print(f"Search index: {len(documents)} pages, {term_count} terms in {len(shards)} shards, {size} bytes, {written} files written")
+    return size
+
+def index_pages(results, target_dir, basepath):
+
+    # pages by the url a browser links to, /blog/tom/ rather than /blog/tom/index.html
+    documents = []
+    for result in results:
+        if result.error is not None or result.search is None:
+            continue
+        url = "/" + result.target_file[len(target_dir):]
+        if url.endswith("/index.html"):
+            url = url[:-len("index.html")]
+        title, counts = result.search
+        documents.append((basepath + url[1:], title, counts))
+
+    return write_search_index(documents, target_dir + SEARCH_DIR)
+
+def remove_search_index(target_dir):
+
+    # an index from an earlier --search build would go on answering for pages that changed since
+    if not os.path.exists(target_dir + SEARCH_DIR + SEARCH_MANIFEST_FILE):
+        return False
+
+    shutil.rmtree(target_dir + SEARCH_DIR)
+    print(f"Removed {target_dir + SEARCH_DIR}, --search is off")
+    return True
+
+class SearchIndex():
+
+    # reads the index the way the browser does, the manifest first and then only the shards a query needs
+    def __init__(self, search_dir):
+        self.search_dir = search_dir
+        with open(search_dir + SEARCH_MANIFEST_FILE, 'r') as file:
+            self.manifest = json.load(file)
+        if self.manifest["format"] != SEARCH_FORMAT:
+            raise ValueError(f"search index format {self.manifest['format']} is not {SEARCH_FORMAT}")
+
+        with open(search_dir + self.manifest["documents"], 'r') as file:
+            self.documents = json.load(file)
+        self.available_shards = set(self.manifest["shards"])
+        self.shards = {}
+
+    def __repr__(self):
+        return f"SearchIndex({self.search_dir}, {len(self.documents)} pages)"
+
+    def postings(self, term):
+
+        name = shard_name(term)
+        if name not in self.available_shards:
+            return []
+
+        if name not in self.shards:
+            with open(f"{self.search_dir}{name}.json", 'r') as file:
+                self.shards[name] = json.load(file)
+        return decode_postings(self.shards[name].get(term, []))
+
+    def search(self, query, limit=10):
+
+        # pages containing every term of the query, those using the terms most often first
+        scores = None
+        for term in dict.fromkeys(tokenize(query)):
+            term_scores = dict(self.postings(term))
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {document_id: score + term_scores[document_id] for document_id, score in scores.items() if document_id in term_scores}
+            if not scores:
+                return []
+
+        if scores is None:
+            return []
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        return [tuple(self.documents[document_id]) for document_id, _ in ranked]
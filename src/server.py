@@ -0,0 +1,399 @@
+import argparse, email.utils, hashlib, json, mimetypes, os, posixpath, threading, time, traceback
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+from block_cache import BlockCache
+from fingerprint import ASSET_MANIFEST_FILE
+from inventory import SiteInventory
+from page_generator import render_page, target_path
+from template import load_template
+
+VERSION_PATH = "/__version"
+
+# fingerprinted names change with their content, so a browser never has to ask about them again
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# everything else is kept but revalidated, which costs a 304 when nothing changed
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# polls the build version and reloads the page once the watcher has rebuilt something
+RELOAD_SCRIPT = """<script>
+(function () {
+  var version = null;
+  setInterval(function () {
+    fetch("%s").then(function (response) { return response.text(); }).then(function (latest) {
+      if (version !== null && latest !== version) { location.reload(); }
+      version = latest;
+    }).catch(function () {});
+  }, 1000);
+})();
+</script>""" % VERSION_PATH
+
+def content_type(url_path):
+
+    guessed_type, _ = mimetypes.guess_type(url_path)
+    if guessed_type is None:
+        return "application/octet-stream"
+    if guessed_type.startswith("text/") or guessed_type in ("application/javascript", "application/json"):
+        return guessed_type + "; charset=utf-8"
+    return guessed_type
+
+class WatchedSite():
+
+    def __init__(self, content_dir="content/", static_dir="static/", template_path="template.html", basepath="/"):
+        self.content_dir = content_dir
+        self.static_dir = static_dir
+        self.template_path = template_path
+        self.basepath = basepath
+
+        # fragments of unchanged blocks survive page edits, only held in memory while serving
+        self.block_cache = BlockCache(basepath)
+        self.template = None
+        self.sources = {}
+        self.files = {}
+        self.version = 0
+        self.lock = threading.Lock()
+
+    def page_url(self, src_file):
+        relative_dir = os.path.dirname(src_file[len(self.content_dir):])
+        return target_path(src_file, posixpath.join("/", relative_dir, ""))
+
+    def asset_url(self, src_file):
+        return "/" + src_file[len(self.static_dir):]
+
+    def render(self, src_file):
+
+        try:
+            page_html = render_page(src_file, self.template_path, self.basepath, self.block_cache)
+        except Exception:
+            print(f"Failed to render {src_file}")
+            return 500, traceback.format_exc().encode()
+
+        return 200, page_html.replace("</body>", RELOAD_SCRIPT + "</body>", 1).encode()
+
+    def refresh(self):
+
+        start = time.perf_counter()
+
+        # load_template hands back the cached object until the template or a partial changes on disk
+        try:
+            template = load_template(self.template_path, self.basepath)
+        except FileNotFoundError:
+            template = None
+        template_changed = template is not self.template
+        self.template = template
+
+        inventory = SiteInventory.scan(self.content_dir, self.static_dir)
+        pages = {page.path: (page.mtime_ns, page.size) for page in inventory.pages}
+        assets = {asset.path: (asset.mtime_ns, asset.size) for asset in inventory.assets}
+
+        updates = {}
+        for src_file, stamp in pages.items():
+            if template_changed or self.sources.get(src_file) != stamp:
+                updates[self.page_url(src_file)] = self.render(src_file)
+
+        for src_file, stamp in assets.items():
+            if self.sources.get(src_file) != stamp:
+                with open(src_file, 'rb') as file:
+                    updates[self.asset_url(src_file)] = (200, file.read())
+
+        removed = []
+        for src_file in self.sources.keys() - pages.keys() - assets.keys():
+            if src_file.startswith(self.content_dir):
+                removed.append(self.page_url(src_file))
+            else:
+                removed.append(self.asset_url(src_file))
+
+        if not updates and not removed:
+            return 0
+
+        with self.lock:
+            self.files.update(updates)
+            for url_path in removed:
+                self.files.pop(url_path, None)
+            self.sources = {**pages, **assets}
+            self.version += 1
+
+        print(f"Rebuilt {len(updates)} files, removed {len(removed)} in {(time.perf_counter() - start) * 1000:.1f} ms")
+        return len(updates) + len(removed)
+
+    def watch(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.refresh()
+            except Exception:
+                traceback.print_exc()
+
+    def get(self, url_path):
+
+        if url_path == VERSION_PATH:
+            return 200, str(self.version).encode()
+
+        with self.lock:
+            return self.files.get(url_path)
+
+def accepts_gzip(accept_encoding):
+
+    # "gzip", "gzip;q=0.5" or "*" accept it, "gzip;q=0" turns it down
+    for coding in (accept_encoding or "").split(","):
+        name, _, parameters = coding.partition(";")
+        if name.strip().lower() not in ("gzip", "*"):
+            continue
+        quality = parameters.strip().lower().removeprefix("q=")
+        try:
+            return parameters.strip() == "" or float(quality) > 0
+        except ValueError:
+            return True
+    return False
+
+def etag_matches(if_none_match, etag):
+    # If-None-Match compares weakly, a W/ prefix doesn't matter
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+class StaticFile():
+
+    # one file of the built site with its validators, and its precompressed sibling when there is one
+    __slots__ = ("body", "etag", "last_modified", "mtime", "gzip_body", "gzip_etag", "immutable")
+
+    def __init__(self, body, mtime, gzip_body=None, immutable=False):
+        content_hash = hashlib.sha256(body).hexdigest()[:20]
+        self.body = body
+        self.etag = f"\"{content_hash}\""
+        self.mtime = int(mtime)
+        self.last_modified = email.utils.formatdate(self.mtime, usegmt=True)
+        self.gzip_body = gzip_body
+        # a different encoding is a different representation, so it gets its own strong tag
+        self.gzip_etag = None if gzip_body is None else f"\"{content_hash}-gz\""
+        self.immutable = immutable
+
+    def __repr__(self):
+        return f"StaticFile({self.etag}, {len(self.body)} bytes)"
+
+    def size(self):
+        return len(self.body) + (0 if self.gzip_body is None else len(self.gzip_body))
+
+class FileCache():
+
+    # least recently used files are dropped once the bodies held exceed max_bytes
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def __repr__(self):
+        return f"FileCache({len(self.entries)} files, {self.size} of {self.max_bytes} bytes)"
+
+    def get(self, path, stamp):
+
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is None or entry[0] != stamp:
+                return None
+            self.entries.move_to_end(path)
+            return entry[1]
+
+    def put(self, path, stamp, static_file):
+
+        # a file that would push out most of the cache is served straight from disk instead
+        size = static_file.size()
+        if size > self.max_bytes // 4:
+            return
+
+        with self.lock:
+            previous = self.entries.pop(path, None)
+            if previous is not None:
+                self.size -= previous[1].size()
+
+            self.entries[path] = (stamp, static_file)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.size -= evicted.size()
+
+def file_stamp(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+class DirectorySite():
+
+    def __init__(self, root_dir="docs/", cache_bytes=64 * 1024 * 1024):
+        self.root_dir = os.path.abspath(root_dir)
+        self.cache = FileCache(cache_bytes)
+        self.immutable_urls = frozenset()
+        self.asset_manifest_stamp = None
+        self.lock = threading.Lock()
+
+    def fingerprinted_urls(self):
+
+        # asset-manifest.json lists the fingerprinted copies, it is read again only when it changes
+        manifest_path = os.path.join(self.root_dir, ASSET_MANIFEST_FILE)
+        stamp = file_stamp(manifest_path)
+        with self.lock:
+            if stamp != self.asset_manifest_stamp:
+                try:
+                    with open(manifest_path, 'r') as file:
+                        self.immutable_urls = frozenset(json.load(file).values())
+                except (FileNotFoundError, ValueError):
+                    self.immutable_urls = frozenset()
+                self.asset_manifest_stamp = stamp
+            return self.immutable_urls
+
+    def get(self, url_path):
+
+        file_path = os.path.join(self.root_dir, url_path.lstrip("/"))
+        if not os.path.isfile(file_path):
+            return None
+
+        # a stat of the file and its .gz sibling per request, the bytes come from memory while both are unchanged
+        gzip_path = file_path + ".gz"
+        stamp = (file_stamp(file_path), file_stamp(gzip_path))
+        static_file = self.cache.get(file_path, stamp)
+        if static_file is not None:
+            return static_file
+
+        with open(file_path, 'rb') as file:
+            body = file.read()
+
+        # the compressor gives a sibling the mtime of its plain file, one that differs was left behind
+        # by an older build and no longer matches what plain clients get
+        gzip_body = None
+        if stamp[1] is not None and stamp[1][0] == stamp[0][0]:
+            with open(gzip_path, 'rb') as file:
+                gzip_body = file.read()
+
+        static_file = StaticFile(body, stamp[0][0] / 1e9, gzip_body, url_path in self.fingerprinted_urls())
+        self.cache.put(file_path, stamp, static_file)
+        return static_file
+
+class SiteRequestHandler(BaseHTTPRequestHandler):
+
+    # keep-alive, every response carries its length. headers and body go out as separate writes,
+    # without TCP_NODELAY the second one waits for the delayed ack of the first
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    # idle keep-alive connections give their thread back after this many seconds
+    timeout = 30
+
+    def lookup(self):
+
+        url_path = posixpath.normpath(unquote(urlsplit(self.path).path))
+        if self.path.split("?", 1)[0].endswith("/") and url_path != "/":
+            url_path += "/"
+
+        # normpath resolves "..", so the path can no longer climb out of the site
+        candidates = [url_path + "index.html"] if url_path.endswith("/") else [url_path, url_path + "/index.html"]
+        for candidate in candidates:
+            response = self.server.site.get(candidate)
+            if response is not None:
+                return candidate, response
+
+        return url_path, None
+
+    def respond(self, send_body):
+
+        url_path, response = self.lookup()
+        if response is None:
+            self.send_error(404, "File not found")
+            return
+
+        if isinstance(response, StaticFile):
+            self.respond_static(url_path, response, send_body)
+            return
+
+        status, body = response
+        self.send_response(status)
+        self.send_header("Content-Type", content_type(url_path) if status == 200 else "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+        if send_body:
+            self.wfile.write(body)
+
+    def not_modified(self, static_file, etag):
+
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            return etag_matches(if_none_match, etag)
+
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since is None:
+            return False
+        try:
+            return static_file.mtime <= email.utils.parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+
+    def respond_static(self, url_path, static_file, send_body):
+
+        use_gzip = static_file.gzip_body is not None and accepts_gzip(self.headers.get("Accept-Encoding"))
+        body = static_file.gzip_body if use_gzip else static_file.body
+        etag = static_file.gzip_etag if use_gzip else static_file.etag
+        not_modified = self.not_modified(static_file, etag)
+
+        self.send_response(304 if not_modified else 200)
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", static_file.last_modified)
+        self.send_header("Cache-Control", IMMUTABLE_CACHE_CONTROL if static_file.immutable else REVALIDATE_CACHE_CONTROL)
+        if static_file.gzip_body is not None:
+            self.send_header("Vary", "Accept-Encoding")
+
+        if not_modified:
+            self.end_headers()
+            return
+
+        self.send_header("Content-Type", content_type(url_path))
+        if use_gzip:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+
+        if send_body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        self.respond(send_body=True)
+
+    def do_HEAD(self):
+        self.respond(send_body=False)
+
+def main(argv):
+
+    parser = argparse.ArgumentParser(prog="main.py serve", description="Serve the site locally")
+    parser.add_argument("--watch", action="store_true", help="render into memory and rebuild changed pages while serving")
+    parser.add_argument("--port", type=int, default=8888)
+    parser.add_argument("--bind", default="", help="address to listen on, all interfaces by default")
+    parser.add_argument("--interval", type=float, default=0.5, help="seconds between polls for changes in watch mode")
+    parser.add_argument("--directory", default="docs/", help="directory to serve when not watching")
+    parser.add_argument("--cache-size", type=int, default=64, metavar="MB", help="memory for recently served files when not watching")
+    parser.add_argument("--quiet", action="store_true", help="don't log every request")
+    args = parser.parse_args(argv)
+
+    if args.watch:
+        site = WatchedSite()
+        site.refresh()
+        threading.Thread(target=site.watch, args=(args.interval,), daemon=True).start()
+    else:
+        site = DirectorySite(args.directory, args.cache_size * 1024 * 1024)
+
+    server = ThreadingHTTPServer((args.bind, args.port), SiteRequestHandler)
+    server.site = site
+    server.quiet = args.quiet
+    print(f"Serving on http://{args.bind or 'localhost'}:{args.port}/")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
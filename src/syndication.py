@@ -0,0 +1,208 @@
+import html, io, os
+from xml.sax.saxutils import escape, quoteattr
+
+from file_manager import write_if_changed
+from htmlnode import LeafNode, Minifier, ParentNode
+from page_generator import PageResult, target_path
+from template import load_template
+
+FEED_FILE = "feed.xml"
+SITEMAP_FILE = "sitemap.xml"
+BLOG_DIR = "blog/"
+FEED_ENTRIES = 20
+
+def page_url(relative_file):
+
+    # relative_file is the page's path below the output directory, pages are linked by their
+    # directory, /blog/tom/ rather than /blog/tom/index.html
+    url = "/" + relative_file
+    if url.endswith("/index.html"):
+        return url[:-len("index.html")]
+    return url
+
+def absolute_url(url, basepath, site_url):
+    return site_url.rstrip("/") + basepath + url[1:]
+
+def atom_feed(posts, basepath, site_url, site_title):
+
+    entries = []
+    for post in posts[:FEED_ENTRIES]:
+        url = absolute_url(page_url(post.target_file), basepath, site_url)
+        entries.append("<entry>")
+        entries.append(f"  <title>{escape(post.title)}</title>")
+        entries.append(f"  <link href={quoteattr(url)} />")
+        entries.append(f"  <id>{escape(url)}</id>")
+        entries.append(f"  <updated>{post.updated()}T00:00:00Z</updated>")
+        if post.summary:
+            entries.append(f"  <summary>{escape(post.summary)}</summary>")
+        entries.extend(f"  <category term={quoteattr(tag)} />" for tag in post.tags)
+        entries.append("</entry>")
+
+    site_root = absolute_url("/", basepath, site_url)
+    updated = max((post.updated() for post in posts), default="1970-01-01")
+
+    return "\n".join([
+        "<?xml version=\"1.0\" encoding=\"utf-8\"?>",
+        "<feed xmlns=\"http://www.w3.org/2005/Atom\">",
+        f"<title>{escape(site_title)}</title>",
+        f"<link href={quoteattr(site_root)} />",
+        f"<link rel=\"self\" href={quoteattr(absolute_url('/' + FEED_FILE, basepath, site_url))} />",
+        f"<id>{escape(site_root)}</id>",
+        f"<updated>{updated}T00:00:00Z</updated>",
+        *entries,
+        "</feed>",
+        "",
+    ])
+
+def sitemap(pages, extra_urls, basepath, site_url):
+
+    urls = [(page_url(page.target_file), page.updated()) for page in pages]
+    urls.extend(extra_urls)
+
+    lines = ["<?xml version=\"1.0\" encoding=\"utf-8\"?>", "<urlset xmlns=\"http://www.sitemaps.org/schemas/sitemap/0.9\">"]
+    for url, lastmod in sorted(urls):
+        lines.append(f"<url><loc>{escape(absolute_url(url, basepath, site_url))}</loc><lastmod>{lastmod}</lastmod></url>")
+    lines.extend(["</urlset>", ""])
+
+    return "\n".join(lines)
+
+def blog_index_url(page_number):
+    if page_number == 1:
+        return "/" + BLOG_DIR
+    return f"/{BLOG_DIR}page/{page_number}/"
+
+def blog_index_node(posts, page_number, page_count):
+
+    items = []
+    for post in posts:
+        children = [
+            LeafNode("a", html.escape(post.title, quote=False), {"href": page_url(post.target_file)}),
+            LeafNode(None, " "),
+            LeafNode("time", post.updated(), {"datetime": post.updated()}),
+        ]
+        if post.summary:
+            children.append(LeafNode("p", html.escape(post.summary, quote=False)))
+        if post.tags:
+            children.append(LeafNode("p", "Tags: " + html.escape(", ".join(post.tags), quote=False)))
+        items.append(ParentNode("li", children))
+
+    navigation = []
+    if page_number > 1:
+        navigation.append(LeafNode("a", "Newer posts", {"href": blog_index_url(page_number - 1)}))
+    if page_number < page_count:
+        if navigation:
+            navigation.append(LeafNode(None, " "))
+        navigation.append(LeafNode("a", "Older posts", {"href": blog_index_url(page_number + 1)}))
+
+    children = [LeafNode("h1", "Blog"), ParentNode("ul", items)]
+    if navigation:
+        children.append(ParentNode("p", navigation))
+
+    return ParentNode("div", children)
+
+def collect_node_links(node, links):
+
+    # the listing is built here rather than parsed, so its links are read straight off the nodes
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node.children is not None:
+            stack.extend(reversed(node.children))
+        elif node.tag == "a":
+            links.append(("link", node.props["href"]))
+
+def write_blog_index(posts, target_dir, template_path, basepath, posts_per_page, minify, assets, inline_css):
+
+    template = load_template(template_path, basepath, minify, assets, inline_css)
+    page_count = max(1, -(-len(posts) // posts_per_page))
+    results = []
+
+    for page_number in range(1, page_count + 1):
+        page_posts = posts[(page_number - 1) * posts_per_page:page_number * posts_per_page]
+        target_file = target_dir + blog_index_url(page_number)[1:] + "index.html"
+        title = "Blog" if page_number == 1 else f"Blog, page {page_number}"
+
+        node = blog_index_node(page_posts, page_number, page_count)
+        result = PageResult(target_file, target_file, [])
+        collect_node_links(node, result.links)
+
+        output = io.StringIO()
+        minifier = Minifier() if minify else None
+        template.write_to(output, minifier, Title=title, Content=node)
+        write_if_changed(target_file, output.getvalue())
+
+        results.append(result)
+
+    return results
+
+def remove_outputs(stale_outputs, target_dir, page_targets):
+
+    # page_targets are the rendered pages, relative to target_dir. blog/index.html stops being generated
+    # once content/blog/index.md exists, and is then that page's output
+    for stale_output in stale_outputs:
+        if stale_output in page_targets:
+            continue
+
+        stale_file = target_dir + stale_output
+        if os.path.exists(stale_file):
+            print(f"Removing {stale_file}, it is no longer generated")
+            os.remove(stale_file)
+
+            # blog/page/3/ goes away together with blog/page/ once it is the last listing page
+            stale_dir = os.path.dirname(stale_file)
+            while len(stale_dir) > len(target_dir.rstrip("/")) and not os.listdir(stale_dir):
+                os.rmdir(stale_dir)
+                stale_dir = os.path.dirname(stale_dir)
+
+def remove_site_indexes(metadata_index, target_dir, page_targets):
+
+    # a build without --feeds leaves no feed, sitemap or blog listing of an earlier build behind
+    remove_outputs(metadata_index.replace_outputs([]), target_dir, page_targets)
+
+def generate_site_indexes(metadata_index, target_dir, template_path, basepath, site_url="", posts_per_page=10, minify=False, assets=None, inline_css=0):
+
+    # everything here comes out of the metadata index, no markdown is read. the index records paths
+    # relative to the output directory, so it serves builds into docs/ and into a staging copy alike
+    pages = metadata_index.pages()
+    posts = metadata_index.posts()
+    content_targets = {page.target_file for page in pages}
+
+    results = []
+    if posts and BLOG_DIR + "index.html" not in content_targets:
+        results.extend(write_blog_index(posts, target_dir, template_path, basepath, posts_per_page, minify, assets, inline_css))
+    elif posts:
+        print(f"Not writing the blog index, content/{BLOG_DIR}index.md already provides /{BLOG_DIR}")
+
+    site_title = next((page.title for page in pages if page.target_file == "index.html"), "Blog")
+
+    feed_file = target_dir + FEED_FILE
+    write_if_changed(feed_file, atom_feed(posts, basepath, site_url, site_title))
+    results.append(PageResult(feed_file, feed_file, [("link", page_url(post.target_file)) for post in posts[:FEED_ENTRIES]]))
+
+    newest_post = posts[0].updated() if posts else None
+    index_urls = [(page_url(result.target_file[len(target_dir):]), newest_post) for result in results if result.target_file.endswith(".html")]
+
+    sitemap_file = target_dir + SITEMAP_FILE
+    write_if_changed(sitemap_file, sitemap(pages, index_urls, basepath, site_url))
+    results.append(PageResult(sitemap_file, sitemap_file, []))
+
+    # listing pages from a build with more posts than there are now
+    remove_outputs(metadata_index.replace_outputs([result.target_file[len(target_dir):] for result in results]), target_dir, content_targets)
+
+    print(f"Wrote {FEED_FILE}, {SITEMAP_FILE} and {len(results) - 2} blog index pages for {len(posts)} posts")
+    return results
+
+def index_site_pages(metadata_index, inventory):
+
+    # (page file, target file relative to the output directory, is_post) for every page, posts are
+    # the pages below content/blog/
+    pages = []
+    for page_file in inventory.pages:
+        relative_dir = page_file.relative_path[:page_file.relative_path.rfind("/") + 1]
+        target_file = target_path(page_file.path, relative_dir)
+        is_post = page_file.relative_path.startswith(BLOG_DIR) and page_file.relative_path != BLOG_DIR + "index.md"
+        pages.append((page_file, target_file, is_post))
+
+    changed = metadata_index.update(pages)
+    print(f"Metadata index: {changed} of {len(pages)} pages read")
+    return changed
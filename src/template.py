@@ -0,0 +1,186 @@
+import os, re
+
+from htmlnode import UNQUOTED_VALUE_PATTERN
+from inliner import stylesheet_inliner
+
+PLACEHOLDER_PATTERN = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+COMMENT_PATTERN = re.compile(r"\{#.*?#\}", re.DOTALL)
+EXTENDS_PATTERN = re.compile(r"^\s*\{%\s*extends\s+\"([^\"]+)\"\s*%\}")
+BLOCK_PATTERN = re.compile(r"\{%\s*block\s+(\w+)\s*%\}(.*?)\{%\s*endblock\s*%\}", re.DOTALL)
+INCLUDE_PATTERN = re.compile(r"\{%\s*include\s+\"([^\"]+)\"\s*%\}")
+URL_ATTRIBUTE_PATTERN = re.compile(r"\b(href|src)=\"([^\"]*)\"")
+LINK_TAG_PATTERN = re.compile(r"<link\b([^>]*?)\s*/?>", re.IGNORECASE)
+TAG_ATTRIBUTE_PATTERN = re.compile(r"([\w:-]+)=\"([^\"]*)\"")
+
+# markup inside these is left exactly as written by the minifier
+PRESERVED_MARKUP_PATTERN = re.compile(r"(<(pre|code|textarea|script|style)\b.*?</\2>)", re.DOTALL | re.IGNORECASE)
+HTML_COMMENT_PATTERN = re.compile(r"<!--(?!\[if).*?-->", re.DOTALL)
+INDENTATION_PATTERN = re.compile(r">[ \t\r\f]*\n[ \t\n\r\f]*<")
+WHITESPACE_RUN_PATTERN = re.compile(r"[ \t\n\r\f]{2,}|[\t\n\r\f]")
+QUOTED_ATTRIBUTE_PATTERN = re.compile(r"(\s[\w:-]+)=\"([^\"]*)\"(?=[\s>])")
+
+def read_source(path):
+    with open(path, 'r') as file:
+        return file.read()
+
+def minify_markup(text):
+
+    # runs once when the template is compiled, the markdown content is minified by the serializer
+    pieces = PRESERVED_MARKUP_PATTERN.split(text)
+    minified = []
+
+    for index, piece in enumerate(pieces):
+        if index % 3 == 1:
+            minified.append(piece)
+        elif index % 3 == 0:
+            # preserved markup starts and ends with a tag, stand-ins for those tags let the
+            # indentation next to it be recognized too
+            before = "" if index == 0 else ">"
+            after = "" if index == len(pieces) - 1 else "<"
+
+            piece = HTML_COMMENT_PATTERN.sub("", before + piece + after)
+            # whitespace between tags that spans lines is indentation, anything else still separates words
+            piece = INDENTATION_PATTERN.sub("><", piece)
+            piece = WHITESPACE_RUN_PATTERN.sub(" ", piece)
+            piece = QUOTED_ATTRIBUTE_PATTERN.sub(lambda match: f"{match[1]}={match[2]}" if UNQUOTED_VALUE_PATTERN.fullmatch(match[2]) else match[0], piece)
+            minified.append(piece[len(before):len(piece) - len(after)])
+
+    return "".join(minified)
+
+def basepath_rewriter(basepath, assets=None):
+
+    # fingerprinted asset names are looked up first, the basepath goes in front of whatever url comes out
+    def rewrite_url(url):
+        if assets is not None:
+            url = assets.rewrite(url)
+        if url.startswith("/"):
+            return basepath + url[1:]
+        return url
+
+    return rewrite_url
+
+class Template():
+
+    def __init__(self, source, template_dir="", rewrite_url=None, source_path=None, minify=False, inline_stylesheet=None):
+
+        self.template_dir = template_dir
+        self.rewrite_url = rewrite_url
+        self.minify = minify
+        self.dependencies = [] if source_path is None else [source_path]
+
+        text = self.resolve_source(source, {}, [])
+        if inline_stylesheet is not None:
+            text = LINK_TAG_PATTERN.sub(lambda match: self.inline_link(match, inline_stylesheet), text)
+        self.urls = [url for _, url in URL_ATTRIBUTE_PATTERN.findall(text)]
+
+        # urls in the template's own markup are rewritten once here instead of on every rendered page
+        if rewrite_url is not None:
+            text = URL_ATTRIBUTE_PATTERN.sub(lambda match: f"{match[1]}=\"{rewrite_url(match[2])}\"", text)
+
+        # what minifying the markup saved, the same on every page rendered with this template
+        self.bytes_saved = 0
+        if minify:
+            minified_text = minify_markup(text)
+            self.bytes_saved = len(text.encode()) - len(minified_text.encode())
+            text = minified_text
+
+        # str.split with a capturing group alternates literal text and placeholder names
+        pieces = PLACEHOLDER_PATTERN.split(text)
+        self.literals = pieces[0::2]
+        self.slots = pieces[1::2]
+
+    def __repr__(self):
+        return f"Template({self.slots}, {self.dependencies})"
+
+    @classmethod
+    def load(cls, template_path, rewrite_url=None, minify=False, inline_stylesheet=None):
+
+        return cls(read_source(template_path), os.path.dirname(template_path), rewrite_url, template_path, minify, inline_stylesheet)
+
+    def inline_link(self, match, inline_stylesheet):
+
+        # a small stylesheet goes into the page itself, saving the request for it. the stylesheet
+        # becomes a dependency so the template is compiled again when it changes
+        attributes = dict(TAG_ATTRIBUTE_PATTERN.findall(match[1]))
+        if attributes.get("rel", "").lower() != "stylesheet" or "href" not in attributes:
+            return match[0]
+
+        inlined = inline_stylesheet(attributes["href"])
+        if inlined is None:
+            return match[0]
+
+        path, css = inlined
+        self.dependencies.append(path)
+        media = f" media=\"{attributes['media']}\"" if "media" in attributes else ""
+        return f"<style{media}>{css}</style>"
+
+    def resolve_source(self, source, block_overrides, include_stack):
+
+        source = COMMENT_PATTERN.sub("", source)
+
+        # a child template only contributes blocks, the layout it extends provides the page around them
+        extends_match = EXTENDS_PATTERN.match(source)
+        if extends_match is not None:
+            child_blocks = {name: body for name, body in BLOCK_PATTERN.findall(source)}
+            child_blocks.update(block_overrides)
+            return self.resolve_file(extends_match[1], child_blocks, include_stack)
+
+        source = BLOCK_PATTERN.sub(lambda match: block_overrides.get(match[1], match[2]), source)
+        return INCLUDE_PATTERN.sub(lambda match: self.resolve_file(match[1], {}, include_stack), source)
+
+    def resolve_file(self, name, block_overrides, include_stack):
+
+        path = os.path.join(self.template_dir, name)
+        if path in include_stack:
+            raise ValueError(f"template {path} includes itself")
+
+        self.dependencies.append(path)
+        return self.resolve_source(read_source(path), block_overrides, include_stack + [path])
+
+    def render(self, **values):
+
+        parts = [self.literals[0]]
+        for slot, literal in zip(self.slots, self.literals[1:]):
+            parts.append(values.get(slot, ""))
+            parts.append(literal)
+
+        return "".join(parts)
+
+    def write_to(self, fp, minifier=None, **values):
+
+        # HTMLNode values are streamed into fp instead of being serialized to a string first
+        if minifier is not None:
+            minifier.saved += self.bytes_saved
+
+        fp.write(self.literals[0])
+        for slot, literal in zip(self.slots, self.literals[1:]):
+            value = values.get(slot, "")
+            if isinstance(value, str):
+                fp.write(value if minifier is None else minifier.text(value))
+            else:
+                value.write_to(fp, self.rewrite_url, minifier)
+            fp.write(literal)
+
+_compiled_templates = {}
+
+def template_mtimes(paths):
+    return tuple(os.stat(path).st_mtime_ns for path in paths)
+
+def load_template(template_path, basepath, minify=False, assets=None, inline_css=0, static_dir="static/"):
+
+    # compile once per process, recompiling only when the template or one of its partials changes
+    key = (template_path, basepath, minify, None if assets is None else assets.version, inline_css, static_dir)
+    cached = _compiled_templates.get(key)
+    if cached is not None:
+        template, mtimes = cached
+        try:
+            if template_mtimes(template.dependencies) == mtimes:
+                return template
+        except FileNotFoundError:
+            pass
+
+    inline_stylesheet = stylesheet_inliner(static_dir, inline_css) if inline_css > 0 else None
+    template = Template.load(template_path, basepath_rewriter(basepath, assets), minify, inline_stylesheet)
+    _compiled_templates[key] = (template, template_mtimes(template.dependencies))
+
+    return template
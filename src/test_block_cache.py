@@ -0,0 +1,109 @@
+import io, os, tempfile, unittest
+
+from block_cache import BlockCache
+from markdown import BlockType
+from markdown_interpreter import MarkdownDocument, markdown_to_html_node
+from template import basepath_rewriter
+
+MARKDOWN = """
+# Title with [a link](/home)
+
+A paragraph with **bold** text
+
+- a list
+- of items
+
+A paragraph with **bold** text
+"""
+
+class TestBlockCache(unittest.TestCase):
+
+    def test_same_html_as_uncached(self):
+        rewrite_url = basepath_rewriter("/site/")
+        block_cache = BlockCache("/site/")
+
+        fp = io.StringIO()
+        MarkdownDocument(MARKDOWN, block_cache).write_to(fp, rewrite_url)
+
+        self.assertEqual(fp.getvalue(), markdown_to_html_node(MARKDOWN).to_html(rewrite_url))
+
+    def test_hits_and_misses(self):
+        block_cache = BlockCache("/")
+        MarkdownDocument(MARKDOWN, block_cache).write_to(io.StringIO())
+
+        self.assertEqual((block_cache.hits, block_cache.misses), (1, 3))
+
+        MarkdownDocument(MARKDOWN, block_cache).write_to(io.StringIO())
+        self.assertEqual((block_cache.hits, block_cache.misses), (5, 3))
+
+    def test_links_reported_on_hits(self):
+        block_cache = BlockCache("/")
+
+        for _ in range(2):
+            links = []
+            MarkdownDocument(MARKDOWN, block_cache, links).write_to(io.StringIO())
+            self.assertEqual(links, [("link", "/home")])
+
+    def test_words_reported_on_hits(self):
+        block_cache = BlockCache("/")
+
+        results = []
+        for _ in range(2):
+            words = []
+            MarkdownDocument(MARKDOWN, block_cache, words=words).write_to(io.StringIO())
+            results.append(words)
+
+        self.assertEqual(results[0], results[1])
+        self.assertIn("bold", results[0])
+
+    def test_rewritten_urls_in_key(self):
+        block_cache = BlockCache("/")
+        block = "![a](/images/a.png)"
+
+        first = block_cache.render(block, BlockType.PARAGRAPH, lambda url: url.replace(".png", ".1111.png"))
+        second = block_cache.render(block, BlockType.PARAGRAPH, lambda url: url.replace(".png", ".2222.png"))
+
+        self.assertIn(".1111.png", first)
+        self.assertIn(".2222.png", second)
+
+    def test_block_type_in_key(self):
+        block_cache = BlockCache("/")
+        self.assertNotEqual(block_cache.key("text", BlockType.PARAGRAPH), block_cache.key("text", BlockType.HEADING))
+
+    def test_lru_eviction(self):
+        block_cache = BlockCache("/", max_entries=2)
+        for text in ("one", "two", "one", "three"):
+            block_cache.render(text, BlockType.PARAGRAPH)
+
+        self.assertEqual(len(block_cache), 2)
+        block_cache.render("one", BlockType.PARAGRAPH)
+        self.assertEqual(block_cache.hits, 2)
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache_path = os.path.join(temp_dir, "blocks.bin")
+
+            block_cache = BlockCache("/")
+            block_cache.render("cached **text**", BlockType.PARAGRAPH)
+            block_cache.save(cache_path)
+
+            loaded_cache = BlockCache("/")
+            loaded_cache.load(cache_path)
+            self.assertEqual(loaded_cache.render("cached **text**", BlockType.PARAGRAPH), "<p>cached <b>text</b></p>")
+            self.assertEqual(loaded_cache.hits, 1)
+
+            other_context = BlockCache("/site/")
+            other_context.load(cache_path)
+            self.assertEqual(len(other_context), 0)
+
+    def test_drain_new_entries(self):
+        block_cache = BlockCache("/")
+        block_cache.render("new", BlockType.PARAGRAPH)
+
+        new_entries = block_cache.drain_new_entries()
+        self.assertEqual(list(new_entries.values()), [("<p>new</p>", (), 0, ("new",))])
+        self.assertEqual(block_cache.drain_new_entries(), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
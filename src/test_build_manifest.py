@@ -0,0 +1,95 @@
+import contextlib, io, os, unittest
+
+from build_manifest import page_input_hash
+from fixtures import TEMPLATE, TempDirTestCase
+from page_generator import generate_pages_incremental
+
+class TestPageInputHash(unittest.TestCase):
+
+    def test_same_inputs_same_hash(self):
+        first = page_input_hash(b"# Title", "template-hash", "/", [("static/a.png", "a-hash")])
+        second = page_input_hash(b"# Title", "template-hash", "/", [("static/a.png", "a-hash")])
+        self.assertEqual(first, second)
+
+    def test_markdown_change(self):
+        first = page_input_hash(b"# Title", "template-hash", "/", [])
+        second = page_input_hash(b"# Title!", "template-hash", "/", [])
+        self.assertNotEqual(first, second)
+
+    def test_template_change(self):
+        first = page_input_hash(b"# Title", "template-hash", "/", [])
+        second = page_input_hash(b"# Title", "other-template-hash", "/", [])
+        self.assertNotEqual(first, second)
+
+    def test_basepath_change(self):
+        first = page_input_hash(b"# Title", "template-hash", "/", [])
+        second = page_input_hash(b"# Title", "template-hash", "/website/", [])
+        self.assertNotEqual(first, second)
+
+    def test_static_file_change(self):
+        first = page_input_hash(b"# Title", "template-hash", "/", [("static/a.png", "a-hash")])
+        second = page_input_hash(b"# Title", "template-hash", "/", [("static/a.png", "b-hash")])
+        self.assertNotEqual(first, second)
+
+class TestIncrementalBuild(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.dest_dir = self.root + "docs/"
+
+        self.write("template.html", TEMPLATE)
+        self.write("content/index.md", "# Home")
+        self.write("content/blog/post/index.md", "# Post\n\nSome **bold** text")
+        os.makedirs(self.root + "static")
+
+    def build(self):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            results = generate_pages_incremental(self.root + "content/", self.root + "template.html", self.dest_dir, "/", self.root + "static/", self.root + "manifest.json")
+        return results, output.getvalue()
+
+    def test_unchanged_pages_skipped(self):
+        self.build()
+        mtime_ns = os.stat(self.dest_dir + "index.html").st_mtime_ns
+        self.write("content/blog/post/index.md", "# Post\n\nOther text")
+
+        results, output = self.build()
+        self.assertIn("1 of 2 pages regenerated", output)
+        self.assertEqual(len(results), 2)
+        self.assertEqual(os.stat(self.dest_dir + "index.html").st_mtime_ns, mtime_ns)
+
+    def test_output_of_removed_source_removed(self):
+        self.build()
+        os.remove(self.root + "content/blog/post/index.md")
+
+        _, output = self.build()
+        self.assertIn("its source is gone", output)
+        self.assertFalse(os.path.exists(self.dest_dir + "blog/post"))
+        self.assertTrue(os.path.exists(self.dest_dir + "index.html"))
+
+    def test_template_change_regenerates_every_page(self):
+        self.build()
+        self.write("template.html", "<h1>{{ Title }}</h1>{{ Content }}")
+
+        _, output = self.build()
+        self.assertIn("2 of 2 pages regenerated", output)
+        with open(self.dest_dir + "index.html", 'r') as file:
+            self.assertTrue(file.read().startswith("<h1>Home</h1>"))
+
+    def test_undecodable_page_fails_alone(self):
+        self.build()
+        with open(self.root + "content/blog/post/index.md", 'wb') as file:
+            file.write("# Caf\u00e9".encode("latin-1"))
+
+        results, output = self.build()
+        self.assertEqual([result.src_file for result in results if result.error is not None], [self.root + "content/blog/post/index.md"])
+        self.assertNotIn("its source is gone", output)
+
+        # forgotten by the manifest, so it is tried again once fixed
+        self.write("content/blog/post/index.md", "# Café")
+        _, output = self.build()
+        self.assertIn("1 of 2 pages regenerated", output)
+
+
+if __name__ == "__main__":
+    unittest.main()
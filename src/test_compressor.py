@@ -0,0 +1,63 @@
+import contextlib, gzip, io, os, unittest
+
+from compressor import compress_directory, compress_public_directory, gzip_bytes, remove_compressed_files
+from fixtures import TempDirTestCase
+
+class TestCompressor(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.target_dir = self.root + "docs/"
+        self.write("docs/index.html", "<p>hello</p>" * 100)
+        self.write("docs/blog/index.html", "<p>blog</p>" * 100)
+        self.write("docs/tiny.css", "a{}")
+        self.write("docs/image.png", "png" * 100)
+
+    def test_gzip_bytes_deterministic(self):
+        self.assertEqual(gzip_bytes(b"text" * 10), gzip_bytes(b"text" * 10))
+        self.assertEqual(gzip.decompress(gzip_bytes(b"text" * 10)), b"text" * 10)
+
+    def test_compresses_text_files(self):
+        records, results = compress_directory(self.target_dir, {})
+
+        self.assertEqual(sorted(records), ["blog/index.html", "index.html", "tiny.css"])
+        with open(self.target_dir + "index.html.gz", 'rb') as file:
+            self.assertEqual(gzip.decompress(file.read()), b"<p>hello</p>" * 100)
+
+        # the css compresses larger than it is, the png isn't a text asset
+        self.assertFalse(os.path.exists(self.target_dir + "tiny.css.gz"))
+        self.assertFalse(os.path.exists(self.target_dir + "image.png.gz"))
+
+    def test_unchanged_files_skipped(self):
+        records, _ = compress_directory(self.target_dir, {})
+        self.write(self.target_dir + "index.html", "<p>changed</p>" * 100, mtime_offset=1_000_000_000)
+
+        _, results = compress_directory(self.target_dir, records)
+        self.assertEqual([path for path, _, _ in results], [self.target_dir + "index.html"])
+
+    def test_missing_sibling_recompressed(self):
+        records, _ = compress_directory(self.target_dir, {})
+        os.remove(self.target_dir + "blog/index.html.gz")
+
+        _, results = compress_directory(self.target_dir, records)
+        self.assertEqual([path for path, _, _ in results], [self.target_dir + "blog/index.html"])
+
+    def test_orphaned_sibling_removed(self):
+        compress_directory(self.target_dir, {})
+        os.remove(self.target_dir + "blog/index.html")
+
+        compress_directory(self.target_dir, {})
+        self.assertFalse(os.path.exists(self.target_dir + "blog/index.html.gz"))
+
+    def test_siblings_removed_without_gzip(self):
+        manifest_path = self.root + "manifest.json"
+        with contextlib.redirect_stdout(io.StringIO()):
+            compress_public_directory(self.target_dir, manifest_path=manifest_path)
+            self.assertEqual(remove_compressed_files(self.target_dir, manifest_path), 2)
+            self.assertEqual(remove_compressed_files(self.target_dir, manifest_path), 0)
+
+        self.assertFalse(any(name.endswith(".gz") for name in os.listdir(self.target_dir)))
+        self.assertTrue(os.path.exists(self.target_dir + "index.html"))
+
+if __name__ == "__main__":
+    unittest.main()
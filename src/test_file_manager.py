@@ -0,0 +1,83 @@
+import os, unittest
+
+from file_manager import sync_directory, sync_file, write_output
+from fixtures import TempDirTestCase
+from inventory import scan_files
+
+class TestSyncDirectory(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.source_dir = self.root + "static/"
+        self.target_dir = self.root + "docs/"
+        self.write("static/index.css", "body {}")
+        self.write("static/images/a.png", "png")
+
+    def test_first_sync_copies_everything(self):
+        records, changed = sync_directory(scan_files(self.source_dir, "asset"), self.source_dir, self.target_dir, {})
+        self.assertEqual(sorted(records), ["images/a.png", "index.css"])
+        self.assertEqual(len(changed), 2)
+        self.assertEqual(self.read(self.target_dir + "images/a.png"), "png")
+
+    def test_unchanged_files_skipped(self):
+        records, _ = sync_directory(scan_files(self.source_dir, "asset"), self.source_dir, self.target_dir, {})
+        self.write(self.source_dir + "index.css", "body { color: red; }", mtime_offset=1_000_000_000)
+
+        _, changed = sync_directory(scan_files(self.source_dir, "asset"), self.source_dir, self.target_dir, records)
+
+        self.assertEqual(changed, [self.target_dir + "index.css"])
+        self.assertEqual(self.read(self.target_dir + "index.css"), "body { color: red; }")
+
+    def test_touched_file_skipped_by_hash(self):
+        records, _ = sync_directory(scan_files(self.source_dir, "asset"), self.source_dir, self.target_dir, {}, use_hash=True)
+        self.write(self.source_dir + "index.css", "body {}", mtime_offset=1_000_000_000)
+
+        _, changed = sync_directory(scan_files(self.source_dir, "asset"), self.source_dir, self.target_dir, records, use_hash=True)
+
+        self.assertEqual(changed, [])
+
+    def test_removed_files_deleted(self):
+        records, _ = sync_directory(scan_files(self.source_dir, "asset"), self.source_dir, self.target_dir, {})
+        os.remove(self.source_dir + "images/a.png")
+
+        records, _ = sync_directory(scan_files(self.source_dir, "asset"), self.source_dir, self.target_dir, records)
+
+        self.assertEqual(list(records), ["index.css"])
+        self.assertFalse(os.path.exists(self.target_dir + "images/a.png"))
+
+    def test_missing_target_recopied(self):
+        records, _ = sync_directory(scan_files(self.source_dir, "asset"), self.source_dir, self.target_dir, {})
+        os.remove(self.target_dir + "index.css")
+
+        _, changed = sync_directory(scan_files(self.source_dir, "asset"), self.source_dir, self.target_dir, records)
+
+        self.assertEqual(changed, [self.target_dir + "index.css"])
+
+    def test_hardlinked_target_replaced_not_written_through(self):
+        os.makedirs(self.target_dir)
+        target_file = self.target_dir + "index.css"
+        self.assertEqual(sync_file(self.source_dir + "index.css", target_file, hardlink=True), "hardlink")
+
+        other_file = self.write("other.css", "other")
+        sync_file(other_file, target_file)
+
+        self.assertEqual(self.read(self.source_dir + "index.css"), "body {}")
+        self.assertEqual(self.read(target_file), "other")
+
+    def test_failed_output_removed(self):
+        os.makedirs(self.target_dir)
+        target_file = self.target_dir + "index.html"
+        self.assertTrue(write_output(target_file, lambda file: file.write("old")))
+        self.assertFalse(write_output(target_file, lambda file: file.write("old")))
+
+        def fail(file):
+            file.write("half")
+            raise ValueError("broken page")
+
+        with self.assertRaises(ValueError):
+            write_output(target_file, fail)
+        self.assertEqual(os.listdir(self.target_dir), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
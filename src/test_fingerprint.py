@@ -0,0 +1,61 @@
+import os, tempfile, unittest
+
+from fingerprint import AssetManifest, fingerprint_assets, fingerprinted_path
+from inventory import scan_files
+from template import Template, basepath_rewriter
+
+class TestFingerprint(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.static_dir = self.temp_dir.name + "/static/"
+        self.target_dir = self.temp_dir.name + "/docs/"
+        os.makedirs(self.static_dir + "images")
+        os.makedirs(self.target_dir + "images")
+        self.write("index.css", "body {}")
+        self.write("images/a.png", "png")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write(self, name, text):
+        for root in (self.static_dir, self.target_dir):
+            if os.path.exists(root + name):
+                os.remove(root + name)
+            with open(root + name, 'w') as file:
+                file.write(text)
+
+    def test_fingerprinted_path(self):
+        self.assertEqual(fingerprinted_path("images/a.png", "0123456789abcdef"), "images/a.0123456789.png")
+        self.assertEqual(fingerprinted_path("LICENSE", "0123456789abcdef"), "LICENSE.0123456789")
+        self.assertEqual(fingerprinted_path(".htaccess", "0123456789abcdef"), ".htaccess.0123456789")
+
+    def test_rewrite(self):
+        assets = AssetManifest({"/index.css": "/index.0123456789.css"})
+        self.assertEqual(assets.rewrite("/index.css"), "/index.0123456789.css")
+        self.assertEqual(assets.rewrite("/index.css?v=2#top"), "/index.0123456789.css?v=2#top")
+        self.assertEqual(assets.rewrite("/other.css"), "/other.css")
+
+        template = Template("<link href=\"/index.css\" />{{ Content }}", rewrite_url=basepath_rewriter("/site/", assets))
+        self.assertEqual(template.literals[0], "<link href=\"/site/index.0123456789.css\" />")
+
+    def test_fingerprint_assets(self):
+        records, changed = fingerprint_assets(scan_files(self.static_dir, "asset"), self.target_dir, {})
+        self.assertEqual(len(changed), 2)
+
+        css_copy = self.target_dir + records["index.css"][2]
+        with open(css_copy, 'r') as file:
+            self.assertEqual(file.read(), "body {}")
+
+        _, changed = fingerprint_assets(scan_files(self.static_dir, "asset"), self.target_dir, records)
+        self.assertEqual(changed, [])
+
+        # new content gets a new name and the old copy goes away
+        self.write("index.css", "body { color: red; }")
+        new_records, changed = fingerprint_assets(scan_files(self.static_dir, "asset"), self.target_dir, records)
+        self.assertEqual(changed, [new_records["index.css"][2]])
+        self.assertNotEqual(new_records["index.css"][2], records["index.css"][2])
+        self.assertFalse(os.path.exists(css_copy))
+
+if __name__ == "__main__":
+    unittest.main()
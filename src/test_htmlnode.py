@@ -1,7 +1,7 @@
-import unittest
+import io, sys, unittest
 
 from textnode import TextNode, TextType
-from htmlnode import HTMLNode, ParentNode, LeafNode
+from htmlnode import HTMLNode, ParentNode, LeafNode, Minifier
 
 
 class TestHTMLNode(unittest.TestCase):
@@ -34,6 +34,21 @@ class TestHTMLNode(unittest.TestCase):
         node = HTMLNode(props=test_props)
         self.assertEqual(node.props_to_html(), "")
 
+class TestMinifier(unittest.TestCase):
+    def test_collapses_whitespace(self):
+        node = ParentNode("p", [LeafNode(None, "some   text\n"), LeafNode("b", "bold  text")])
+        minifier = Minifier()
+        self.assertEqual(node.to_html(None, minifier), "<p>some text <b>bold text</b></p>")
+        self.assertEqual(minifier.saved, 3)
+
+    def test_drops_quotes_where_safe(self):
+        node = LeafNode("img", "", {"src": "/images/a.png", "alt": "two words"})
+        self.assertEqual(node.to_html(None, Minifier()), "<img src=/images/a.png alt=\"two words\"></img>")
+
+    def test_preformatted_untouched(self):
+        node = ParentNode("div", [ParentNode("pre", [LeafNode("code", "a  =  1\n\n  b")]), LeafNode("code", "x  y")])
+        self.assertEqual(node.to_html(None, Minifier()), "<div><pre><code>a  =  1\n\n  b</code></pre><code>x  y</code></div>")
+
 class TestLeafNode(unittest.TestCase):
     def test_leaf_to_html_p(self):
         node = LeafNode("p", "Hello, world!")
@@ -58,6 +73,30 @@ class TestParentNode(unittest.TestCase):
             "<div><span><b>grandchild</b></span></div>",
         )
 
+    def test_iter_html_chunks(self):
+        parent_node = ParentNode("div", [LeafNode("b", "bold"), LeafNode(None, " text")])
+        self.assertEqual(list(parent_node.iter_html()), ["<div>", "<b>bold</b>", " text", "</div>"])
+
+    def test_write_to(self):
+        parent_node = ParentNode("div", [ParentNode("p", [LeafNode("a", "link", {"href": "/x"})])])
+        fp = io.StringIO()
+        parent_node.write_to(fp)
+        self.assertEqual(fp.getvalue(), parent_node.to_html())
+
+    def test_deep_nesting(self):
+        depth = sys.getrecursionlimit() * 2
+        node = LeafNode(None, "core")
+        for _ in range(depth):
+            node = ParentNode("span", [node])
+
+        html = node.to_html()
+        self.assertEqual(html, "<span>" * depth + "core" + "</span>" * depth)
+
+    def test_missing_tag_in_subtree(self):
+        parent_node = ParentNode("div", [ParentNode(None, [LeafNode(None, "x")])])
+        with self.assertRaises(ValueError):
+            parent_node.to_html()
+
 class TestTextNodeConversion(unittest.TestCase):
     def test_text(self):
         node = TextNode("This is a text node", TextType.NORMAL)
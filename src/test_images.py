@@ -0,0 +1,82 @@
+import os, struct, tempfile, unittest, zlib
+
+from images import ImageCatalog, image_dimensions, optimize_images, png_chunk, png_chunks, recompress_png, PNG_SIGNATURE
+from inventory import scan_files
+from markdown_interpreter import markdown_to_html_node
+
+def png_bytes(width, height):
+    # filter byte 0 and a gradient per row, compressed at level 1 so there is room to do better
+    raw = b"".join(b"\0" + bytes((x * 7 + y) % 256 for x in range(width * 3)) for y in range(height))
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return PNG_SIGNATURE + png_chunk(b"IHDR", header) + png_chunk(b"IDAT", zlib.compress(raw, 1)) + png_chunk(b"IEND", b"")
+
+def jpeg_bytes(width, height):
+    app0 = b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\0" + b"\0" * 9
+    frame = b"\xff\xc0" + struct.pack(">HBHHB", 11, 8, height, width, 1) + b"\x01\x11\x00"
+    return b"\xff\xd8" + app0 + frame + b"\xff\xd9"
+
+class TestImages(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.static_dir = self.temp_dir.name + "/static/"
+        self.target_dir = self.temp_dir.name + "/docs/"
+        os.makedirs(self.static_dir + "images")
+        os.makedirs(self.target_dir + "images")
+
+        self.write("images/a.png", png_bytes(40, 30))
+        self.write("images/b.jpg", jpeg_bytes(640, 480))
+        self.write("images/c.gif", b"GIF89a" + struct.pack("<HH", 16, 8) + b"\0" * 8)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write(self, name, data):
+        for root in (self.static_dir, self.target_dir):
+            with open(root + name, 'wb') as file:
+                file.write(data)
+
+    def test_dimensions(self):
+        self.assertEqual(image_dimensions(self.static_dir + "images/a.png"), (40, 30))
+        self.assertEqual(image_dimensions(self.static_dir + "images/b.jpg"), (640, 480))
+        self.assertEqual(image_dimensions(self.static_dir + "images/c.gif"), (16, 8))
+        self.assertIsNone(image_dimensions(self.static_dir + "images/missing.png"))
+
+    def test_attributes_injected(self):
+        images = ImageCatalog(self.static_dir)
+        html = markdown_to_html_node("![a](/images/b.jpg) ![b](https://example.com/x.png)", images=images).to_html()
+
+        self.assertEqual(
+            html,
+            "<div><p><img src=\"/images/b.jpg\" alt=\"a\" width=\"640\" height=\"480\" loading=\"lazy\"></img> <img src=\"https://example.com/x.png\" alt=\"b\" loading=\"lazy\"></img></p></div>",
+        )
+
+    def test_recompress_is_lossless(self):
+        data = png_bytes(40, 30)
+        recompressed = recompress_png(data)
+
+        self.assertLess(len(recompressed), len(data))
+        image_data = lambda png: zlib.decompress(b"".join(payload for chunk_type, payload in png_chunks(png) if chunk_type == b"IDAT"))
+        self.assertEqual(image_data(recompressed), image_data(data))
+        self.assertEqual([chunk_type for chunk_type, _ in png_chunks(recompressed)], [b"IHDR", b"IDAT", b"IEND"])
+
+    def test_optimize_cached_by_content(self):
+        cache_dir = self.temp_dir.name + "/cache/"
+        static_files = scan_files(self.static_dir, "asset")
+
+        records, pending = optimize_images(static_files, self.target_dir, {}, cache_dir=cache_dir)
+        self.assertEqual(len(pending), 1)
+        optimized_size = os.path.getsize(self.target_dir + "images/a.png")
+        self.assertLess(optimized_size, os.path.getsize(self.static_dir + "images/a.png"))
+
+        _, pending = optimize_images(static_files, self.target_dir, records, cache_dir=cache_dir)
+        self.assertEqual(pending, [])
+
+        # a fresh copy of the same source is served from the cache
+        self.write("images/a.png", png_bytes(40, 30))
+        _, pending = optimize_images(scan_files(self.static_dir, "asset"), self.target_dir, records, cache_dir=cache_dir)
+        self.assertEqual(len(pending), 1)
+        self.assertEqual(os.path.getsize(self.target_dir + "images/a.png"), optimized_size)
+
+if __name__ == "__main__":
+    unittest.main()
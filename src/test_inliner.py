@@ -0,0 +1,66 @@
+import base64, os, tempfile, unittest
+
+from images import ImageCatalog
+from inliner import data_uri, stylesheet_inliner
+from template import Template
+
+class TestInliner(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.static_dir = self.temp_dir.name + "/static/"
+        os.makedirs(self.static_dir + "images")
+
+        self.write("index.css", b"body { color: red; }")
+        self.write("fonts.css", b"@font-face { src: url(fonts/a.woff2); }")
+        self.write("images/dot.gif", b"GIF89a\x01\x00\x01\x00" + b"\0" * 8)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write(self, name, data):
+        with open(self.static_dir + name, 'wb') as file:
+            file.write(data)
+
+    def compile(self, source, limit=1000):
+        return Template(source, rewrite_url=lambda url: "/site" + url, inline_stylesheet=stylesheet_inliner(self.static_dir, limit))
+
+    def test_inline_stylesheet(self):
+        template = self.compile('<head><link rel="stylesheet" href="/index.css" media="screen" /></head>')
+        self.assertEqual(template.render(), '<head><style media="screen">body { color: red; }</style></head>')
+        self.assertIn(self.static_dir + "index.css", template.dependencies)
+
+    def test_stylesheet_kept_as_link(self):
+        # too large, refers to files next to it, or not a stylesheet at all
+        for source, limit in (
+            ('<link rel="stylesheet" href="/index.css">', 5),
+            ('<link rel="stylesheet" href="/fonts.css">', 1000),
+            ('<link rel="icon" href="/index.css">', 1000),
+            ('<link rel="stylesheet" href="https://example.com/index.css">', 1000),
+        ):
+            template = self.compile(source, limit)
+            self.assertIn("<link", template.render())
+            self.assertIn("href=\"", template.render())
+
+    def test_data_uri(self):
+        path = self.static_dir + "images/dot.gif"
+        with open(path, 'rb') as file:
+            encoded = base64.b64encode(file.read()).decode()
+
+        self.assertEqual(data_uri(path, 100), f"data:image/gif;base64,{encoded}")
+        self.assertIsNone(data_uri(path, 10))
+        self.assertIsNone(data_uri(self.static_dir + "images/missing.gif", 100))
+
+    def test_catalog_inlines_small_images(self):
+        catalog = ImageCatalog(self.static_dir, dimensions=False, inline_limit=100)
+        attributes = catalog.attributes("/images/dot.gif")
+        self.assertTrue(attributes["src"].startswith("data:image/gif;base64,"))
+        self.assertNotIn("loading", attributes)
+
+        # the signature follows the content, so cached blocks are rendered again when the image changes
+        signature = catalog.signature(["/images/dot.gif"])
+        self.write("images/dot.gif", b"GIF89a\x02\x00\x01\x00" + b"\0" * 9)
+        self.assertNotEqual(catalog.signature(["/images/dot.gif"]), signature)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -19,4 +19,19 @@ This is another paragraph with _italic_ text and `code` here
         self.assertEqual(
             html,
             "<div><p>This is <b>bolded</b> paragraph text in a p tag here</p><p>This is another paragraph with <i>italic</i> text and <code>code</code> here</p></div>",
-        )
\ No newline at end of file
+        )
+    def test_links_collected(self):
+        md = """
+# Back [home](/)
+
+- an ![image](/images/a.png) in a list
+
+> a quote with a [link](https://www.boot.dev)
+"""
+
+        links = []
+        markdown_to_html_node(md, links)
+        self.assertEqual(
+            links,
+            [("link", "/"), ("image", "/images/a.png"), ("link", "https://www.boot.dev")],
+        )
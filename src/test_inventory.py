@@ -0,0 +1,43 @@
+import os, tempfile, unittest
+
+from inventory import SiteInventory, is_junk
+
+class TestInventory(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = self.temp_dir.name + "/"
+
+        for path in ["content/index.md", "content/blog/tom/index.md", "content/blog/.DS_Store",
+                     "static/index.css", "static/images/tom.png", "static/images/tom.png:Zone.Identifier"]:
+            os.makedirs(os.path.dirname(self.root + path), exist_ok=True)
+            with open(self.root + path, 'w') as file:
+                file.write(path)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_scan(self):
+        inventory = SiteInventory.scan(self.root + "content/", self.root + "static/")
+
+        self.assertEqual([page.relative_path for page in inventory.pages], ["blog/tom/index.md", "index.md"])
+        self.assertEqual([asset.relative_path for asset in inventory.assets], ["images/tom.png", "index.css"])
+
+        page = inventory.pages[1]
+        self.assertEqual(page.path, self.root + "content/index.md")
+        self.assertEqual(page.kind, "page")
+        self.assertEqual(page.size, len("content/index.md"))
+        self.assertEqual(page.inode, os.stat(page.path).st_ino)
+
+    def test_missing_directory(self):
+        inventory = SiteInventory.scan(self.root + "nothing/", self.root + "static/")
+        self.assertEqual(inventory.pages, [])
+
+    def test_junk(self):
+        self.assertTrue(is_junk("rivendell.png:Zone.Identifier"))
+        self.assertTrue(is_junk("Thumbs.db"))
+        self.assertFalse(is_junk("rivendell.png"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+
+from inventory import SiteFile, SiteInventory
+from link_checker import LinkGraph, build_link_graph, resolve_link
+from page_generator import PageResult
+
+class TestLinkChecker(unittest.TestCase):
+
+    def test_resolve_link(self):
+        self.assertEqual(resolve_link("/blog/tom/index.html", "/images/tom.png"), "/images/tom.png")
+        self.assertEqual(resolve_link("/blog/tom/index.html", "../majesty/"), "/blog/majesty/")
+        self.assertEqual(resolve_link("/blog/tom/index.html", "/contact?from=tom#form"), "/contact")
+        self.assertIsNone(resolve_link("/index.html", "https://www.boot.dev"))
+        self.assertIsNone(resolve_link("/index.html", "mailto:someone@example.com"))
+        self.assertIsNone(resolve_link("/index.html", "#top"))
+
+    def test_directory_forms_of_a_page(self):
+        link_graph = LinkGraph()
+        link_graph.add_page("/contact/index.html", [])
+        link_graph.add_page("/index.html", [("link", "/contact"), ("link", "/contact/"), ("link", "/")])
+
+        self.assertEqual(link_graph.broken_links(), [])
+
+    def test_broken_links(self):
+        link_graph = LinkGraph()
+        link_graph.add_target("/images/tom.png")
+        link_graph.add_page("/index.html", [("image", "/images/tom.png"), ("image", "/images/gone.png"), ("link", "/missing")])
+
+        self.assertEqual(link_graph.broken_links(), [("/index.html", "image", "/images/gone.png"), ("/index.html", "link", "/missing")])
+
+    def test_backlinks(self):
+        link_graph = LinkGraph()
+        link_graph.add_page("/index.html", [("link", "/blog/tom")])
+        link_graph.add_page("/blog/tom/index.html", [("link", "/")])
+
+        pages = link_graph.to_dict()["pages"]
+        self.assertEqual(pages["/blog/tom/index.html"]["backlinks"], ["/index.html"])
+        self.assertEqual(pages["/index.html"]["backlinks"], ["/blog/tom/index.html"])
+
+    def test_build_link_graph(self):
+        inventory = SiteInventory([], [SiteFile("static/index.css", "index.css", "asset", 0, 0, 0)])
+        results = [PageResult("content/index.md", "docs/index.html", [("link", "/index.css")])]
+
+        link_graph = build_link_graph(results, inventory, "docs/")
+        self.assertEqual(link_graph.pages, {"/index.html": [("link", "/index.css")]})
+        self.assertEqual(link_graph.broken_links(), [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+import contextlib, io, os, sys, unittest
+
+import main
+from fixtures import TEMPLATE, TempDirTestCase
+
+class TestMain(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.write("template.html", TEMPLATE)
+        self.write("content/index.md", "# Home\n\nSee [the blog](/blog/)")
+        self.write("content/blog/index.md", "# Blog\n\nBack [home](/)")
+        self.write("static/index.css", "body { color: black; }")
+
+    def build(self, *arguments, basepath="/"):
+
+        # main() works on paths relative to the working directory
+        previous_dir, previous_argv = os.getcwd(), sys.argv
+        os.chdir(self.root)
+        sys.argv = ["main.py", basepath, *arguments]
+        output = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(output):
+                main.main()
+        finally:
+            os.chdir(previous_dir)
+            sys.argv = previous_argv
+        return output.getvalue()
+
+    def test_switching_to_atomic_keeps_incremental_records(self):
+        self.build("--incremental", "--gzip")
+        output = self.build("--incremental", "--gzip", "--atomic")
+
+        self.assertIn("0 of 2 pages regenerated", output)
+        self.assertNotIn("Removing", output)
+        self.assertTrue(os.path.exists(self.root + "docs/index.html"))
+        self.assertTrue(os.path.exists(self.root + "docs/blog/index.html"))
+        with open(self.root + ".cache/changed-files.txt", 'r') as file:
+            self.assertEqual(file.read(), "")
+        self.assertTrue(os.path.exists(self.root + ".cache/link_graph.json"))
+        self.assertFalse(os.path.exists(self.root + "docs/link_graph.json"))
+
+        # and back to building in place
+        output = self.build("--incremental", "--gzip")
+        self.assertIn("0 of 2 pages regenerated", output)
+        self.assertIn("Compressed 0 of", output)
+
+    def test_feeds_after_atomic_build_link_the_published_site(self):
+        self.write("content/blog/tom/index.md", "---\ndate: 2024-01-01\n---\n# Tom\n\nBack to [the blog](/blog/)")
+        self.build("--feeds", "--site-url", "https://example.com", "--atomic")
+        output = self.build("--feeds", "--site-url", "https://example.com")
+
+        self.assertIn("0 broken", output)
+        with open(self.root + "docs/sitemap.xml", 'r') as file:
+            sitemap = file.read()
+        self.assertIn("<loc>https://example.com/blog/tom/</loc>", sitemap)
+        self.assertNotIn("staging", sitemap)
+
+    def test_undecodable_page_fails_alone_in_async_build(self):
+        with open(self.root + "content/latin1.md", 'wb') as file:
+            file.write("# Caf\u00e9".encode("latin-1"))
+
+        with self.assertRaises(SystemExit):
+            self.build("--asyncio")
+        self.assertTrue(os.path.exists(self.root + "docs/index.html"))
+        self.assertTrue(os.path.exists(self.root + "docs/blog/index.html"))
+
+    def test_feeds_need_site_url(self):
+        with contextlib.redirect_stderr(io.StringIO()) as errors, self.assertRaises(SystemExit):
+            self.build("--feeds")
+        self.assertIn("--feeds needs --site-url", errors.getvalue())
+        self.assertFalse(os.path.exists(self.root + "docs"))
+
+    def test_full_build_resets_incremental_records(self):
+        self.build("--incremental", basepath="/website/")
+        self.build()
+        output = self.build("--incremental", basepath="/website/")
+
+        self.assertIn("2 of 2 pages regenerated", output)
+        with open(self.root + "docs/index.html", 'r') as file:
+            self.assertIn("href=\"/website/blog/\"", file.read())
+
+    def test_dropping_gzip_removes_siblings(self):
+        self.write("content/index.md", "# Home\n\n" + "Some text about [the blog](/blog/). " * 20)
+        self.build("--incremental", "--gzip")
+        self.assertTrue(os.path.exists(self.root + "docs/index.html.gz"))
+
+        self.write("content/index.md", "# Home\n\nChanged")
+        self.build("--incremental")
+        self.assertFalse(os.path.exists(self.root + "docs/index.html.gz"))
+
+    def test_profile_keeps_basepath(self):
+        args = main.parse_arguments(["--profile", "/website/"])
+        self.assertEqual((args.basepath, args.profile, args.trace), ("/website/", True, "trace.json"))
+
+        args = main.parse_arguments(["/website/", "--profile", "--trace", "build.json"])
+        self.assertEqual(args.trace, "build.json")
+
+    def test_failed_atomic_build_keeps_published_records(self):
+        self.build("--incremental", "--atomic", "--gzip")
+        with open(self.root + ".cache/build_manifest.json", 'r') as file:
+            published_manifest = file.read()
+
+        with open(self.root + "content/latin1.md", 'wb') as file:
+            file.write("# Caf\u00e9".encode("latin-1"))
+        self.write("content/index.md", "# Changed home")
+        with self.assertRaises(SystemExit):
+            self.build("--incremental", "--atomic", "--gzip")
+
+        with open(self.root + ".cache/build_manifest.json", 'r') as file:
+            self.assertEqual(file.read(), published_manifest)
+
+    def test_outputs_of_disabled_stages_removed(self):
+        self.write("content/blog/tom/index.md", "# Tom")
+        self.build("--incremental", "--fingerprint", "--search", "--feeds", "--site-url", "https://example.com")
+        outputs = set(os.listdir(self.root + "docs"))
+        self.assertTrue({"asset-manifest.json", "search", "feed.xml", "sitemap.xml"} <= outputs)
+
+        output = self.build("--incremental")
+        self.assertEqual(sorted(os.listdir(self.root + "docs")), ["blog", "index.css", "index.html"])
+        self.assertIn("0 of 3 pages regenerated", output)
+
+
+if __name__ == "__main__":
+    unittest.main()
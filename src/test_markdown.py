@@ -1,6 +1,6 @@
-import unittest
+import io, time, unittest
 
-from markdown import BlockType, extract_markdown_images, extract_markdown_links, markdown_to_blocks, block_to_block_type, extract_title
+from markdown import BlockType, MarkdownLink, scan_markdown_links, extract_markdown_images, extract_markdown_links, markdown_to_blocks, iter_markdown_blocks, block_to_block_type, extract_title, read_front_matter
 from markdown_interpreter import markdown_to_html_node
 
 class TestMarkdown(unittest.TestCase):
@@ -21,6 +21,28 @@ class TestMarkdown(unittest.TestCase):
         matches = extract_markdown_links(text)
         self.assertListEqual([("to boot dev", "https://www.boot.dev"), ("to youtube", "https://www.youtube.com/@bootdotdev")], matches)
 
+    def test_links_skip_images(self):
+        text = "an ![image](/a.png) and a [link](/b)"
+        self.assertListEqual([("link", "/b")], extract_markdown_links(text))
+
+    def test_scan_markdown_links(self):
+        text = "an ![image](/a.png) and a [link](/b)"
+        matches = list(scan_markdown_links(text))
+        self.assertListEqual(
+            [
+                MarkdownLink(3, 19, "image", "image", "/a.png"),
+                MarkdownLink(26, 36, "link", "link", "/b"),
+            ],
+            matches,
+        )
+        self.assertEqual(text[matches[1].start:matches[1].end], "[link](/b)")
+
+    def test_scan_unbalanced_brackets(self):
+        text = "[" * 20000 + "](" * 20000 + "x"
+        start = time.perf_counter()
+        self.assertListEqual([], list(scan_markdown_links(text)))
+        self.assertLess(time.perf_counter() - start, 1)
+
     def test_markdown_to_blocks(self):
         md = """
 This is **bolded** paragraph
@@ -41,6 +63,16 @@ This is the same paragraph on a new line
             ],
         )
 
+    def test_markdown_blocks_from_lines(self):
+        md = "\n\n# Title\n\n\n\nfirst line\n  \nsecond line\n\n   \n\n- item\n"
+        blocks = list(iter_markdown_blocks(io.StringIO(md)))
+        self.assertEqual(blocks, ["# Title", "first line\n  \nsecond line", "- item"])
+
+    def test_markdown_blocks_generator_matches_split(self):
+        md = "a\n\n\nb\nc \n\n\n\n d\n"
+        expected = [block.strip() for block in md.split("\n\n") if block.strip() != ""]
+        self.assertEqual(markdown_to_blocks(md), expected)
+
     def test_markdown_block_paragraph(self):
         block = "This is just a block of normal\ntext that should be detected as paragraph."
         self.assertEqual(block_to_block_type(block), BlockType.PARAGRAPH)
@@ -178,6 +210,9 @@ the **same** even with inline stuff
             "HEADER"
         )
 
+    def test_title_extraction_from_lines(self):
+        self.assertEqual(extract_title(io.StringIO("\n# HEADER\nbody\n")), "HEADER")
+
     def test_no_title_extraction(self):
         md = """
 ## NOT QUITE HEADER
@@ -186,3 +221,24 @@ the **same** even with inline stuff
 
         with self.assertRaises(Exception):
             title = extract_title(md)
+
+    def test_front_matter(self):
+        md = """---
+date: 2024-05-01
+tags: [tolkien, opinion]
+---
+# Title
+
+Body text
+"""
+        self.assertEqual(read_front_matter(md), {"date": "2024-05-01", "tags": "[tolkien, opinion]"})
+        self.assertEqual(extract_title(md), "Title")
+        self.assertEqual(markdown_to_blocks(md), ["# Title", "Body text"])
+
+    def test_leading_rule_is_not_front_matter(self):
+        md = """---
+# Title
+---
+"""
+        self.assertEqual(read_front_matter(md), {})
+        self.assertEqual(markdown_to_blocks(md), ["---\n# Title\n---"])
@@ -0,0 +1,62 @@
+import os, tempfile, unittest
+
+from inventory import scan_files
+from metadata_index import MetadataIndex, parse_tags
+
+class TestMetadataIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.content_dir = self.temp_dir.name + "/content/"
+        os.makedirs(self.content_dir + "blog/old")
+        os.makedirs(self.content_dir + "blog/new")
+        self.write("index.md", "# Home\n")
+        self.write("blog/old/index.md", "---\ndate: 2023-01-01\n---\n# Old post\n")
+        self.write("blog/new/index.md", "---\ndate: 2024-01-01\ntags: b, a\nsummary: \"Newest\"\n---\n# New post\n")
+        self.metadata_index = MetadataIndex(self.temp_dir.name + "/metadata.sqlite")
+
+    def tearDown(self):
+        self.metadata_index.close()
+        self.temp_dir.cleanup()
+
+    def write(self, name, text, mtime_offset=0):
+        path = self.content_dir + name
+        with open(path, 'w') as file:
+            file.write(text)
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + mtime_offset))
+
+    def update(self):
+        pages = [(page, page.relative_path.replace(".md", ".html"), page.relative_path.startswith("blog/")) for page in scan_files(self.content_dir, "page")]
+        return self.metadata_index.update(pages)
+
+    def test_posts_newest_first(self):
+        self.update()
+        posts = self.metadata_index.posts()
+
+        self.assertEqual([post.title for post in posts], ["New post", "Old post"])
+        self.assertEqual(posts[0].tags, ["a", "b"])
+        self.assertEqual(posts[0].summary, "Newest")
+        self.assertEqual(len(self.metadata_index.pages()), 3)
+
+    def test_only_changed_pages_read(self):
+        self.assertEqual(self.update(), 3)
+        self.assertEqual(self.update(), 0)
+
+        self.write("blog/old/index.md", "---\ndate: 2025-01-01\n---\n# Old post, updated\n", mtime_offset=1_000_000_000)
+        self.assertEqual(self.update(), 1)
+        self.assertEqual(self.metadata_index.posts()[0].title, "Old post, updated")
+
+    def test_removed_pages_dropped(self):
+        self.update()
+        os.remove(self.content_dir + "blog/new/index.md")
+        self.update()
+
+        self.assertEqual([post.title for post in self.metadata_index.posts()], ["Old post"])
+
+    def test_parse_tags(self):
+        self.assertEqual(parse_tags("[a, \"b c\"]"), ["a", "b c"])
+        self.assertEqual(parse_tags(""), [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import os, tempfile, unittest
+
+from async_pipeline import render_pages_async
+from page_generator import generate_pages_recursive
+
+TEMPLATE = "<html><title>{{ Title }}</title><body>{{ Content }}</body></html>"
+
+class TestPageGenerator(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = self.temp_dir.name + "/"
+
+        self.template_path = self.root + "template.html"
+        with open(self.template_path, 'w') as file:
+            file.write(TEMPLATE)
+
+        os.makedirs(self.root + "content/blog/post")
+        pages = {
+            "content/index.md": "# Home\n\n[a post](/blog/post)",
+            "content/blog/post/index.md": "# Post\n\nSome **bold** text and ![an image](/images/a.png)",
+        }
+        for path, markdown in pages.items():
+            with open(self.root + path, 'w') as file:
+                file.write(markdown)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def read_output(self, dest_dir):
+        outputs = {}
+        for dir_path, _, file_names in os.walk(dest_dir):
+            for file_name in file_names:
+                with open(os.path.join(dir_path, file_name), 'rb') as file:
+                    outputs[os.path.relpath(os.path.join(dir_path, file_name), dest_dir)] = file.read()
+        return outputs
+
+    def test_parallel_matches_serial(self):
+        serial_dir = self.root + "serial/"
+        parallel_dir = self.root + "parallel/"
+
+        generate_pages_recursive(self.root + "content/", self.template_path, serial_dir, "/site/", jobs=1)
+        generate_pages_recursive(self.root + "content/", self.template_path, parallel_dir, "/site/", jobs=2)
+
+        self.assertEqual(self.read_output(serial_dir), self.read_output(parallel_dir))
+        self.assertIn("blog/post/index.html", self.read_output(serial_dir))
+
+    def test_failures_reported_per_page(self):
+        with open(self.root + "content/untitled.md", 'w') as file:
+            file.write("no title here")
+
+        results = generate_pages_recursive(self.root + "content/", self.template_path, self.root + "out/", "/", jobs=2)
+
+        self.assertEqual([result.src_file for result in results if result.error is not None], [self.root + "content/untitled.md"])
+        self.assertTrue(os.path.exists(self.root + "out/index.html"))
+
+    def test_asyncio_pipeline_matches_pool(self):
+        with open(self.root + "content/untitled.md", 'w') as file:
+            file.write("no title here")
+
+        for jobs in (1, 2):
+            pool_dir = self.root + f"pool{jobs}/"
+            pipelined_dir = self.root + f"pipelined{jobs}/"
+
+            pool_results = generate_pages_recursive(self.root + "content/", self.template_path, pool_dir, "/site/", jobs=jobs, minify=True)
+            pipelined_results = generate_pages_recursive(self.root + "content/", self.template_path, pipelined_dir, "/site/", jobs=jobs, render=render_pages_async, minify=True)
+
+            self.assertEqual(self.read_output(pool_dir), self.read_output(pipelined_dir))
+            self.assertEqual([result.src_file for result in pipelined_results], [result.src_file for result in pool_results])
+            self.assertEqual([result.links for result in pipelined_results], [result.links for result in pool_results])
+            self.assertEqual([result.error is None for result in pipelined_results], [result.error is None for result in pool_results])
+
+    def test_profiled_matches_streamed(self):
+        results = generate_pages_recursive(self.root + "content/", self.template_path, self.root + "profiled/", "/site/", profile=True)
+        generate_pages_recursive(self.root + "content/", self.template_path, self.root + "streamed/", "/site/")
+
+        self.assertEqual(self.read_output(self.root + "profiled/"), self.read_output(self.root + "streamed/"))
+        self.assertEqual([phase for phase, _, _ in results[0].profile.spans], ["read", "blocks", "inline", "serialize", "template", "write"])
+
+    def test_profiled_uses_block_cache(self):
+        generate_pages_recursive(self.root + "content/", self.template_path, self.root + "streamed/", "/site/", minify=True)
+        for _ in range(2):
+            results = generate_pages_recursive(self.root + "content/", self.template_path, self.root + "profiled/", "/site/", profile=True, block_cache=True, minify=True)
+
+        self.assertEqual(self.read_output(self.root + "profiled/"), self.read_output(self.root + "streamed/"))
+        self.assertEqual(sum(result.cache_misses for result in results), 0)
+        self.assertGreater(sum(result.cache_hits for result in results), 0)
+        self.assertEqual(results[1].links, [("link", "/blog/post")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import os, unittest
+
+from file_manager import write_if_changed
+from fixtures import TempDirTestCase
+from publish import prepare_staging_directory, publish_staging_directory, reuse_unchanged_files, swap_directories
+
+class TestPublish(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.target_dir = self.root + "docs/"
+
+        self.write("docs/index.html", "home")
+        self.write("docs/blog/index.html", "blog")
+        self.write("docs/old.html", "old")
+
+    def test_staged_writes_leave_published_files_alone(self):
+        staging_dir = prepare_staging_directory(self.target_dir)
+        self.assertEqual(staging_dir, self.root + "docs.staging/")
+
+        write_if_changed(staging_dir + "index.html", "new home")
+        self.assertEqual(self.read(self.target_dir + "index.html"), "home")
+        self.assertEqual(self.read(staging_dir + "index.html"), "new home")
+
+    def test_changes(self):
+        staging_dir = prepare_staging_directory(self.target_dir, clone=False)
+        self.write(staging_dir + "index.html", "new home")
+        self.write(staging_dir + "blog/index.html", "blog")
+        self.write(staging_dir + "contact.html", "contact")
+
+        changes = reuse_unchanged_files(staging_dir, self.target_dir)
+
+        self.assertEqual(changes, [("A", "contact.html"), ("M", "index.html"), ("D", "old.html")])
+
+        # the identical page was swapped for the published file, mtime and all
+        self.assertTrue(os.path.samefile(staging_dir + "blog/index.html", self.target_dir + "blog/index.html"))
+
+    def test_publish(self):
+        staging_dir = prepare_staging_directory(self.target_dir)
+        self.write(staging_dir + "index.html.tmp", "new home")
+        os.replace(staging_dir + "index.html.tmp", staging_dir + "index.html")
+        os.remove(staging_dir + "old.html")
+
+        changes = publish_staging_directory(staging_dir, self.target_dir, self.root + "changed.txt")
+
+        self.assertEqual(changes, [("M", "index.html"), ("D", "old.html")])
+        self.assertEqual(self.read(self.target_dir + "index.html"), "new home")
+        self.assertFalse(os.path.exists(self.target_dir + "old.html"))
+        self.assertFalse(os.path.exists(staging_dir))
+        self.assertEqual(self.read(self.root + "changed.txt"), "M\tindex.html\nD\told.html\n")
+
+    def test_swap_into_missing_target(self):
+        staging_dir = self.root + "site.staging/"
+        self.write(staging_dir + "index.html", "home")
+
+        swap_directories(staging_dir, self.root + "site/")
+        self.assertEqual(self.read(self.root + "site/index.html"), "home")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import os, tempfile, unittest
+
+from page_generator import generate_pages_recursive
+from search_index import SearchIndex, decode_postings, encode_postings, index_pages, shard_name, term_counts, tokenize, write_search_index
+
+class TestSearchIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = self.temp_dir.name + "/"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_tokenize(self):
+        self.assertEqual(list(tokenize("The Éowyn of Rohan, and a  hobbit's pipe")), ["eowyn", "rohan", "hobbit", "pipe"])
+
+    def test_term_counts(self):
+        self.assertEqual(term_counts(["Tom ", "Bombadil", " and tom"]), {"tom": 2, "bombadil": 1})
+
+    def test_postings_round_trip(self):
+        postings = [(0, 2), (3, 1), (10, 5)]
+        self.assertEqual(encode_postings(postings), [0, 2, 3, 1, 7, 5])
+        self.assertEqual(decode_postings(encode_postings(postings)), postings)
+
+    def test_shard_names(self):
+        self.assertEqual(shard_name("tolkien"), "to")
+        self.assertEqual(shard_name("éa"), "_" + "éa".encode().hex())
+
+    def test_search(self):
+        search_dir = self.root + "search/"
+        write_search_index([
+            ("/b/", "Bombadil", {"tom": 3, "bombadil": 2}),
+            ("/a/", "Glorfindel", {"glorfindel": 4, "tom": 1}),
+        ], search_dir)
+
+        search_index = SearchIndex(search_dir)
+        self.assertEqual(search_index.search("Tom"), [("/b/", "Bombadil"), ("/a/", "Glorfindel")])
+        self.assertEqual(search_index.search("tom glorfindel"), [("/a/", "Glorfindel")])
+        self.assertEqual(search_index.search("balrog"), [])
+        self.assertEqual(set(search_index.shards), {"to", "gl"})
+
+    def test_stale_shards_removed(self):
+        search_dir = self.root + "search/"
+        write_search_index([("/a/", "A", {"balrog": 1})], search_dir)
+        write_search_index([("/a/", "A", {"tom": 1})], search_dir)
+
+        self.assertFalse(os.path.exists(search_dir + "ba.json"))
+        self.assertTrue(os.path.exists(search_dir + "to.json"))
+
+    def test_index_built_from_render(self):
+        with open(self.root + "template.html", 'w') as file:
+            file.write("<title>{{ Title }}</title>{{ Content }}")
+        os.makedirs(self.root + "content/blog")
+        with open(self.root + "content/blog/index.md", 'w') as file:
+            file.write("# The Blog\n\nAll about **Glorfindel** and ![a balrog](/balrog.png)\n\n```\nfn elvish()\n```")
+
+        for block_cache in (False, True):
+            results = generate_pages_recursive(self.root + "content/", self.root + "template.html", self.root + "docs/", "/site/", search=True, block_cache=block_cache)
+            self.assertEqual(results[0].search[0], "The Blog")
+            self.assertEqual(set(results[0].search[1]), {"blog", "all", "about", "glorfindel", "balrog", "fn", "elvish"})
+
+        index_pages(results, self.root + "docs/", "/site/")
+        self.assertEqual(SearchIndex(self.root + "docs/search/").search("balrog"), [("/site/blog/", "The Blog")])
+
+
+if __name__ == "__main__":
+    unittest.main()
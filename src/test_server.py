@@ -0,0 +1,159 @@
+import gzip, http.client, json, os, threading, unittest
+from http.server import ThreadingHTTPServer
+
+from fixtures import TempDirTestCase
+from server import DirectorySite, FileCache, SiteRequestHandler, StaticFile, WatchedSite, accepts_gzip, etag_matches
+
+class TestWatchedSite(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.write("template.html", "<html><body>{{ Content }}</body></html>")
+        self.write("content/index.md", "# Home")
+        self.write("content/blog/index.md", "# Blog\n\nfirst")
+        self.write("static/images/a.png", "png")
+
+        self.site = WatchedSite(self.root + "content/", self.root + "static/", self.root + "template.html")
+
+    def write(self, path, text):
+        # make sure the watcher sees a new mtime even on coarse clocks
+        return super().write(path, text, mtime_offset=1_000_000_000)
+
+    def test_initial_build(self):
+        self.assertEqual(self.site.refresh(), 3)
+        self.assertIn(b"<h1>Home</h1>", self.site.get("/index.html")[1])
+        self.assertEqual(self.site.get("/images/a.png"), (200, b"png"))
+
+    def test_only_changed_page_rebuilt(self):
+        self.site.refresh()
+        self.write("content/blog/index.md", "# Blog\n\nsecond")
+
+        self.assertEqual(self.site.refresh(), 1)
+        self.assertIn(b"second", self.site.get("/blog/index.html")[1])
+        self.assertEqual(self.site.refresh(), 0)
+
+    def test_template_change_rebuilds_all_pages(self):
+        self.site.refresh()
+        self.write("template.html", "<html><main>{{ Content }}</main><body></body></html>")
+
+        self.assertEqual(self.site.refresh(), 2)
+        self.assertIn(b"<main>", self.site.get("/index.html")[1])
+
+    def test_removed_page(self):
+        self.site.refresh()
+        os.remove(self.root + "content/blog/index.md")
+
+        self.site.refresh()
+        self.assertIsNone(self.site.get("/blog/index.html"))
+
+    def test_broken_page_served_as_error(self):
+        self.write("content/index.md", "no title")
+        self.site.refresh()
+        self.assertEqual(self.site.get("/index.html")[0], 500)
+
+class TestDirectorySite(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.write("index.html", b"<h1>Home</h1>" * 20)
+        self.write("index.html.gz", gzip.compress(b"<h1>Home</h1>" * 20))
+        self.match_mtime("index.html.gz", "index.html")
+        self.write("blog/index.html", b"<h1>Blog</h1>")
+        self.write("index.0123456789.css", b"body {}")
+        self.write("asset-manifest.json", json.dumps({"/index.css": "/index.0123456789.css"}).encode())
+
+        self.site = DirectorySite(self.root)
+        self.server = ThreadingHTTPServer(("localhost", 0), SiteRequestHandler)
+        self.server.site = self.site
+        self.server.quiet = True
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+        self.connection = http.client.HTTPConnection("localhost", self.server.server_address[1], timeout=5)
+
+    def tearDown(self):
+        self.connection.close()
+        self.server.shutdown()
+        self.server.server_close()
+        super().tearDown()
+
+    def match_mtime(self, name, other_name):
+        stat = os.stat(self.root + other_name)
+        os.utime(self.root + name, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    def request(self, path, **headers):
+        self.connection.request("GET", path, headers=headers)
+        response = self.connection.getresponse()
+        return response, response.read()
+
+    def test_accepts_gzip(self):
+        self.assertTrue(accepts_gzip("gzip, deflate, br"))
+        self.assertTrue(accepts_gzip("br;q=1.0, gzip;q=0.8"))
+        self.assertTrue(accepts_gzip("*"))
+        self.assertFalse(accepts_gzip("gzip;q=0"))
+        self.assertFalse(accepts_gzip("br"))
+        self.assertFalse(accepts_gzip(None))
+
+    def test_etag_matches(self):
+        self.assertTrue(etag_matches('"a", "b"', '"b"'))
+        self.assertTrue(etag_matches('W/"b"', '"b"'))
+        self.assertTrue(etag_matches("*", '"b"'))
+        self.assertFalse(etag_matches('"a"', '"b"'))
+
+    def test_file_cache_evicts_least_recently_used(self):
+        cache = FileCache(100)
+        for name in ("a", "b", "c", "d"):
+            cache.put(name, 1, StaticFile(b"x" * 25, 0))
+        cache.get("a", 1)
+        cache.put("e", 1, StaticFile(b"x" * 25, 0))
+
+        self.assertIsNotNone(cache.get("a", 1))
+        self.assertIsNone(cache.get("b", 1))
+        self.assertIsNone(cache.get("a", 2))
+
+    def test_served_from_memory_until_changed(self):
+        first = self.site.get("/blog/index.html")
+        self.assertIs(self.site.get("/blog/index.html"), first)
+
+        self.write("blog/index.html", b"<h1>Changed</h1>")
+        self.assertEqual(self.site.get("/blog/index.html").body, b"<h1>Changed</h1>")
+
+    def test_keep_alive_and_revalidation(self):
+        response, body = self.request("/blog/")
+        self.assertEqual((response.status, body), (200, b"<h1>Blog</h1>"))
+        self.assertEqual(response.getheader("Cache-Control"), "no-cache")
+        self.assertFalse(response.will_close)
+
+        response, body = self.request("/blog/", **{"If-None-Match": response.getheader("ETag")})
+        self.assertEqual((response.status, body), (304, b""))
+
+        response, body = self.request("/missing")
+        self.assertEqual(response.status, 404)
+
+    def test_gzip_sibling(self):
+        response, body = self.request("/", **{"Accept-Encoding": "gzip"})
+        self.assertEqual(response.getheader("Content-Encoding"), "gzip")
+        self.assertEqual(response.getheader("Vary"), "Accept-Encoding")
+        self.assertEqual(gzip.decompress(body), b"<h1>Home</h1>" * 20)
+        gzip_etag = response.getheader("ETag")
+
+        response, body = self.request("/")
+        self.assertIsNone(response.getheader("Content-Encoding"))
+        self.assertEqual(body, b"<h1>Home</h1>" * 20)
+        self.assertNotEqual(response.getheader("ETag"), gzip_etag)
+
+    def test_outdated_gzip_sibling_ignored(self):
+        self.write("index.html", b"<h1>New home</h1>")
+        stat = os.stat(self.root + "index.html")
+        os.utime(self.root + "index.html", ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        response, body = self.request("/", **{"Accept-Encoding": "gzip"})
+        self.assertIsNone(response.getheader("Content-Encoding"))
+        self.assertEqual(body, b"<h1>New home</h1>")
+
+    def test_fingerprinted_assets_are_immutable(self):
+        response, _ = self.request("/index.0123456789.css")
+        self.assertIn("immutable", response.getheader("Cache-Control"))
+        self.assertEqual(response.getheader("Content-Type"), "text/css; charset=utf-8")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+from xml.etree import ElementTree
+
+from metadata_index import PageMetadata
+from syndication import atom_feed, blog_index_node, page_url, sitemap
+
+POSTS = [
+    PageMetadata("content/blog/b/index.md", "blog/b/index.html", 0, "B & more", "2024-02-01", "Second", ["x"], True),
+    PageMetadata("content/blog/a/index.md", "blog/a/index.html", 0, "A", "2024-01-01", "", [], True),
+]
+
+class TestSyndication(unittest.TestCase):
+
+    def test_page_url(self):
+        self.assertEqual(page_url("blog/a/index.html"), "/blog/a/")
+        self.assertEqual(page_url("about.html"), "/about.html")
+
+    def test_atom_feed(self):
+        feed = ElementTree.fromstring(atom_feed(POSTS, "/site/", "https://example.com", "Club"))
+        namespace = "{http://www.w3.org/2005/Atom}"
+
+        self.assertEqual(feed.find(namespace + "updated").text, "2024-02-01T00:00:00Z")
+        entries = feed.findall(namespace + "entry")
+        self.assertEqual([entry.find(namespace + "title").text for entry in entries], ["B & more", "A"])
+        self.assertEqual(entries[0].find(namespace + "link").get("href"), "https://example.com/site/blog/b/")
+
+    def test_sitemap(self):
+        urlset = ElementTree.fromstring(sitemap(POSTS, [("/blog/", "2024-02-01")], "/", "https://example.com"))
+        locations = [url[0].text for url in urlset]
+        self.assertEqual(locations, ["https://example.com/blog/", "https://example.com/blog/a/", "https://example.com/blog/b/"])
+
+    def test_blog_index_pagination(self):
+        first_page = blog_index_node(POSTS[:1], 1, 2).to_html()
+        second_page = blog_index_node(POSTS[1:], 2, 2).to_html()
+
+        self.assertIn("<a href=\"/blog/b/\">B &amp; more</a>", first_page)
+        self.assertIn("<a href=\"/blog/page/2/\">Older posts</a>", first_page)
+        self.assertIn("<a href=\"/blog/\">Newer posts</a>", second_page)
+        self.assertNotIn("Older posts", second_page)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import io, unittest
+
+from fixtures import TempDirTestCase
+from htmlnode import LeafNode, Minifier, ParentNode
+from template import Template, basepath_rewriter
+
+class TestTemplate(TempDirTestCase):
+
+    def test_render_placeholders(self):
+        template = Template("<title>{{ Title }}</title><body>{{Content}}</body>")
+        self.assertEqual(template.slots, ["Title", "Content"])
+        self.assertEqual(
+            template.render(Title="Hello", Content="<p>hi</p>"),
+            "<title>Hello</title><body><p>hi</p></body>",
+        )
+
+    def test_missing_placeholder_renders_empty(self):
+        template = Template("<p>{{ Subtitle }}</p>")
+        self.assertEqual(template.render(), "<p></p>")
+
+    def test_comments_stripped(self):
+        template = Template("<p>{# only for authors #}{{ Title }}</p>")
+        self.assertEqual(template.render(Title="x"), "<p>x</p>")
+
+    def test_basepath_rewritten_at_compile_time(self):
+        template = Template("<link href=\"/index.css\" /><img src=\"https://a.b/c.png\" />{{ Content }}", rewrite_url=basepath_rewriter("/site/"))
+        self.assertEqual(template.literals[0], "<link href=\"/site/index.css\" /><img src=\"https://a.b/c.png\" />")
+
+    def test_basepath_rewritten_in_url_props(self):
+        node = ParentNode("div", [LeafNode("a", "home", {"href": "/"}), LeafNode("img", "", {"src": "/images/a.png", "alt": "a"})])
+        self.assertEqual(
+            node.to_html(basepath_rewriter("/site/")),
+            "<div><a href=\"/site/\">home</a><img src=\"/site/images/a.png\" alt=\"a\"></img></div>",
+        )
+
+    def test_include(self):
+        self.write("header.html", "<header>{{ Title }}</header>")
+        template_path = self.write("page.html", "{% include \"header.html\" %}<main>{{ Content }}</main>")
+
+        template = Template.load(template_path)
+
+        self.assertEqual(template.render(Title="T", Content="C"), "<header>T</header><main>C</main>")
+        self.assertEqual(template.dependencies, [template_path, self.root + "header.html"])
+
+    def test_extends_layout(self):
+        self.write("layout.html", "<html>{% block head %}<title>{{ Title }}</title>{% endblock %}<body>{% block body %}{% endblock %}</body></html>")
+        template_path = self.write("page.html", "{% extends \"layout.html\" %}{% block body %}<article>{{ Content }}</article>{% endblock %}")
+
+        template = Template.load(template_path)
+
+        self.assertEqual(template.render(Title="T", Content="C"), "<html><title>T</title><body><article>C</article></body></html>")
+
+    def test_include_cycle(self):
+        template_path = self.write("loop.html", "{% include \"loop.html\" %}")
+        with self.assertRaises(ValueError):
+            Template.load(template_path)
+
+
+    def test_minify(self):
+        source = """<html>
+  <head>
+    <!-- layout by the author -->
+    <meta name="viewport" content="width=device-width" />
+    <link href="/index.css" rel="stylesheet" />
+  </head>
+  <body>
+    <pre>  keep
+    this</pre>
+    <p>{{ Title }}  here</p>
+  </body>
+</html>"""
+        template = Template(source, rewrite_url=basepath_rewriter("/site/"), minify=True)
+
+        minifier = Minifier()
+        fp = io.StringIO()
+        template.write_to(fp, minifier, Title="a  title")
+
+        self.assertEqual(
+            fp.getvalue(),
+            "<html><head><meta name=viewport content=\"width=device-width\" /><link href=/site/index.css rel=stylesheet /></head><body><pre>  keep\n    this</pre><p>a title here</p></body></html>",
+        )
+        self.assertEqual(minifier.saved, len(Template(source, rewrite_url=basepath_rewriter("/site/")).render(Title="a  title")) - len(fp.getvalue()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,6 @@
 import unittest
 
-from textnode import TextNode, TextType, split_nodes_delimiter, split_nodes_image, split_nodes_link, text_to_textnodes
+from textnode import TextNode, TextType, split_nodes_delimiter, split_nodes_image, split_nodes_link, text_to_textnodes, text_to_textnodes_multipass, text_to_textnodes_single_pass
 
 
 class TestTextNode(unittest.TestCase):
@@ -171,5 +171,38 @@ class TestTextToTextnodes(unittest.TestCase):
             nodes
         )
 
+class TestSinglePassTokenizer(unittest.TestCase):
+
+    def assertSameAsMultipass(self, text):
+        self.assertListEqual(text_to_textnodes_multipass(text), text_to_textnodes_single_pass(text))
+
+    def test_all_types(self):
+        self.assertSameAsMultipass("This is **text** with an _italic_ word and a `code block` and an ![obi wan image](https://i.imgur.com/fJRm4Vk.jpeg) and a [link](https://boot.dev)")
+
+    def test_many_links(self):
+        self.assertSameAsMultipass(" and ".join(f"[link {idx}](/page_{idx})" for idx in range(50)))
+
+    def test_newlines(self):
+        self.assertSameAsMultipass("a **bold\nline** and\n`code\nspan`")
+
+    def test_delimiters_inside_other_delimiters(self):
+        self.assertSameAsMultipass("a _b **c** d_ e `f_g` **h_i** `j**k`")
+
+    def test_unclosed_delimiters(self):
+        self.assertSameAsMultipass("an **unclosed bold and _italic")
+
+    def test_adjacent_delimiters(self):
+        self.assertSameAsMultipass("****a____b``c")
+
+    def test_selectable(self):
+        text = "some **bold** [link](/x)"
+        self.assertListEqual(text_to_textnodes(text, single_pass=False), text_to_textnodes(text, single_pass=True))
+
+    def test_brackets_in_link_text(self):
+        # a stray bracket before a link stays text, both pipelines share the link scanner
+        expected = [TextNode("[stray ", TextType.NORMAL), TextNode("link", TextType.LINK, "/x")]
+        self.assertListEqual(expected, text_to_textnodes_single_pass("[stray [link](/x)"))
+        self.assertListEqual(expected, text_to_textnodes_multipass("[stray [link](/x)"))
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
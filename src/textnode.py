@@ -1,6 +1,7 @@
+import re
 from enum import Enum
 from htmlnode import LeafNode
-from markdown import extract_markdown_images, extract_markdown_links
+from markdown import scan_markdown_links
 
 class TextType(Enum):
     NORMAL = "normal"
@@ -10,8 +11,12 @@ class TextType(Enum):
     LINK = "link"
     IMAGE = "image"
 
+INLINE_DELIMITER_PATTERN = re.compile(r"\*\*|_|`")
+
 class TextNode():
 
+    __slots__ = ("text", "text_type", "url")
+
     def __init__(self, text, text_type, url=None):
 
         if text_type == TextType.CODE:
@@ -21,6 +26,17 @@ class TextNode():
         self.text_type = text_type
         self.url = url
 
+    @classmethod
+    def from_normalized(cls, text, text_type, url=None):
+
+        # for slices of text whose newlines were already replaced, skips the rescan in __init__
+        node = cls.__new__(cls)
+        node.text = text
+        node.text_type = text_type
+        node.url = url
+
+        return node
+
     def __eq__(self, other):
 
         return  self.text == other.text and \
@@ -31,7 +47,7 @@ class TextNode():
 
         return f"TextNode({self.text}, {self.text_type.value}, {self.url})"
 
-    def to_html_node(self):
+    def to_html_node(self, images=None):
         match self.text_type:
             case TextType.NORMAL:
                 return LeafNode(None, self.text, None)
@@ -44,7 +60,10 @@ class TextNode():
             case TextType.LINK:
                 return LeafNode("a", self.text, {'href':self.url})
             case TextType.IMAGE:
-                return LeafNode("img", "", {'src':self.url, 'alt':self.text})
+                props = {'src':self.url, 'alt':self.text}
+                if images is not None:
+                    props.update(images.attributes(self.url))
+                return LeafNode("img", "", props)
             case _:
                 raise Exception("invalid text type")
     
@@ -66,67 +85,106 @@ def split_nodes_delimiter(old_nodes, delimiter, text_type):
                     else:
                         new_node_type = text_type
 
-                    new_nodes.append(TextNode(text, new_node_type, node.url))
+                    new_nodes.append(TextNode.from_normalized(text, new_node_type, node.url))
                     new_node_idx += 1
         else:
             new_nodes.append(node)
 
     return new_nodes
 
-def split_nodes_image(old_nodes):
+def split_nodes_markdown_links(old_nodes, kind, text_type):
 
     new_nodes = []
 
     for node in old_nodes:
         if node.text_type == TextType.NORMAL:
-            image_data_list = extract_markdown_images(node.text)
-            remaining_node_str = node.text
+            position = 0
+
+            # matches carry their offsets, so the text is sliced instead of searched again for the rebuilt markdown
+            for match in scan_markdown_links(node.text):
+                if match.kind != kind:
+                    continue
 
-            for image_data in image_data_list:
-                image_str = f"![{image_data[0]}]({image_data[1]})"
-                pre_str, remaining_node_str = remaining_node_str.split(image_str, maxsplit=1)
-                new_nodes.append(TextNode(pre_str, text_type=TextType.NORMAL, url=node.url))
-                new_nodes.append(TextNode(image_data[0], TextType.IMAGE, image_data[1]))
+                new_nodes.append(TextNode.from_normalized(node.text[position:match.start], TextType.NORMAL, node.url))
+                new_nodes.append(TextNode.from_normalized(match.text, text_type, match.url))
+                position = match.end
 
-            if remaining_node_str != "":
-                new_nodes.append(TextNode(remaining_node_str, node.text_type))
+            if position < len(node.text):
+                new_nodes.append(TextNode.from_normalized(node.text[position:], node.text_type))
         else:
             new_nodes.append(node)
 
-
     return new_nodes
 
+def split_nodes_image(old_nodes):
+    return split_nodes_markdown_links(old_nodes, "image", TextType.IMAGE)
+
 def split_nodes_link(old_nodes):
+    return split_nodes_markdown_links(old_nodes, "link", TextType.LINK)
+
+def text_to_textnodes_multipass(text):
+
+    initial_node = [TextNode(text, TextType.NORMAL)]
+    nodes_split_images = split_nodes_image(initial_node)
+    nodes_split_links = split_nodes_link(nodes_split_images)
+    nodes_split_bold = split_nodes_delimiter(nodes_split_links, "**", TextType.BOLD)
+    nodes_split_italics = split_nodes_delimiter(nodes_split_bold, "_", TextType.ITALIC)
+    nodes_split_code = split_nodes_delimiter(nodes_split_italics, "`", TextType.CODE)
     
-    new_nodes = []
+    return nodes_split_code
 
-    for node in old_nodes:
-        if node.text_type == TextType.NORMAL:
+# state the single pass scanner moves to when it meets a delimiter, None means the delimiter is plain text there.
+# mirrors the multipass pipeline: bold is split first, so "**" always switches, italics are split before
+# code, so "_" still switches inside code, and a backtick inside italics is left alone
+DELIMITER_TRANSITIONS = {
+    TextType.NORMAL: {"**": TextType.BOLD, "_": TextType.ITALIC, "`": TextType.CODE},
+    TextType.BOLD: {"**": TextType.NORMAL, "_": None, "`": None},
+    TextType.ITALIC: {"**": TextType.BOLD, "_": TextType.NORMAL, "`": None},
+    TextType.CODE: {"**": TextType.BOLD, "_": TextType.ITALIC, "`": TextType.NORMAL},
+}
+
+def scan_delimited_text(text, start, end, nodes):
+
+    text_type = TextType.NORMAL
+    segment_start = start
+
+    for match in INLINE_DELIMITER_PATTERN.finditer(text, start, end):
+        new_text_type = DELIMITER_TRANSITIONS[text_type][match[0]]
+        if new_text_type is None:
+            continue
 
-            link_data_list = extract_markdown_links(node.text)
-            remaining_node_str = node.text
+        if match.start() > segment_start:
+            nodes.append(TextNode.from_normalized(text[segment_start:match.start()], text_type))
 
-            for link_data in link_data_list:
-                link_str = f"[{link_data[0]}]({link_data[1]})"
-                pre_str, remaining_node_str = remaining_node_str.split(link_str, maxsplit=1)
-                new_nodes.append(TextNode(pre_str, text_type=TextType.NORMAL))
-                new_nodes.append(TextNode(link_data[0], TextType.LINK, link_data[1]))
+        text_type = new_text_type
+        segment_start = match.end()
 
-            if remaining_node_str != "":
-                new_nodes.append(TextNode(remaining_node_str, node.text_type))
+    if end > segment_start:
+        nodes.append(TextNode.from_normalized(text[segment_start:end], text_type))
+
+def text_to_textnodes_single_pass(text):
+
+    text = text.replace("\n", " ")
+    nodes = []
+    position = 0
+
+    for match in scan_markdown_links(text):
+        scan_delimited_text(text, position, match.start, nodes)
+
+        if match.kind == "image":
+            nodes.append(TextNode.from_normalized(match.text, TextType.IMAGE, match.url))
         else:
-            new_nodes.append(node)
+            nodes.append(TextNode.from_normalized(match.text, TextType.LINK, match.url))
 
+        position = match.end
 
-    return new_nodes
+    scan_delimited_text(text, position, len(text), nodes)
 
-def text_to_textnodes(text):
+    return nodes
 
-    initial_node = [TextNode(text, TextType.NORMAL)]
-    nodes_split_images = split_nodes_image(initial_node)
-    nodes_split_links = split_nodes_link(nodes_split_images)
-    nodes_split_bold = split_nodes_delimiter(nodes_split_links, "**", TextType.BOLD)
-    nodes_split_italics = split_nodes_delimiter(nodes_split_bold, "_", TextType.ITALIC)
-    nodes_split_code = split_nodes_delimiter(nodes_split_italics, "`", TextType.CODE)
-    
-    return nodes_split_code
\ No newline at end of file
+def text_to_textnodes(text, single_pass=True):
+
+    if single_pass:
+        return text_to_textnodes_single_pass(text)
+
+    return text_to_textnodes_multipass(text)